@@ -3,7 +3,7 @@ import json
 import time
 import uuid
 from collections import namedtuple
-from datetime import datetime
+from datetime import datetime, timedelta
 from itertools import chain
 from typing import Any, Generator
 
@@ -19,15 +19,27 @@ from django.contrib import admin, messages
 from django.contrib.admin.templatetags.admin_urls import admin_urlname
 from django.contrib.admin.views.main import ChangeList
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.db.models import Q, QuerySet
+from django.db.models import (
+    Aggregate,
+    Count,
+    F,
+    FloatField,
+    Max,
+    Min,
+    Q,
+    QuerySet,
+    Sum,
+)
 from django.db.models.fields.json import JSONField
 from django.db.models.functions import Lower
 from django.forms import ModelForm, fields, widgets
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.http.response import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import resolve_url
+from django.template.defaultfilters import filesizeformat
 from django.template.response import TemplateResponse
 from django.urls import path, reverse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.html import escape, format_html
 from django.utils.http import urlencode
@@ -45,6 +57,8 @@ from qfieldcloud.core.models import (
     Delta,
     Geodb,
     Job,
+    JobContainerStats,
+    JobStepMetrics,
     Organization,
     OrganizationMember,
     Person,
@@ -65,6 +79,14 @@ admin.site.unregister(LogEntry)
 Invitation = get_invitation_model()
 
 
+class PercentileCont(Aggregate):
+    """The continuous percentile of the given expression, e.g. `PercentileCont("cpu_seconds", percentile=0.95)`."""
+
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+
 class NoPkOrderChangeList(ChangeList):
     """
     DjangoAdmin ChangeList adds an ordering -pk to ensure
@@ -948,12 +970,14 @@ class JobAdmin(QFieldCloudModelAdmin):
         "type",
         "status",
         "error_type",
+        "container_stats__peak_memory",
+        "container_stats__cpu_seconds",
         "created_by__link",
         "created_at",
         "updated_at",
     )
     list_filter = ("type", "status", "updated_at", IsFinalizedJobFilter)
-    list_select_related = ("project", "project__owner", "created_by")
+    list_select_related = ("project", "project__owner", "created_by", "container_stats")
     exclude = ("feedback", "output")
     ordering = ("-updated_at",)
     search_fields = (
@@ -974,12 +998,131 @@ class JobAdmin(QFieldCloudModelAdmin):
         "finished_at",
         "docker_started_at",
         "docker_finished_at",
+        "container_stats__table",
         "output__pre",
         "feedback__pre",
     )
     has_direct_delete_permission = False
 
     change_form_template = "admin/job_change_form.html"
+    change_list_template = "admin/job_change_list.html"
+
+    # only the jobs updated within that window are summarized, as the percentiles cannot use an index
+    summary_window = timedelta(days=7)
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+
+        # NOTE the response might be a redirect, e.g. after an action
+        if isinstance(response, TemplateResponse) and "cl" in response.context_data:
+            jobs_qs = response.context_data["cl"].queryset.filter(
+                updated_at__gte=timezone.now() - self.summary_window
+            )
+            response.context_data["summary_window_days"] = self.summary_window.days
+            response.context_data["container_stats_summary"] = (
+                self.get_container_stats_summary(jobs_qs)
+            )
+            response.context_data["step_metrics_summary"] = (
+                self.get_step_metrics_summary(jobs_qs)
+            )
+
+        return response
+
+    def get_container_stats_summary(self, jobs_qs: QuerySet) -> list[dict[str, Any]]:
+        """Aggregates the container stats of the filtered jobs per job type, to help sizing the workers."""
+        rows = (
+            JobContainerStats.objects.filter(job__in=jobs_qs.values("pk"))
+            .values("job__type")
+            .annotate(
+                jobs_count=Count("pk"),
+                oom_killed_count=Count("pk", filter=Q(is_oom_killed=True)),
+                peak_memory_p50=PercentileCont("peak_memory_bytes", percentile=0.5),
+                peak_memory_p95=PercentileCont("peak_memory_bytes", percentile=0.95),
+                peak_memory_max=Max("peak_memory_bytes"),
+                cpu_seconds_p50=PercentileCont("cpu_seconds", percentile=0.5),
+                cpu_seconds_p95=PercentileCont("cpu_seconds", percentile=0.95),
+                cpu_seconds_max=Max("cpu_seconds"),
+                block_io_p95=PercentileCont(
+                    F("block_read_bytes") + F("block_write_bytes"), percentile=0.95
+                ),
+                network_p95=PercentileCont(
+                    F("network_rx_bytes") + F("network_tx_bytes"), percentile=0.95
+                ),
+            )
+            .order_by("job__type")
+        )
+
+        summary = []
+        for row in rows:
+            summary.append(
+                {
+                    "type": row["job__type"],
+                    "jobs_count": row["jobs_count"],
+                    "oom_killed_count": row["oom_killed_count"],
+                    "peak_memory_p50": filesizeformat(row["peak_memory_p50"]),
+                    "peak_memory_p95": filesizeformat(row["peak_memory_p95"]),
+                    "peak_memory_max": filesizeformat(row["peak_memory_max"]),
+                    "cpu_seconds_p50": f"{row['cpu_seconds_p50']:.1f}s",
+                    "cpu_seconds_p95": f"{row['cpu_seconds_p95']:.1f}s",
+                    "cpu_seconds_max": f"{row['cpu_seconds_max']:.1f}s",
+                    "block_io_p95": filesizeformat(row["block_io_p95"]),
+                    "network_p95": filesizeformat(row["network_p95"]),
+                }
+            )
+
+        return summary
+
+    def get_step_metrics_summary(self, jobs_qs: QuerySet) -> list[dict[str, Any]]:
+        """Aggregates the workflow step metrics of the filtered jobs per job type and step, to find which step dominates."""
+        rows = (
+            JobStepMetrics.objects.filter(job__in=jobs_qs.values("pk"))
+            .values("job__type", "step_id")
+            .annotate(
+                jobs_count=Count("job_id", distinct=True),
+                step_index=Min("step_index"),
+                wall_time_total=Sum("wall_time_s"),
+                wall_time_p50=PercentileCont("wall_time_s", percentile=0.5),
+                wall_time_p95=PercentileCont("wall_time_s", percentile=0.95),
+                cpu_time_p50=PercentileCont("cpu_time_s", percentile=0.5),
+                peak_rss_delta_p95=PercentileCont(
+                    "peak_rss_delta_bytes", percentile=0.95
+                ),
+                read_bytes_p95=PercentileCont("read_bytes", percentile=0.95),
+                write_bytes_p95=PercentileCont("write_bytes", percentile=0.95),
+            )
+            .order_by("job__type", "step_index")
+        )
+
+        wall_time_totals_by_type: dict[str, float] = {}
+        for row in rows:
+            wall_time_totals_by_type[row["job__type"]] = (
+                wall_time_totals_by_type.get(row["job__type"], 0)
+                + row["wall_time_total"]
+            )
+
+        summary = []
+        for row in rows:
+            wall_time_total_by_type = wall_time_totals_by_type[row["job__type"]]
+            wall_time_share = 0
+            if wall_time_total_by_type:
+                wall_time_share = row["wall_time_total"] / wall_time_total_by_type
+
+            summary.append(
+                {
+                    "type": row["job__type"],
+                    "step_id": row["step_id"],
+                    "jobs_count": row["jobs_count"],
+                    "wall_time_share": f"{wall_time_share:.0%}",
+                    "wall_time_p50": f"{row['wall_time_p50']:.1f}s",
+                    "wall_time_p95": f"{row['wall_time_p95']:.1f}s",
+                    "cpu_time_p50": f"{row['cpu_time_p50']:.1f}s",
+                    "peak_rss_delta_p95": filesizeformat(row["peak_rss_delta_p95"]),
+                    "read_bytes_p95": filesizeformat(row["read_bytes_p95"] or 0),
+                    "write_bytes_p95": filesizeformat(row["write_bytes_p95"] or 0),
+                }
+            )
+
+        return summary
 
     def get_queryset(self, request):
         return super().get_queryset(request).defer("output", "feedback")
@@ -1032,6 +1175,59 @@ class JobAdmin(QFieldCloudModelAdmin):
 
         return None
 
+    @admin.display(
+        ordering="container_stats__peak_memory_bytes", description=_("Peak memory")
+    )
+    def container_stats__peak_memory(self, instance):
+        container_stats = getattr(instance, "container_stats", None)
+
+        if not container_stats:
+            return None
+
+        return filesizeformat(container_stats.peak_memory_bytes)
+
+    @admin.display(ordering="container_stats__cpu_seconds", description=_("CPU time"))
+    def container_stats__cpu_seconds(self, instance):
+        container_stats = getattr(instance, "container_stats", None)
+
+        if not container_stats:
+            return None
+
+        return f"{container_stats.cpu_seconds:.1f}s"
+
+    @admin.display(description=_("Container stats"))
+    def container_stats__table(self, instance):
+        container_stats = getattr(instance, "container_stats", None)
+
+        if not container_stats:
+            return None
+
+        return format_html(
+            "<table>"
+            "<tr><th>{}</th><td>{} / {}</td></tr>"
+            "<tr><th>{}</th><td>{}s</td></tr>"
+            "<tr><th>{}</th><td>{} / {}</td></tr>"
+            "<tr><th>{}</th><td>{} / {}</td></tr>"
+            "<tr><th>{}</th><td>{}</td></tr>"
+            "<tr><th>{}</th><td>{}</td></tr>"
+            "</table>",
+            _("Peak memory / limit"),
+            filesizeformat(container_stats.peak_memory_bytes),
+            filesizeformat(container_stats.memory_limit_bytes),
+            _("CPU time"),
+            round(container_stats.cpu_seconds, 1),
+            _("Block I/O read / write"),
+            filesizeformat(container_stats.block_read_bytes),
+            filesizeformat(container_stats.block_write_bytes),
+            _("Network received / sent"),
+            filesizeformat(container_stats.network_rx_bytes),
+            filesizeformat(container_stats.network_tx_bytes),
+            _("Out of memory killed"),
+            container_stats.is_oom_killed,
+            _("Samples"),
+            container_stats.samples_count,
+        )
+
     @admin.display(ordering="project__owner")
     def project__owner(self, instance):
         return model_admin_url(instance.project.owner)
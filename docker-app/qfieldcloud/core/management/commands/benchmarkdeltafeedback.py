@@ -0,0 +1,119 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from qfieldcloud.core.models import ApplyJob, ApplyJobDelta, Delta, Job, Project
+from qfieldcloud.core.utils2 import jobs
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmark writing the delta feedback of an apply job, one row at a time vs in batches.
+
+        The deltas are created within a transaction that is always rolled back, so the database is left intact.
+        At least one project must exist, the fake deltas are created for it.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--deltas",
+            type=int,
+            nargs="+",
+            default=[10, 1_000, 10_000],
+            help="Number of deltas in the apply job to benchmark with.",
+        )
+
+    def handle(self, *args, **options):
+        project = Project.objects.first()
+
+        if not project:
+            raise CommandError("At least one project is required to run the benchmark.")
+
+        self.stdout.write(f"{'deltas':>10}{'per row s':>12}{'batched s':>12}")
+
+        for deltas_count in options["deltas"]:
+            with transaction.atomic():
+                apply_job, delta_feedback = self.create_apply_job(project, deltas_count)
+
+                started_at = time.perf_counter()
+                self.save_delta_feedback_per_row(apply_job, delta_feedback)
+                per_row_s = time.perf_counter() - started_at
+
+                started_at = time.perf_counter()
+                jobs.save_apply_job_delta_feedback(apply_job, delta_feedback)
+                batched_s = time.perf_counter() - started_at
+
+                self.stdout.write(
+                    f"{deltas_count:>10}{per_row_s:>12.3f}{batched_s:>12.3f}"
+                )
+
+                # NOTE never keep the fake deltas
+                transaction.set_rollback(True)
+
+    def create_apply_job(
+        self, project: Project, deltas_count: int
+    ) -> tuple[ApplyJob, list[dict]]:
+        apply_job = ApplyJob(
+            project=project,
+            created_by=project.owner,
+            type=Job.Type.DELTA_APPLY,
+            status=Job.Status.STARTED,
+            started_at=timezone.now(),
+            overwrite_conflicts=False,
+        )
+        # NOTE skip `Job.clean`, the benchmark should not depend on the subscription of the project owner
+        apply_job.save_base()
+
+        deltafile_id = uuid.uuid4()
+        client_id = uuid.uuid4()
+        deltas = Delta.objects.bulk_create(
+            [
+                Delta(
+                    deltafile_id=deltafile_id,
+                    client_id=client_id,
+                    project=project,
+                    content={"uuid": str(uuid.uuid4()), "method": "patch"},
+                    created_by=project.owner,
+                )
+                for _i in range(deltas_count)
+            ]
+        )
+        ApplyJobDelta.objects.bulk_create(
+            [ApplyJobDelta(apply_job=apply_job, delta=delta) for delta in deltas]
+        )
+
+        delta_feedback = [
+            {
+                "delta_id": str(delta.id),
+                "status": "status_applied",
+                "modified_pk": str(i),
+                "msg": "Successfully applied",
+            }
+            for i, delta in enumerate(deltas)
+        ]
+
+        return apply_job, delta_feedback
+
+    def save_delta_feedback_per_row(
+        self, apply_job: ApplyJob, delta_feedback: list[dict]
+    ) -> None:
+        """Writes the delta feedback with two `UPDATE` queries per delta, as it used to be done."""
+        for feedback in delta_feedback:
+            Delta.objects.filter(pk=feedback["delta_id"]).update(
+                last_status=Delta.Status.APPLIED,
+                last_feedback=feedback,
+                last_modified_pk=feedback["modified_pk"],
+                last_apply_attempt_at=apply_job.started_at,
+                last_apply_attempt_by=apply_job.created_by,
+            )
+
+            ApplyJobDelta.objects.filter(
+                apply_job_id=apply_job.id,
+                delta_id=feedback["delta_id"],
+            ).update(
+                status=Delta.Status.APPLIED,
+                feedback=feedback,
+                modified_pk=feedback["modified_pk"],
+            )
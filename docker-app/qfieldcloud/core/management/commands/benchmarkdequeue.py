@@ -0,0 +1,130 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from qfieldcloud.core.models import Job, Project
+from qfieldcloud.core.utils2 import jobs
+
+INSERT_JOBS_SQL = """
+    INSERT INTO core_job (
+        id,
+        project_id,
+        created_by_id,
+        type,
+        status,
+        created_at,
+        updated_at,
+        started_at,
+        finished_at,
+        container_id
+    )
+    SELECT
+        gen_random_uuid(),
+        (%(project_ids)s::uuid[])[1 + i %% %(projects_count)s],
+        (%(owner_ids)s::int[])[1 + i %% %(projects_count)s],
+        (ARRAY['package', 'delta_apply', 'process_projectfile'])[1 + i %% 3],
+        %(status)s,
+        now() - make_interval(secs => i),
+        now() - make_interval(secs => i),
+        CASE WHEN %(status)s = 'pending' THEN NULL ELSE now() - make_interval(secs => i) END,
+        CASE WHEN %(status)s = 'finished' THEN now() - make_interval(secs => i) ELSE NULL END,
+        ''
+    FROM generate_series(1, %(count)s) AS i
+"""
+
+
+class Command(BaseCommand):
+    help = """
+        Benchmark the dequeue query latency with a growing number of historical (finished) jobs.
+
+        The jobs are inserted within a transaction that is always rolled back, so the database is left intact.
+        At least one project must exist, the fake jobs are distributed over the existing projects.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--history",
+            type=int,
+            nargs="+",
+            default=[10_000, 1_000_000, 10_000_000],
+            help="Number of historical jobs to benchmark with.",
+        )
+        parser.add_argument(
+            "--pending",
+            type=int,
+            default=100,
+            help="Number of pending jobs in the queue.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=50,
+            help="Number of dequeue queries for each number of historical jobs.",
+        )
+        parser.add_argument("--explain", action="store_true")
+
+    def handle(self, *args, **options):
+        projects = list(Project.objects.values_list("id", "owner_id")[:100])
+
+        if not projects:
+            raise CommandError("At least one project is required to run the benchmark.")
+
+        params = {
+            "project_ids": [str(project_id) for project_id, _owner_id in projects],
+            "owner_ids": [owner_id for _project_id, owner_id in projects],
+            "projects_count": len(projects),
+        }
+
+        self.stdout.write(
+            f"{'history':>12}{'pending':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    INSERT_JOBS_SQL,
+                    {
+                        **params,
+                        "status": Job.Status.PENDING,
+                        "count": options["pending"],
+                    },
+                )
+
+                history_count = 0
+                for target_count in sorted(options["history"]):
+                    cursor.execute(
+                        INSERT_JOBS_SQL,
+                        {
+                            **params,
+                            "status": Job.Status.FINISHED,
+                            "count": target_count - history_count,
+                        },
+                    )
+                    history_count = target_count
+
+                    cursor.execute("ANALYZE core_job")
+
+                    durations_ms = []
+                    for _i in range(options["repeat"]):
+                        started_at = time.perf_counter()
+                        list(jobs.get_dequeueable_jobs()[:1])
+                        durations_ms.append((time.perf_counter() - started_at) * 1000)
+
+                    durations_ms.sort()
+                    p50 = statistics.median(durations_ms)
+                    p99 = durations_ms[
+                        min(len(durations_ms) - 1, int(len(durations_ms) * 0.99))
+                    ]
+
+                    self.stdout.write(
+                        f"{history_count:>12}{options['pending']:>10}{p50:>10.2f}{p99:>10.2f}{durations_ms[-1]:>10.2f}"
+                    )
+
+                    if options["explain"]:
+                        self.stdout.write(
+                            jobs.get_dequeueable_jobs()[:1].explain(analyze=True)
+                        )
+
+            # NOTE never keep the fake jobs
+            transaction.set_rollback(True)
@@ -1,22 +1,28 @@
 import logging
+import select
 import signal
-from time import sleep
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from constance import config
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand
 from django.db import connection, transaction
-from django.db.models import Q
 from qfieldcloud.core.models import Job
+from qfieldcloud.core.utils2 import jobs
 from worker_wrapper.wrapper import (
     DeltaApplyJobRun,
     PackageJobRun,
     ProcessProjectfileJobRun,
     cancel_orphaned_workers,
+    warm_worker_pool,
 )
 
 SECONDS = 5
 
+# NOTE the channel is notified by the `core_job_notify_*` triggers, see `sql_config.py`
+JOBS_NOTIFY_CHANNEL = "qfieldcloud_jobs"
+
 
 class GracefulKiller:
     alive = True
@@ -36,10 +42,29 @@ class Command(BaseCommand):
         parser.add_argument(
             "--single-shot", action="store_true", help="Don't run infinite loop."
         )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Maximum number of jobs to run in parallel within this process.",
+        )
 
     def handle(self, *args, **options):
         logging.info("Dequeue QFieldCloud Jobs from the DB")
         killer = GracefulKiller()
+        concurrency = max(options["concurrency"], 1)
+        executor = None
+        running_jobs: dict[Future, Job] = {}
+
+        if concurrency > 1:
+            logging.info(f"Running up to {concurrency} jobs in parallel")
+            executor = ThreadPoolExecutor(
+                max_workers=concurrency,
+                thread_name_prefix="jobrun",
+            )
+
+        # remove the warm workers left from a previous run of this wrapper
+        warm_worker_pool.clear()
 
         while killer.alive:
             # the worker-wrapper caches outdated ContentType ids during tests since
@@ -58,55 +83,121 @@ class Command(BaseCommand):
                         "Expected `worker_wrapper` to be connected to the master DB node!"
                     )
 
-            queued_job = None
+            for future in [f for f in running_jobs if f.done()]:
+                running_jobs.pop(future)
 
-            with transaction.atomic():
-                with connection.cursor() as cursor:
-                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
-
-                busy_projects_ids_qs = Job.objects.filter(
-                    status__in=[
-                        Job.Status.QUEUED,
-                        Job.Status.STARTED,
-                    ]
-                ).values("project_id")
-
-                # select all the pending jobs, that their project has no other active job or `is_locked` flag is `True`
-                jobs_qs = (
-                    Job.objects.select_for_update(skip_locked=True)
-                    .filter(status=Job.Status.PENDING)
-                    .exclude(
-                        Q(project_id__in=busy_projects_ids_qs)
-                        # skip all projects that are currently locked, most probably because of file transfer
-                        | Q(project__is_locked=True),
-                    )
-                    .order_by("created_at")
-                )
+            # prepare warm workers, so the next jobs do not wait for the QGIS worker container to start
+            warm_worker_pool.fill(config.WORKER_QGIS_WARM_POOL_SIZE)
 
-                # each `worker_wrapper` or `dequeue.py` script can handle only one job and we handle the oldest
-                queued_job = jobs_qs.first()
+            queued_job = None
 
-                # there might be no jobs in the queue
-                if queued_job:
-                    logging.info(f"Dequeued job {queued_job.id}, run!")
-                    queued_job.status = Job.Status.QUEUED
-                    queued_job.save(update_fields=["status"])
+            # do not dequeue more jobs than we can run
+            if len(running_jobs) < concurrency:
+                queued_job = self._dequeue()
 
             if queued_job:
-                self._run(queued_job)
+                if executor:
+                    future = executor.submit(self._run_in_thread, queued_job)
+                    running_jobs[future] = queued_job
+                else:
+                    self._run(queued_job)
+
                 queued_job = None
             else:
-                if options["single_shot"]:
+                if options["single_shot"] and not running_jobs:
                     break
 
+                # wait for a job notification, but still poll every `SECONDS` as a safety net
                 for _i in range(SECONDS):
-                    if killer.alive:
-                        cancel_orphaned_workers()
-                        sleep(1)
+                    if not killer.alive:
+                        break
 
-            if options["single_shot"]:
+                    cancel_orphaned_workers()
+
+                    if self._wait_for_jobs_notification(timeout=1):
+                        break
+
+            if options["single_shot"] and not running_jobs:
                 break
 
+        if executor:
+            logging.info(f"Waiting for {len(running_jobs)} running job(s) to finish…")
+            executor.shutdown(wait=True)
+
+        warm_worker_pool.clear()
+
+    def _dequeue(self) -> Job | None:
+        """Marks the next pending job that can be run as queued and returns it.
+
+        The order of the pending jobs is determined by `jobs.order_pending_jobs`.
+
+        Returns:
+            Job | None: the queued job or None if there is no job to be run.
+        """
+        queued_job = None
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+            jobs_qs = jobs.get_dequeueable_jobs()
+
+            # NOTE the jobs are dequeued one by one, even when running concurrently.
+            # The job is committed as `QUEUED` before the next dequeue, so the busy projects
+            # subquery keeps the per-project exclusivity within the same process too.
+            queued_job = jobs_qs.first()
+
+            # there might be no jobs in the queue
+            if queued_job:
+                logging.info(f"Dequeued job {queued_job.id}, run!")
+                queued_job.status = Job.Status.QUEUED
+                queued_job.save(update_fields=["status"])
+
+        return queued_job
+
+    def _wait_for_jobs_notification(self, timeout: float) -> bool:
+        """Blocks until a job notification is received or the timeout expires.
+
+        Args:
+            timeout (float): maximum time to wait in seconds.
+
+        Returns:
+            bool: True if there was a notification, False on timeout.
+        """
+        with connection.cursor() as cursor:
+            # NOTE `LISTEN` is idempotent, we repeat it in case the DB connection has been reestablished
+            cursor.execute(f"LISTEN {JOBS_NOTIFY_CHANNEL}")
+
+        pg_connection = connection.connection
+
+        # NOTE notifications might have been already received while executing other queries
+        pg_connection.poll()
+
+        if not pg_connection.notifies:
+            readable, _writable, _exceptional = select.select(
+                [pg_connection], [], [], timeout
+            )
+
+            if not readable:
+                return False
+
+            pg_connection.poll()
+
+        has_notifications = len(pg_connection.notifies) > 0
+
+        pg_connection.notifies.clear()
+
+        return has_notifications
+
+    def _run_in_thread(self, job: Job) -> None:
+        try:
+            self._run(job)
+        except Exception as err:
+            logging.exception(f"Failed to run job {job.id}", exc_info=err)
+        finally:
+            # NOTE each thread gets its own DB connection, make sure it is not left open
+            connection.close()
+
     def _run(self, job: Job):
         job_run_classes = {
             Job.Type.PACKAGE: PackageJobRun,
@@ -0,0 +1,197 @@
+import heapq
+import random
+import statistics
+from dataclasses import dataclass, field
+
+from constance import config
+from django.core.management.base import BaseCommand
+from qfieldcloud.core.models import Job
+from qfieldcloud.core.utils2.jobs import get_job_type_priorities
+
+# mean job durations in seconds, roughly what is observed in production
+JOB_DURATIONS_S = {
+    Job.Type.DELTA_APPLY: 8,
+    Job.Type.PACKAGE: 90,
+    Job.Type.PROCESS_PROJECTFILE: 25,
+}
+
+
+@dataclass
+class SimulatedJob:
+    id: int
+    type: str
+    owner: str
+    project: str
+    created_at: float
+    duration: float
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+@dataclass
+class SimulatedQueue:
+    policy: str
+    workers: int
+    pending: list[SimulatedJob] = field(default_factory=list)
+    running: list[tuple[float, int, SimulatedJob]] = field(default_factory=list)
+    owner_last_started_at: dict[str, float] = field(default_factory=dict)
+
+    def get_sort_key(self, job: SimulatedJob, now: float) -> tuple:
+        """Mirrors the ordering of `order_pending_jobs`, but in Python."""
+        if self.policy == "fifo":
+            return (job.created_at, job.id)
+
+        priorities = get_job_type_priorities()
+        priority = priorities[job.type]
+
+        if (
+            config.WORKER_JOB_PRIORITY_AGING_S > 0
+            and now - job.created_at > config.WORKER_JOB_PRIORITY_AGING_S
+        ):
+            priority = 0
+
+        if config.WORKER_FAIR_SHARE:
+            active_count = sum(1 for _, _, j in self.running if j.owner == job.owner)
+            last_started_at = self.owner_last_started_at.get(job.owner, float("-inf"))
+
+            return (priority, active_count, last_started_at, job.created_at, job.id)
+
+        return (priority, job.created_at, job.id)
+
+    def dequeue(self, now: float) -> SimulatedJob | None:
+        busy_projects = {j.project for _, _, j in self.running}
+        candidates = [j for j in self.pending if j.project not in busy_projects]
+
+        if not candidates:
+            return None
+
+        job = min(candidates, key=lambda j: self.get_sort_key(j, now))
+        self.pending.remove(job)
+
+        return job
+
+    def run(self, jobs: list[SimulatedJob]) -> list[SimulatedJob]:
+        arrivals = sorted(jobs, key=lambda j: j.created_at)
+        finished = []
+        now = 0.0
+
+        while arrivals or self.pending or self.running:
+            next_arrival_at = arrivals[0].created_at if arrivals else float("inf")
+            next_finish_at = self.running[0][0] if self.running else float("inf")
+            now = min(next_arrival_at, next_finish_at)
+
+            while arrivals and arrivals[0].created_at <= now:
+                self.pending.append(arrivals.pop(0))
+
+            while self.running and self.running[0][0] <= now:
+                _, _, job = heapq.heappop(self.running)
+                job.finished_at = now
+                finished.append(job)
+
+            while len(self.running) < self.workers:
+                job = self.dequeue(now)
+
+                if not job:
+                    break
+
+                job.started_at = now
+                self.owner_last_started_at[job.owner] = now
+                heapq.heappush(self.running, (now + job.duration, job.id, job))
+
+        return finished
+
+
+class Command(BaseCommand):
+    help = """
+        Simulate the job queue under a skewed load and report the queue wait percentiles.
+
+        One heavy owner uploads many projects at once, while many light owners keep submitting
+        few jobs over time. The simulation runs the same load with plain FIFO ordering and with
+        the configured scheduling policy, see `WORKER_JOB_TYPE_PRIORITIES`, `WORKER_JOB_PRIORITY_AGING_S`
+        and `WORKER_FAIR_SHARE`.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--heavy-owner-projects", type=int, default=500)
+        parser.add_argument("--light-owners", type=int, default=50)
+        parser.add_argument("--light-owner-jobs", type=int, default=10)
+        parser.add_argument(
+            "--duration",
+            type=int,
+            default=4 * 3600,
+            help="Time window in seconds within which the light owners submit their jobs.",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        for policy in ("fifo", "scheduled"):
+            jobs = self.generate_jobs(options)
+            queue = SimulatedQueue(policy=policy, workers=options["workers"])
+            finished = queue.run(jobs)
+
+            self.stdout.write(f"\nPolicy: {policy}")
+            self.stdout.write(
+                f"{'group':<40}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"
+            )
+
+            groups: dict[str, list[float]] = {}
+            for job in finished:
+                assert job.started_at is not None
+
+                owner_group = "heavy" if job.owner == "heavy" else "light"
+                wait_s = job.started_at - job.created_at
+
+                groups.setdefault("all", []).append(wait_s)
+                groups.setdefault(f"owner={owner_group}", []).append(wait_s)
+                groups.setdefault(f"type={job.type}", []).append(wait_s)
+                groups.setdefault(f"owner={owner_group} type={job.type}", []).append(
+                    wait_s
+                )
+
+            for name, waits in sorted(groups.items()):
+                self.stdout.write(self.format_percentiles(name, waits))
+
+    def generate_jobs(self, options) -> list[SimulatedJob]:
+        rnd = random.Random(options["seed"])
+        jobs = []
+
+        def add_job(job_type: str, owner: str, project: str, created_at: float):
+            jobs.append(
+                SimulatedJob(
+                    id=len(jobs),
+                    type=job_type,
+                    owner=owner,
+                    project=project,
+                    created_at=created_at,
+                    duration=rnd.expovariate(1 / JOB_DURATIONS_S[job_type]),
+                )
+            )
+
+        # the heavy owner uploads all the projects at once, each needs processing and packaging
+        for i in range(options["heavy_owner_projects"]):
+            created_at = i * 0.5
+            add_job(Job.Type.PROCESS_PROJECTFILE, "heavy", f"heavy-{i}", created_at)
+            add_job(Job.Type.PACKAGE, "heavy", f"heavy-{i}", created_at + 0.1)
+
+        # the light owners synchronize from the field over time
+        for i in range(options["light_owners"]):
+            for _j in range(options["light_owner_jobs"]):
+                created_at = rnd.uniform(0, options["duration"])
+                job_type = rnd.choice(
+                    [Job.Type.DELTA_APPLY, Job.Type.DELTA_APPLY, Job.Type.PACKAGE]
+                )
+                add_job(job_type, f"light-{i}", f"light-{i}", created_at)
+
+        return jobs
+
+    def format_percentiles(self, name: str, waits: list[float]) -> str:
+        waits = sorted(waits)
+
+        if len(waits) > 1:
+            quantiles = statistics.quantiles(waits, n=100, method="inclusive")
+            p50, p90, p99 = quantiles[49], quantiles[89], quantiles[98]
+        else:
+            p50 = p90 = p99 = waits[0]
+
+        return f"{name:<40}{len(waits):>8}{p50:>10.1f}{p90:>10.1f}{p99:>10.1f}{waits[-1]:>10.1f}"
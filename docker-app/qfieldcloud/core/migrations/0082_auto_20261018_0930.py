@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 09:30
+
+import migrate_sql.operations
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0081_file_storage_project_and_more"),
+    ]
+
+    operations = [
+        migrate_sql.operations.CreateSQL(
+            name="core_job_notify_trigger_func",
+            sql="\n            CREATE OR REPLACE FUNCTION core_job_notify_trigger_func()\n            RETURNS trigger\n            AS\n            $$\n                BEGIN\n                    -- NOTE the notification is delivered only after the transaction is committed\n                    PERFORM pg_notify('qfieldcloud_jobs', NEW.id::text);\n\n                    RETURN NULL;\n                END;\n            $$\n            LANGUAGE PLPGSQL\n        ",
+            reverse_sql="\n            DROP FUNCTION IF EXISTS core_job_notify_trigger_func()\n        ",
+        ),
+        migrate_sql.operations.CreateSQL(
+            name="core_job_notify_insert_trigger",
+            sql="\n            CREATE TRIGGER core_job_notify_insert_trigger AFTER INSERT ON core_job\n            FOR EACH ROW\n            WHEN (NEW.status = 'pending')\n            EXECUTE FUNCTION core_job_notify_trigger_func()\n        ",
+            reverse_sql="\n            DROP TRIGGER IF EXISTS core_job_notify_insert_trigger ON core_job\n        ",
+        ),
+        migrate_sql.operations.CreateSQL(
+            name="core_job_notify_update_trigger",
+            sql="\n            CREATE TRIGGER core_job_notify_update_trigger AFTER UPDATE OF status ON core_job\n            FOR EACH ROW\n            -- a job moved back to pending, or a finalized job that might have been blocking other pending jobs of the same project\n            WHEN (\n                OLD.status IS DISTINCT FROM NEW.status\n                AND NEW.status IN ('pending', 'finished', 'stopped', 'failed')\n            )\n            EXECUTE FUNCTION core_job_notify_trigger_func()\n        ",
+            reverse_sql="\n            DROP TRIGGER IF EXISTS core_job_notify_update_trigger ON core_job\n        ",
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0082_auto_20261018_0930"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobLogChunk",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("offset", models.PositiveBigIntegerField()),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="log_chunks",
+                        to="core.job",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="joblogchunk",
+            constraint=models.UniqueConstraint(
+                fields=("job", "offset"), name="joblogchunk_job_offset_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:47
+
+import migrate_sql.operations
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0083_joblogchunk"),
+    ]
+
+    operations = [
+        migrate_sql.operations.CreateSQL(
+            name="core_job_pending_idx",
+            sql="\n            -- NOTE only the pending jobs are indexed, so the dequeue does not depend on the number of finished jobs\n            CREATE INDEX IF NOT EXISTS core_job_pending_idx ON core_job (created_at)\n            WHERE status = 'pending'\n        ",
+            reverse_sql="\n            DROP INDEX IF EXISTS core_job_pending_idx\n        ",
+        ),
+        migrate_sql.operations.CreateSQL(
+            name="core_job_active_project_idx",
+            sql="\n            CREATE INDEX IF NOT EXISTS core_job_active_project_idx ON core_job (project_id)\n            WHERE status IN ('queued', 'started')\n        ",
+            reverse_sql="\n            DROP INDEX IF EXISTS core_job_active_project_idx\n        ",
+        ),
+        migrate_sql.operations.CreateSQL(
+            name="core_job_started_at_idx",
+            sql="\n            CREATE INDEX IF NOT EXISTS core_job_started_at_idx ON core_job (started_at)\n            WHERE started_at IS NOT NULL\n        ",
+            reverse_sql="\n            DROP INDEX IF EXISTS core_job_started_at_idx\n        ",
+        ),
+    ]
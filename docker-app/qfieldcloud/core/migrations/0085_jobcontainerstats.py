@@ -0,0 +1,42 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0084_auto_20261018_1147"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobContainerStats",
+            fields=[
+                (
+                    "job",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="container_stats",
+                        serialize=False,
+                        to="core.job",
+                    ),
+                ),
+                ("peak_memory_bytes", models.PositiveBigIntegerField(default=0)),
+                ("memory_limit_bytes", models.PositiveBigIntegerField(default=0)),
+                ("cpu_seconds", models.FloatField(default=0)),
+                ("block_read_bytes", models.PositiveBigIntegerField(default=0)),
+                ("block_write_bytes", models.PositiveBigIntegerField(default=0)),
+                ("network_rx_bytes", models.PositiveBigIntegerField(default=0)),
+                ("network_tx_bytes", models.PositiveBigIntegerField(default=0)),
+                ("samples_count", models.PositiveIntegerField(default=0)),
+                ("is_oom_killed", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Job: container stats",
+                "verbose_name_plural": "Jobs: container stats",
+            },
+        ),
+    ]
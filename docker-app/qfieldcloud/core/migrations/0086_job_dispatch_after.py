@@ -0,0 +1,17 @@
+# Generated by Django 4.2.19 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0085_jobcontainerstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="dispatch_after",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
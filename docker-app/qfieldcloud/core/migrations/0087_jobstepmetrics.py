@@ -0,0 +1,53 @@
+# Generated by Django 4.2.19 on 2026-10-18 13:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0086_job_dispatch_after"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobStepMetrics",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("step_index", models.PositiveSmallIntegerField()),
+                ("step_id", models.CharField(max_length=100)),
+                ("stage", models.PositiveSmallIntegerField(default=0)),
+                ("wall_time_s", models.FloatField(default=0)),
+                ("cpu_time_s", models.FloatField(default=0)),
+                ("peak_rss_delta_bytes", models.PositiveBigIntegerField(default=0)),
+                ("read_bytes", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("write_bytes", models.PositiveBigIntegerField(blank=True, null=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="step_metrics",
+                        to="core.job",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Job: step metrics",
+                "verbose_name_plural": "Jobs: step metrics",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="jobstepmetrics",
+            constraint=models.UniqueConstraint(
+                fields=("job", "step_index"), name="jobstepmetrics_job_step_index_uniq"
+            ),
+        ),
+    ]
@@ -1888,6 +1888,8 @@ class Job(models.Model):
     container_id = models.CharField(
         max_length=64, default="", blank=True, db_index=True
     )
+    # the pending job is not dequeued before that time, so more requests can be coalesced into it
+    dispatch_after = models.DateTimeField(blank=True, null=True, editable=False)
 
     @property
     def short_id(self) -> str:
@@ -2046,6 +2048,102 @@ class ApplyJobDelta(models.Model):
         return f"{self.apply_job_id}:{self.delta_id}"
 
 
+class JobLogChunk(models.Model):
+    """A piece of the worker container output, stored while the job is still running.
+
+    Once the job is over, the chunks are concatenated into `Job.output` and deleted.
+    """
+
+    job_id: uuid.UUID
+
+    job = models.ForeignKey(
+        Job,
+        on_delete=models.CASCADE,
+        related_name="log_chunks",
+    )
+    # the position of the first character of the chunk within the whole job output
+    offset = models.PositiveBigIntegerField()
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "offset"],
+                name="joblogchunk_job_offset_uniq",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.job_id}:{self.offset}"
+
+
+class JobContainerStats(models.Model):
+    """Resource usage of the worker container that executed the job, sampled from `docker stats`."""
+
+    job_id: uuid.UUID
+
+    job = models.OneToOneField(
+        Job,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="container_stats",
+    )
+    # the maximum memory used by the container, excluding the inactive page cache
+    peak_memory_bytes = models.PositiveBigIntegerField(default=0)
+    memory_limit_bytes = models.PositiveBigIntegerField(default=0)
+    cpu_seconds = models.FloatField(default=0)
+    block_read_bytes = models.PositiveBigIntegerField(default=0)
+    block_write_bytes = models.PositiveBigIntegerField(default=0)
+    network_rx_bytes = models.PositiveBigIntegerField(default=0)
+    network_tx_bytes = models.PositiveBigIntegerField(default=0)
+    samples_count = models.PositiveIntegerField(default=0)
+    is_oom_killed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Job: container stats"
+        verbose_name_plural = "Jobs: container stats"
+
+    def __str__(self):
+        return f"{self.job_id}"
+
+
+class JobStepMetrics(models.Model):
+    """Resource usage of a single workflow step of the job, as reported in the job feedback."""
+
+    job_id: uuid.UUID
+
+    job = models.ForeignKey(
+        Job,
+        on_delete=models.CASCADE,
+        related_name="step_metrics",
+    )
+    # the position of the step within the workflow
+    step_index = models.PositiveSmallIntegerField()
+    step_id = models.CharField(max_length=100)
+    # 0 - not started, 1 - started, 2 - finished
+    stage = models.PositiveSmallIntegerField(default=0)
+    wall_time_s = models.FloatField(default=0)
+    cpu_time_s = models.FloatField(default=0)
+    # how much the step raised the peak memory of the worker process
+    peak_rss_delta_bytes = models.PositiveBigIntegerField(default=0)
+    read_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    write_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Job: step metrics"
+        verbose_name_plural = "Jobs: step metrics"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "step_index"], name="jobstepmetrics_job_step_index_uniq"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} {self.step_id}"
+
+
 class Secret(models.Model):
     class Type(models.TextChoices):
         PGSERVICE = "pgservice", _("pg_service")
@@ -490,9 +490,21 @@ class ApplyJobSerializer(JobMixin, serializers.ModelSerializer):
 
 
 class ProcessProjectfileJobSerializer(JobMixin, serializers.ModelSerializer):
+    def get_lastest_not_finished_job(self) -> Job | None:
+        # NOTE only the pending job is reused, the queued or started one might have missed the latest project changes
+        return (
+            ProcessProjectfileJob.objects.filter(
+                project=self.initial_data.get("project_id"),  # type: ignore
+                status=Job.Status.PENDING,
+            )
+            .only("id")
+            .order_by("created_at")
+            .first()
+        )
+
     class Meta(JobMixin.Meta):
         model = ProcessProjectfileJob
-        allow_parallel_jobs = True
+        allow_parallel_jobs = False
 
 
 class JobSerializer(serializers.ModelSerializer):
@@ -250,6 +250,85 @@ sql_items = [
             DROP TRIGGER IF EXISTS core_delta_geom_insert_trigger ON core_delta
         """,
     ),
+    SQLItem(
+        "core_job_notify_trigger_func",
+        r"""
+            CREATE OR REPLACE FUNCTION core_job_notify_trigger_func()
+            RETURNS trigger
+            AS
+            $$
+                BEGIN
+                    -- NOTE the notification is delivered only after the transaction is committed
+                    PERFORM pg_notify('qfieldcloud_jobs', NEW.id::text);
+
+                    RETURN NULL;
+                END;
+            $$
+            LANGUAGE PLPGSQL
+        """,
+        r"""
+            DROP FUNCTION IF EXISTS core_job_notify_trigger_func()
+        """,
+    ),
+    SQLItem(
+        "core_job_notify_insert_trigger",
+        r"""
+            CREATE TRIGGER core_job_notify_insert_trigger AFTER INSERT ON core_job
+            FOR EACH ROW
+            WHEN (NEW.status = 'pending')
+            EXECUTE FUNCTION core_job_notify_trigger_func()
+        """,
+        r"""
+            DROP TRIGGER IF EXISTS core_job_notify_insert_trigger ON core_job
+        """,
+    ),
+    SQLItem(
+        "core_job_notify_update_trigger",
+        r"""
+            CREATE TRIGGER core_job_notify_update_trigger AFTER UPDATE OF status ON core_job
+            FOR EACH ROW
+            -- a job moved back to pending, or a finalized job that might have been blocking other pending jobs of the same project
+            WHEN (
+                OLD.status IS DISTINCT FROM NEW.status
+                AND NEW.status IN ('pending', 'finished', 'stopped', 'failed')
+            )
+            EXECUTE FUNCTION core_job_notify_trigger_func()
+        """,
+        r"""
+            DROP TRIGGER IF EXISTS core_job_notify_update_trigger ON core_job
+        """,
+    ),
+    SQLItem(
+        "core_job_pending_idx",
+        r"""
+            -- NOTE only the pending jobs are indexed, so the dequeue does not depend on the number of finished jobs
+            CREATE INDEX IF NOT EXISTS core_job_pending_idx ON core_job (created_at)
+            WHERE status = 'pending'
+        """,
+        r"""
+            DROP INDEX IF EXISTS core_job_pending_idx
+        """,
+    ),
+    SQLItem(
+        "core_job_active_project_idx",
+        r"""
+            CREATE INDEX IF NOT EXISTS core_job_active_project_idx ON core_job (project_id)
+            WHERE status IN ('queued', 'started')
+        """,
+        r"""
+            DROP INDEX IF EXISTS core_job_active_project_idx
+        """,
+    ),
+    SQLItem(
+        "core_job_started_at_idx",
+        r"""
+            CREATE INDEX IF NOT EXISTS core_job_started_at_idx ON core_job (started_at)
+            WHERE started_at IS NOT NULL
+        """,
+        r"""
+            DROP INDEX IF EXISTS core_job_started_at_idx
+        """,
+    ),
     SQLItem(
         "core_user_email_partial_uniq",
         r"""
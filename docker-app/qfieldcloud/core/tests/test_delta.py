@@ -1058,6 +1058,59 @@ class QfcTestCase(APITransactionTestCase):
             self.assertEqual(features[1]["properties"]["int"], 2)
             self.assertEqual(features[2]["properties"]["int"], 3)
 
+    def test_push_apply_delta_file_with_feature_chains(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token1.key)
+        project = self.upload_project_files(self.project1)
+
+        # the create, patch and delete deltas of the same features are compacted, but each delta gets its own status
+        self.upload_and_check_deltas(
+            project=project,
+            delta_filename="singlelayer_multidelta_feature_chains.json",
+            token=self.token1.key,
+            final_values=[
+                [
+                    "5c0b1f0e-2a46-4c47-9d2e-3f7a1d0e8b01",
+                    "STATUS_APPLIED",
+                    self.user1.username,
+                ],
+                [
+                    "7e4d9a3c-1b5f-4e8a-a6c2-9d0f3b7e5a12",
+                    "STATUS_APPLIED",
+                    self.user1.username,
+                ],
+                [
+                    "a19f3c7d-6e2b-4d58-8c0a-5b7e1f9d3c23",
+                    "STATUS_APPLIED",
+                    self.user1.username,
+                ],
+                [
+                    "c3e8b5a1-9d4f-4a27-b6e0-1f8c7d2a5e34",
+                    "STATUS_APPLIED",
+                    self.user1.username,
+                ],
+                [
+                    "e6a2d8f4-3c1b-4f95-9e7d-0a4b6c8e2f45",
+                    "STATUS_APPLIED",
+                    self.user1.username,
+                ],
+                [
+                    "f8b4c2e6-5a3d-4b71-8f9e-2c6d0e4a7b56",
+                    "STATUS_APPLIED",
+                    self.user1.username,
+                ],
+            ],
+        )
+
+        gpkg = io.BytesIO(self.get_file_contents(project, "testdata.gpkg"))
+        with fiona.open(gpkg, "r", layer="points_xy") as layer:
+            features = list(layer)
+
+            self.assertEqual(len(features), 4)
+            self.assertEqual(features[0]["properties"]["int"], 1)
+            self.assertEqual(features[1]["properties"]["int"], 2)
+            self.assertEqual(features[2]["properties"]["int"], 3)
+            self.assertEqual(features[3]["properties"]["int"], 2002)
+
     def get_file_contents(self, project, filename):
         response = self.client.get(f"/api/v1/files/{project.id}/{filename}/")
 
@@ -1,16 +1,29 @@
 import logging
+import uuid
+from datetime import timedelta
+from unittest import mock
 
+from constance.test import override_config
+from django.db import connection, transaction
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.test import APITransactionTestCase
 
 from qfieldcloud.authentication.models import AuthToken
 from qfieldcloud.core.models import (
+    ApplyJob,
+    ApplyJobDelta,
+    Delta,
     Job,
+    JobContainerStats,
+    JobLogChunk,
     PackageJob,
     Person,
+    ProcessProjectfileJob,
     Project,
 )
+from qfieldcloud.core.utils2 import jobs
 
 from .utils import (
     set_subscription,
@@ -210,3 +223,407 @@ class QfcTestCase(APITransactionTestCase):
             is_localized=False,
             error_code="invalid_dataprovider",
         )
+
+    def test_job_logs_by_offset(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.t1.key)
+
+        job = ProcessProjectfileJob.objects.create(
+            project=self.p1,
+            created_by=self.u1,
+            status=Job.Status.STARTED,
+        )
+        JobLogChunk.objects.create(job=job, offset=0, content="Hello ")
+        JobLogChunk.objects.create(job=job, offset=6, content="world!")
+
+        # the job is running, the output is read from the chunks
+        response = self.client.get(f"/api/v1/jobs/{job.id}/logs/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["output"], "Hello world!")
+        self.assertEqual(response.json()["offset"], 12)
+        self.assertFalse(response.json()["is_finished"])
+
+        # the offset points in the middle of a chunk
+        response = self.client.get(f"/api/v1/jobs/{job.id}/logs/?offset=8")
+
+        self.assertEqual(response.json()["output"], "rld!")
+        self.assertEqual(response.json()["offset"], 12)
+
+        # the job is finished, the output is read from `Job.output`
+        job.output = "Hello world!\nBye!"
+        job.status = Job.Status.FINISHED
+        job.save(update_fields=["output", "status"])
+        JobLogChunk.objects.filter(job=job).delete()
+
+        response = self.client.get(f"/api/v1/jobs/{job.id}/logs/?offset=12")
+
+        self.assertEqual(response.json()["output"], "\nBye!")
+        self.assertEqual(response.json()["offset"], 17)
+        self.assertTrue(response.json()["is_finished"])
+
+        # other users cannot read the logs
+        u2 = Person.objects.create_user(username="u2", password="abc123")
+        t2 = AuthToken.objects.get_or_create(user=u2)[0]
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + t2.key)
+
+        response = self.client.get(f"/api/v1/jobs/{job.id}/logs/")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_coalesce_pending_process_projectfile_jobs(self):
+        job = jobs.get_or_create_pending_job(
+            ProcessProjectfileJob, self.p1, self.u1, settle_s=60
+        )
+
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertIsNotNone(job.dispatch_after)
+
+        # the following requests are coalesced into the pending job, which is postponed
+        for _i in range(5):
+            coalesced_job = jobs.get_or_create_pending_job(
+                ProcessProjectfileJob, self.p1, self.u1, settle_s=60
+            )
+
+            self.assertEqual(coalesced_job.id, job.id)
+
+        self.assertEqual(
+            ProcessProjectfileJob.objects.filter(project=self.p1).count(), 1
+        )
+
+        # the job is not dequeued before the end of the settle window
+        with transaction.atomic():
+            self.assertNotIn(job.id, [j.id for j in jobs.get_dequeueable_jobs()])
+
+        job.refresh_from_db()
+        job.dispatch_after = timezone.now()
+        job.save(update_fields=["dispatch_after"])
+
+        with transaction.atomic():
+            self.assertIn(job.id, [j.id for j in jobs.get_dequeueable_jobs()])
+
+        # the started job might have missed the latest changes, so a new job is created
+        job.status = Job.Status.STARTED
+        job.save(update_fields=["status"])
+
+        new_job = jobs.get_or_create_pending_job(
+            ProcessProjectfileJob, self.p1, self.u1
+        )
+
+        self.assertNotEqual(new_job.id, job.id)
+        self.assertIsNone(new_job.dispatch_after)
+
+    def test_job_notifications(self):
+        # NOTE the tests use the same DB connection, so they receive their own notifications
+        with connection.cursor() as cursor:
+            cursor.execute("LISTEN qfieldcloud_jobs")
+
+        pg_connection = connection.connection
+        pg_connection.poll()
+        pg_connection.notifies.clear()
+
+        def pop_notified_job_ids() -> list[str]:
+            pg_connection.poll()
+            job_ids = [n.payload for n in pg_connection.notifies]
+            pg_connection.notifies.clear()
+
+            return job_ids
+
+        # postpone the job, so it is not picked by a running worker
+        dispatch_after = timezone.now() + timedelta(hours=1)
+
+        # the notification is delivered only after the transaction is committed
+        with transaction.atomic():
+            job = ProcessProjectfileJob.objects.create(
+                project=self.p1, created_by=self.u1, dispatch_after=dispatch_after
+            )
+
+            self.assertEqual(pop_notified_job_ids(), [])
+
+        self.assertEqual(pop_notified_job_ids(), [str(job.id)])
+
+        # a started job does not make another job dequeueable
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.STARTED)
+
+        self.assertEqual(pop_notified_job_ids(), [])
+
+        # a finalized job might have been blocking other pending jobs of the same project
+        Job.objects.filter(pk=job.pk).update(status=Job.Status.FINISHED)
+
+        self.assertEqual(pop_notified_job_ids(), [str(job.id)])
+
+        with connection.cursor() as cursor:
+            cursor.execute("UNLISTEN qfieldcloud_jobs")
+
+    @override_config(
+        WORKER_JOB_TYPE_PRIORITIES="delta_apply,package,process_projectfile",
+        WORKER_JOB_PRIORITY_AGING_S=1800,
+        WORKER_FAIR_SHARE=True,
+    )
+    def test_order_pending_jobs(self):
+        u2 = Person.objects.create_user(username="u2", password="abc123")
+        u3 = Person.objects.create_user(username="u3", password="abc123")
+        p2 = Project.objects.create(name="p2", is_public=False, owner=u2)
+        p3 = Project.objects.create(name="p3", is_public=False, owner=u2)
+        p4 = Project.objects.create(name="p4", is_public=False, owner=u3)
+        p5 = Project.objects.create(name="p5", is_public=False, owner=u3)
+        now = timezone.now()
+
+        def create_job(job_class, project, age, **kwargs):
+            # postpone the job, so it is not picked by a running worker
+            job = job_class.objects.create(
+                project=project,
+                created_by=project.owner,
+                dispatch_after=now + timedelta(hours=1),
+                **kwargs,
+            )
+            # NOTE `created_at` is set on creation, therefore update it afterwards
+            Job.objects.filter(pk=job.pk).update(created_at=now - age)
+
+            return job
+
+        # u2 has an active job, u3 had a job started recently, u1 had no job started recently
+        active_job = create_job(PackageJob, p3, timedelta(minutes=5))
+        Job.objects.filter(pk=active_job.pk).update(
+            status=Job.Status.STARTED, started_at=now - timedelta(minutes=4)
+        )
+        finished_job = create_job(PackageJob, p5, timedelta(minutes=15))
+        Job.objects.filter(pk=finished_job.pk).update(
+            status=Job.Status.FINISHED, started_at=now - timedelta(minutes=10)
+        )
+
+        aged_process_job = create_job(
+            ProcessProjectfileJob, self.p1, timedelta(hours=2)
+        )
+        process_job = create_job(ProcessProjectfileJob, p2, timedelta(minutes=20))
+        apply_job = create_job(
+            ApplyJob, self.p1, timedelta(minutes=1), overwrite_conflicts=False
+        )
+        u1_package_job = create_job(PackageJob, self.p1, timedelta(minutes=1))
+        u2_package_job = create_job(PackageJob, p2, timedelta(minutes=15))
+        u3_package_job = create_job(PackageJob, p4, timedelta(minutes=10))
+
+        pending_jobs_qs = Job.objects.filter(
+            status=Job.Status.PENDING,
+            project__in=[self.p1, p2, p4],
+        )
+
+        self.assertEqual(
+            [j.id for j in jobs.order_pending_jobs(pending_jobs_qs)],
+            [
+                # the aged job gets the highest priority, it is older than the delta apply job
+                aged_process_job.id,
+                apply_job.id,
+                # the package jobs of the owners without active jobs first, the least recently served owner first
+                u1_package_job.id,
+                u3_package_job.id,
+                u2_package_job.id,
+                process_job.id,
+            ],
+        )
+
+        with override_config(WORKER_FAIR_SHARE=False):
+            self.assertEqual(
+                [j.id for j in jobs.order_pending_jobs(pending_jobs_qs)],
+                [
+                    aged_process_job.id,
+                    apply_job.id,
+                    # the package jobs are ordered by creation time only
+                    u2_package_job.id,
+                    u3_package_job.id,
+                    u1_package_job.id,
+                    process_job.id,
+                ],
+            )
+
+    def test_dequeueable_jobs_use_partial_indexes(self):
+        # the finished jobs make the partial indexes much smaller than the full `status` index
+        Job.objects.bulk_create(
+            [
+                Job(
+                    project=self.p1,
+                    created_by=self.u1,
+                    type=Job.Type.PROCESS_PROJECTFILE,
+                    status=Job.Status.FINISHED,
+                )
+                for _i in range(2000)
+            ]
+        )
+        ProcessProjectfileJob.objects.create(
+            project=self.p1,
+            created_by=self.u1,
+            # postpone the job, so it is not picked by a running worker
+            dispatch_after=timezone.now() + timedelta(hours=1),
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE core_job")
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # NOTE the test tables are tiny, so the planner would prefer sequential scans otherwise
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+            plan = jobs.get_dequeueable_jobs().explain()
+
+        self.assertIn("core_job_pending_idx", plan)
+        self.assertIn("core_job_active_project_idx", plan)
+
+    def test_save_apply_job_delta_feedback(self):
+        apply_job = ApplyJob.objects.create(
+            project=self.p1,
+            created_by=self.u1,
+            overwrite_conflicts=False,
+            # postpone the job, so it is not picked by a running worker
+            dispatch_after=timezone.now() + timedelta(hours=1),
+        )
+        deltas = [
+            Delta.objects.create(
+                deltafile_id=uuid.uuid4(),
+                project=self.p1,
+                content={},
+                client_id=uuid.uuid4(),
+                created_by=self.u1,
+            )
+            for _i in range(5)
+        ]
+
+        # the last delta is not part of the apply job
+        for delta in deltas[:4]:
+            ApplyJobDelta.objects.create(apply_job=apply_job, delta=delta)
+
+        statuses = [
+            "status_applied",
+            "status_conflict",
+            "status_apply_failed",
+            "status_unknown",
+            "status_applied",
+        ]
+        delta_feedback = [
+            {
+                "delta_id": str(delta.id),
+                "status": delta_status,
+                "modified_pk": str(idx),
+            }
+            for idx, (delta, delta_status) in enumerate(zip(deltas, statuses))
+        ]
+
+        # one query for the apply job deltas, then 3 and 2 batched updates of the deltas and the apply job deltas
+        with mock.patch.object(jobs, "DELTA_FEEDBACK_BATCH_SIZE", 2):
+            with self.assertNumQueries(6):
+                is_data_modified = jobs.save_apply_job_delta_feedback(
+                    apply_job, delta_feedback
+                )
+
+        self.assertTrue(is_data_modified)
+
+        expected_statuses = [
+            Delta.Status.APPLIED,
+            Delta.Status.CONFLICT,
+            Delta.Status.NOT_APPLIED,
+            Delta.Status.ERROR,
+            Delta.Status.APPLIED,
+        ]
+
+        for idx, (delta, expected_status) in enumerate(zip(deltas, expected_statuses)):
+            delta.refresh_from_db()
+
+            self.assertEqual(delta.last_status, expected_status)
+            self.assertEqual(delta.last_modified_pk, str(idx))
+            self.assertEqual(delta.last_feedback, delta_feedback[idx])
+
+        apply_job_deltas = ApplyJobDelta.objects.filter(apply_job=apply_job).order_by(
+            "modified_pk"
+        )
+
+        self.assertEqual(
+            [d.status for d in apply_job_deltas],
+            expected_statuses[:4],
+        )
+
+    @override_config(
+        WORKER_TIMEOUT_S=600,
+        WORKER_TIMEOUT_MIN_S=120,
+        WORKER_TIMEOUT_MAX_S=3600,
+    )
+    def test_get_adaptive_resource_limits(self):
+        mb = 1000 * 1000
+        now = timezone.now()
+
+        def create_job(**kwargs):
+            # postpone the job, so it is not picked by a running worker
+            return ProcessProjectfileJob.objects.create(
+                project=self.p1,
+                created_by=self.u1,
+                dispatch_after=now + timedelta(hours=1),
+                **kwargs,
+            )
+
+        def create_finished_job(duration_s, feedback=None, **stats_kwargs):
+            job = create_job()
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.Status.FINISHED,
+                docker_started_at=now - timedelta(seconds=duration_s),
+                docker_finished_at=now,
+                feedback=feedback,
+            )
+            JobContainerStats.objects.create(job=job, **stats_kwargs)
+
+            return job
+
+        job = create_job()
+
+        # without recent jobs the defaults are used
+        self.assertIsNone(jobs.get_adaptive_resource_limits(job, 500 * mb, 4000 * mb))
+
+        # the peak memory with 1.5x headroom, the duration with 2x headroom
+        create_finished_job(100, peak_memory_bytes=400 * mb, samples_count=5)
+        limits = jobs.get_adaptive_resource_limits(job, 500 * mb, 4000 * mb)
+
+        self.assertEqual(limits["memory_limit_bytes"], 600 * mb)
+        self.assertEqual(limits["timeout_s"], 200)
+
+        # the stats without samples are ignored
+        create_finished_job(1000, peak_memory_bytes=0, samples_count=0)
+        limits = jobs.get_adaptive_resource_limits(job, 500 * mb, 4000 * mb)
+
+        self.assertEqual(limits["memory_limit_bytes"], 600 * mb)
+        self.assertEqual(limits["timeout_s"], 200)
+
+        # the limit of the jobs that ran out of memory is doubled
+        create_finished_job(
+            50,
+            peak_memory_bytes=500 * mb,
+            memory_limit_bytes=500 * mb,
+            is_oom_killed=True,
+            samples_count=3,
+        )
+        limits = jobs.get_adaptive_resource_limits(job, 500 * mb, 4000 * mb)
+
+        self.assertEqual(limits["memory_limit_bytes"], 1000 * mb)
+        self.assertEqual(limits["timeout_s"], 200)
+
+        # the timeout of the jobs that timed out is doubled
+        create_finished_job(
+            290,
+            feedback={"error_type": "TIMEOUT", "resource_limits": {"timeout_s": 300}},
+            peak_memory_bytes=100 * mb,
+            samples_count=2,
+        )
+        limits = jobs.get_adaptive_resource_limits(job, 500 * mb, 4000 * mb)
+
+        self.assertEqual(limits["memory_limit_bytes"], 1000 * mb)
+        self.assertEqual(limits["timeout_s"], 600)
+
+        # the limits are clamped to the configured bounds
+        limits = jobs.get_adaptive_resource_limits(job, 500 * mb, 800 * mb)
+
+        self.assertEqual(limits["memory_limit_bytes"], 800 * mb)
+
+        with override_config(WORKER_TIMEOUT_MAX_S=500):
+            limits = jobs.get_adaptive_resource_limits(job, 500 * mb, 4000 * mb)
+
+            self.assertEqual(limits["timeout_s"], 500)
+
+        limits = jobs.get_adaptive_resource_limits(job, 1500 * mb, 4000 * mb)
+
+        self.assertEqual(limits["memory_limit_bytes"], 1500 * mb)
@@ -736,3 +736,61 @@ class QfcTestCase(APITransactionTestCase):
                 "DCIM/2.jpg",
             ],
         )
+
+    def test_package_reused_until_files_change(self):
+        if settings.QFIELDCLOUD_LIBQFIELDSYNC_VOLUME_PATH:
+            self.skipTest("The package is never reused with a mounted libqfieldsync.")
+
+        files = [
+            ("DCIM/1.jpg", "DCIM/1.jpg"),
+            ("bumblebees.gpkg", "bumblebees.gpkg"),
+            ("simple_bumblebees.qgs", "simple_bumblebees.qgs"),
+        ]
+        expected_files = [
+            "data.gpkg",
+            "simple_bumblebees_qfield.qgs",
+            "simple_bumblebees_qfield_attachments.zip",
+            "DCIM/1.jpg",
+        ]
+
+        self.upload_files_and_check_package(
+            token=self.token1.key,
+            project=self.project1,
+            files=files,
+            expected_files=expected_files,
+        )
+
+        first_job = PackageJob.objects.filter(project=self.project1).latest(
+            "created_at"
+        )
+
+        self.assertFalse(first_job.feedback["package_cache"]["is_hit"])
+
+        # nothing changed, so the package of the first job is reused
+        self.check_package(self.token1.key, self.project1, expected_files)
+
+        second_job = PackageJob.objects.filter(project=self.project1).latest(
+            "created_at"
+        )
+
+        self.assertNotEqual(second_job.id, first_job.id)
+        self.assertTrue(second_job.feedback["package_cache"]["is_hit"])
+        self.assertEqual(
+            second_job.feedback["package_cache"]["package_job_id"],
+            str(first_job.id),
+        )
+
+        # the ETag of a project file changed, so the package is built again
+        self.upload_files_and_check_package(
+            token=self.token1.key,
+            project=self.project1,
+            files=[("DCIM/2.jpg", "DCIM/1.jpg")],
+            expected_files=expected_files,
+        )
+
+        third_job = PackageJob.objects.filter(project=self.project1).latest(
+            "created_at"
+        )
+
+        self.assertNotEqual(third_job.id, second_job.id)
+        self.assertFalse(third_job.feedback["package_cache"]["is_hit"])
@@ -1,14 +1,43 @@
 import logging
+from datetime import timedelta
+from typing import Any
 
+from constance import config
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 import qfieldcloud.core.models as models
 from qfieldcloud.core import exceptions
 
 logger = logging.getLogger(__name__)
 
+# number of rows written with a single `UPDATE` when saving the delta feedback of an apply job
+DELTA_FEEDBACK_BATCH_SIZE = 500
+
+# only the jobs started within that period are considered when serving the project owners round-robin
+FAIR_SHARE_WINDOW = timedelta(hours=1)
+
+# number of the most recent jobs of the same project and type used to choose the adaptive limits
+ADAPTIVE_LIMITS_HISTORY_SIZE = 10
+# the adaptive memory limit is the peak memory of the recent jobs multiplied by that factor
+ADAPTIVE_LIMITS_MEMORY_HEADROOM = 1.5
+# the adaptive timeout is the duration of the recent jobs multiplied by that factor
+ADAPTIVE_LIMITS_TIMEOUT_HEADROOM = 2
+
 
 @transaction.atomic
 def apply_deltas(
@@ -136,3 +165,377 @@ def repackage_if_needed(
         )
 
     return package_job
+
+
+@transaction.atomic
+def get_or_create_pending_job(
+    job_class: type["models.Job"],
+    project: "models.Project",
+    user: "models.User",
+    settle_s: int = 0,
+) -> "models.Job":
+    """Returns the pending job of the given type for the project, or creates one.
+
+    Coalesces bursts of requests for the same project and job type, e.g. uploading many files, into a single job.
+    Only pending jobs are reused, as the queued or started ones might have already missed the latest changes.
+
+    Args:
+        job_class (type[models.Job]): the job class, e.g. `ProcessProjectfileJob`.
+        project (models.Project): the project of the job.
+        user (models.User): the user that created the job, if a new one is created.
+        settle_s (int): postpone dispatching the job that many seconds, so the following requests get coalesced too.
+
+    Returns:
+        models.Job: the pending job.
+    """
+    # NOTE lock the project row, so concurrent requests do not create multiple pending jobs
+    models.Project.objects.select_for_update().filter(pk=project.pk).exists()
+
+    dispatch_after = None
+    if settle_s > 0:
+        dispatch_after = timezone.now() + timedelta(seconds=settle_s)
+
+    pending_job = (
+        job_class.objects.select_for_update()
+        .filter(project=project, status=models.Job.Status.PENDING)
+        .order_by("created_at")
+        .first()
+    )
+
+    if pending_job:
+        logger.info(
+            f"Coalescing {job_class.__name__} into pending job {pending_job.id}."
+        )
+
+        if dispatch_after:
+            pending_job.dispatch_after = dispatch_after
+            pending_job.save(update_fields=["dispatch_after"])
+
+        return pending_job
+
+    return job_class.objects.create(
+        project=project,
+        created_by=user,
+        dispatch_after=dispatch_after,
+    )
+
+
+def get_job_type_priorities() -> dict[str, int]:
+    """Returns the job types mapped to their dequeue priority, lower value means higher priority.
+
+    The priorities are configured in `WORKER_JOB_TYPE_PRIORITIES` as comma separated job types in descending priority.
+    The job types that are not listed there share the lowest priority.
+
+    Returns:
+        dict[str, int]: job type to priority mapping.
+    """
+    priorities: dict[str, int] = {}
+
+    for job_type in config.WORKER_JOB_TYPE_PRIORITIES.split(","):
+        job_type = job_type.strip()
+
+        if job_type not in models.Job.Type.values:
+            logger.warning(f'Unknown job type "{job_type}" in job type priorities.')
+            continue
+
+        priorities.setdefault(job_type, len(priorities))
+
+    lowest_priority = len(priorities)
+    for job_type in models.Job.Type.values:
+        priorities.setdefault(job_type, lowest_priority)
+
+    return priorities
+
+
+def order_pending_jobs(jobs_qs: QuerySet) -> QuerySet:
+    """Orders the pending jobs the way they should be dequeued.
+
+    The jobs are ordered by:
+    1. the priority of the job type, see `get_job_type_priorities`.
+        The jobs pending for more than `WORKER_JOB_PRIORITY_AGING_S` get the highest priority, so no job type starves.
+        They are still subject to the fair share below.
+    2. if `WORKER_FAIR_SHARE` is enabled, the number of active jobs of the project owner,
+        then the time a job of the project owner has been started the last time within `FAIR_SHARE_WINDOW`.
+        This serves the project owners round-robin, so an owner with many jobs cannot block everybody else.
+    3. the job creation time.
+
+    Args:
+        jobs_qs (QuerySet): the pending jobs queryset.
+
+    Returns:
+        QuerySet: the ordered pending jobs queryset.
+    """
+    priorities = get_job_type_priorities()
+    priority_whens = []
+
+    if config.WORKER_JOB_PRIORITY_AGING_S > 0:
+        aged_before = timezone.now() - timedelta(
+            seconds=config.WORKER_JOB_PRIORITY_AGING_S
+        )
+        priority_whens.append(When(created_at__lt=aged_before, then=Value(0)))
+
+    for job_type, priority in priorities.items():
+        priority_whens.append(When(type=job_type, then=Value(priority)))
+
+    jobs_qs = jobs_qs.annotate(
+        type_priority=Case(
+            *priority_whens,
+            default=Value(len(priorities)),
+            output_field=IntegerField(),
+        )
+    )
+    ordering = [F("type_priority").asc()]
+
+    if config.WORKER_FAIR_SHARE:
+        owner_jobs_qs = models.Job.objects.filter(
+            project__owner_id=OuterRef("project__owner_id")
+        )
+        owner_active_jobs_count_qs = (
+            owner_jobs_qs.filter(
+                status__in=[models.Job.Status.QUEUED, models.Job.Status.STARTED]
+            )
+            .values("project__owner_id")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        owner_last_started_at_qs = (
+            # NOTE the window keeps the subquery on the `core_job_started_at_idx` index, instead of scanning all the jobs of the owner
+            owner_jobs_qs.filter(started_at__gte=timezone.now() - FAIR_SHARE_WINDOW)
+            .order_by("-started_at")
+            .values("started_at")[:1]
+        )
+
+        jobs_qs = jobs_qs.annotate(
+            owner_active_jobs_count=Coalesce(
+                Subquery(owner_active_jobs_count_qs), Value(0)
+            ),
+            owner_last_started_at=Subquery(owner_last_started_at_qs),
+        )
+        ordering += [
+            F("owner_active_jobs_count").asc(),
+            F("owner_last_started_at").asc(nulls_first=True),
+        ]
+
+    ordering.append(F("created_at").asc())
+
+    return jobs_qs.order_by(*ordering)
+
+
+def get_dequeueable_jobs() -> QuerySet:
+    """Returns the pending jobs that can be run now, in the order they should be dequeued.
+
+    The jobs of projects that already have an active job or are locked are skipped.
+    The rows are locked with `FOR UPDATE SKIP LOCKED`, so must be evaluated within a transaction.
+
+    NOTE the query uses only the `core_job_pending_idx` and `core_job_active_project_idx` partial indexes on `core_job`,
+    so its cost depends on the number of pending and active jobs, not on the number of finished jobs.
+
+    Returns:
+        QuerySet: the ordered pending jobs queryset.
+    """
+    busy_projects_ids_qs = models.Job.objects.filter(
+        status__in=[
+            models.Job.Status.QUEUED,
+            models.Job.Status.STARTED,
+        ]
+    ).values("project_id")
+
+    # select all the pending jobs, that their project has no other active job or `is_locked` flag is `True`
+    jobs_qs = (
+        # NOTE lock only the job rows, not the joined project rows
+        models.Job.objects.select_for_update(skip_locked=True, of=("self",))
+        .filter(status=models.Job.Status.PENDING)
+        # skip the jobs that are still waiting for more requests to be coalesced
+        .filter(Q(dispatch_after__isnull=True) | Q(dispatch_after__lte=timezone.now()))
+        .exclude(
+            Q(project_id__in=busy_projects_ids_qs)
+            # skip all projects that are currently locked, most probably because of file transfer
+            | Q(project__is_locked=True),
+        )
+    )
+
+    return order_pending_jobs(jobs_qs)
+
+
+def save_apply_job_delta_feedback(
+    apply_job: "models.ApplyJob", delta_feedback: list[dict[str, Any]]
+) -> bool:
+    """Writes the delta feedback returned by the worker to the `Delta` and `ApplyJobDelta` rows.
+
+    The rows are updated in batches of `DELTA_FEEDBACK_BATCH_SIZE`, instead of two `UPDATE` queries per delta.
+
+    Args:
+        apply_job (models.ApplyJob): the apply job the feedback belongs to.
+        delta_feedback (list[dict[str, Any]]): the feedback of each delta, as returned by the worker.
+
+    Returns:
+        bool: whether the project data might have been modified.
+    """
+    is_data_modified = False
+
+    apply_job_delta_ids = {
+        str(delta_id): apply_job_delta_id
+        for apply_job_delta_id, delta_id in models.ApplyJobDelta.objects.filter(
+            apply_job=apply_job
+        ).values_list("id", "delta_id")
+    }
+
+    deltas = []
+    apply_job_deltas = []
+    for feedback in delta_feedback:
+        delta_id = feedback["delta_id"]
+        status = feedback["status"]
+        modified_pk = feedback["modified_pk"]
+
+        if status == "status_applied":
+            status = models.Delta.Status.APPLIED
+            is_data_modified = True
+        elif status == "status_conflict":
+            status = models.Delta.Status.CONFLICT
+        elif status == "status_apply_failed":
+            status = models.Delta.Status.NOT_APPLIED
+        else:
+            status = models.Delta.Status.ERROR
+            # not certain what happened
+            is_data_modified = True
+
+        deltas.append(
+            models.Delta(
+                id=delta_id,
+                last_status=status,
+                last_feedback=feedback,
+                last_modified_pk=modified_pk,
+                last_apply_attempt_at=apply_job.started_at,
+                last_apply_attempt_by=apply_job.created_by,
+            )
+        )
+
+        if delta_id in apply_job_delta_ids:
+            apply_job_deltas.append(
+                models.ApplyJobDelta(
+                    id=apply_job_delta_ids[delta_id],
+                    status=status,
+                    feedback=feedback,
+                    modified_pk=modified_pk,
+                )
+            )
+
+    with transaction.atomic():
+        models.Delta.objects.bulk_update(
+            deltas,
+            [
+                "last_status",
+                "last_feedback",
+                "last_modified_pk",
+                "last_apply_attempt_at",
+                "last_apply_attempt_by",
+            ],
+            batch_size=DELTA_FEEDBACK_BATCH_SIZE,
+        )
+        models.ApplyJobDelta.objects.bulk_update(
+            apply_job_deltas,
+            ["status", "feedback", "modified_pk"],
+            batch_size=DELTA_FEEDBACK_BATCH_SIZE,
+        )
+
+    return is_data_modified
+
+
+def get_adaptive_resource_limits(
+    job: "models.Job",
+    memory_limit_min_bytes: int,
+    memory_limit_max_bytes: int,
+) -> dict[str, Any] | None:
+    """Derives the memory limit and the timeout of the worker container from the recent jobs of the same project and type.
+
+    The memory limit is the peak memory of the recent jobs multiplied by `ADAPTIVE_LIMITS_MEMORY_HEADROOM`,
+    but at least double the limit of the recent jobs that ran out of memory.
+    The timeout is the longest duration of the recent jobs multiplied by `ADAPTIVE_LIMITS_TIMEOUT_HEADROOM`,
+    but at least double the timeout of the recent jobs that timed out.
+    The limits are clamped to the memory bounds and to `WORKER_TIMEOUT_MIN_S` and `WORKER_TIMEOUT_MAX_S`.
+
+    Args:
+        job (models.Job): the job to choose the limits for.
+        memory_limit_min_bytes (int): the lowest memory limit in bytes.
+        memory_limit_max_bytes (int): the highest memory limit in bytes.
+
+    Returns:
+        dict[str, Any] | None: the `memory_limit_bytes`, the `timeout_s` and a human readable `reason` for them,
+            or None if there are no recent jobs of the same project and type.
+    """
+    history = list(
+        models.Job.objects.filter(
+            project_id=job.project_id,
+            type=job.type,
+            # NOTE the stats without samples have no peak memory, e.g. the container stopped before the first sample
+            container_stats__samples_count__gt=0,
+            docker_started_at__isnull=False,
+            docker_finished_at__isnull=False,
+        )
+        .exclude(pk=job.pk)
+        .order_by("-created_at")
+        .values(
+            "docker_started_at",
+            "docker_finished_at",
+            "container_stats__peak_memory_bytes",
+            "container_stats__memory_limit_bytes",
+            "container_stats__is_oom_killed",
+            "feedback__error_type",
+            "feedback__resource_limits__timeout_s",
+        )[:ADAPTIVE_LIMITS_HISTORY_SIZE]
+    )
+
+    if not history:
+        return None
+
+    reasons = []
+
+    peak_memory_bytes = max(h["container_stats__peak_memory_bytes"] for h in history)
+    memory_limit_bytes = int(peak_memory_bytes * ADAPTIVE_LIMITS_MEMORY_HEADROOM)
+    reasons.append(
+        f"Peak memory of the last {len(history)} job(s) was {peak_memory_bytes} bytes."
+    )
+
+    oom_killed_limits = [
+        h["container_stats__memory_limit_bytes"]
+        for h in history
+        if h["container_stats__is_oom_killed"]
+    ]
+    if oom_killed_limits:
+        memory_limit_bytes = max(memory_limit_bytes, max(oom_killed_limits) * 2)
+        reasons.append(
+            f"{len(oom_killed_limits)} job(s) ran out of memory, doubled their limit."
+        )
+
+    duration_s = max(
+        (h["docker_finished_at"] - h["docker_started_at"]).total_seconds()
+        for h in history
+    )
+    timeout_s = int(duration_s * ADAPTIVE_LIMITS_TIMEOUT_HEADROOM)
+    reasons.append(
+        f"Longest of the last {len(history)} job(s) took {int(duration_s)} seconds."
+    )
+
+    timed_out_timeouts = [
+        h["feedback__resource_limits__timeout_s"] or config.WORKER_TIMEOUT_S
+        for h in history
+        if h["feedback__error_type"] == "TIMEOUT"
+    ]
+    if timed_out_timeouts:
+        timeout_s = max(timeout_s, max(timed_out_timeouts) * 2)
+        reasons.append(
+            f"{len(timed_out_timeouts)} job(s) timed out, doubled their timeout."
+        )
+
+    memory_limit_bytes = min(
+        max(memory_limit_bytes, memory_limit_min_bytes), memory_limit_max_bytes
+    )
+    timeout_s = min(
+        max(timeout_s, config.WORKER_TIMEOUT_MIN_S), config.WORKER_TIMEOUT_MAX_S
+    )
+
+    return {
+        "memory_limit_bytes": memory_limit_bytes,
+        "timeout_s": timeout_s,
+        "reason": " ".join(reasons),
+    }
@@ -10,6 +10,7 @@ from pathlib import PurePath
 from traceback import print_stack
 
 import qfieldcloud.core.utils2 as utils2
+from constance import config
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
@@ -21,7 +22,7 @@ from drf_spectacular.utils import (
     extend_schema_view,
 )
 from qfieldcloud.core import exceptions, permissions_utils, utils
-from qfieldcloud.core.models import Job, ProcessProjectfileJob, Project
+from qfieldcloud.core.models import ProcessProjectfileJob, Project
 from qfieldcloud.core.serializers import FileWithVersionsSerializer
 from qfieldcloud.core.utils import S3ObjectVersion, get_project_file_with_versions
 from qfieldcloud.core.utils2.audit import LogEntry, audit
@@ -323,21 +324,13 @@ class DownloadPushDeleteFileView(views.APIView):
                     project.the_qgis_file_name = filename
                     update_fields.append("the_qgis_file_name")
 
-                running_jobs = ProcessProjectfileJob.objects.filter(
-                    project=project,
-                    created_by=self.request.user,
-                    status__in=[
-                        Job.Status.PENDING,
-                        Job.Status.QUEUED,
-                        Job.Status.STARTED,
-                    ],
+                utils2.jobs.get_or_create_pending_job(
+                    ProcessProjectfileJob,
+                    project,
+                    self.request.user,
+                    settle_s=config.WORKER_JOB_SETTLE_S,
                 )
 
-                if not running_jobs.exists():
-                    ProcessProjectfileJob.objects.create(
-                        project=project, created_by=self.request.user
-                    )
-
             project.data_last_updated_at = timezone.now()
             # NOTE just incrementing the fils_storage_bytes when uploading might make the database out of sync if a files is uploaded/deleted bypassing this function
             project.file_storage_bytes += request_file.size
@@ -6,8 +6,9 @@ from drf_spectacular.utils import (
     extend_schema_view,
 )
 from qfieldcloud.core import pagination, permissions_utils, serializers
-from qfieldcloud.core.models import Job, Project
-from rest_framework import generics, permissions, viewsets
+from qfieldcloud.core.models import Job, JobLogChunk, Project
+from rest_framework import exceptions, generics, permissions, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.status import HTTP_201_CREATED
 
@@ -45,7 +46,20 @@ class JobPermissions(permissions.BasePermission):
                 description="Force creating the job.",
             ),
         ],
-    )
+    ),
+    logs=extend_schema(
+        description="Get the output of the given job, starting from the given offset. Can be polled while the job is running.",
+        parameters=[
+            OpenApiParameter(
+                name="offset",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                default=0,
+                description="Number of characters of the output already received.",
+            ),
+        ],
+    ),
 )
 class JobViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.JobSerializer
@@ -111,3 +125,39 @@ class JobViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(project=project)
 
         return qs
+
+    @action(detail=True, methods=["get"])
+    def logs(self, request, *args, **kwargs):
+        job = self.get_object()
+
+        if not permissions_utils.can_read_jobs(request.user, job.project):
+            raise exceptions.PermissionDenied()
+
+        try:
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            raise exceptions.ValidationError({"offset": "Must be an integer."})
+
+        # NOTE the output of the finished job is stored in `Job.output`, while the running job still has `JobLogChunk`s
+        if job.output is not None:
+            output = job.output[offset:]
+        else:
+            # NOTE the `offset` might point in the middle of a chunk
+            chunks = JobLogChunk.objects.filter(job=job).order_by("offset")
+            first_chunk = chunks.filter(offset__lte=offset).values("offset").last()
+
+            if first_chunk:
+                chunks = chunks.filter(offset__gte=first_chunk["offset"])
+
+            output = ""
+            for chunk in chunks.values("offset", "content"):
+                output += chunk["content"][max(offset - chunk["offset"], 0) :]
+
+        return Response(
+            {
+                "output": output,
+                "offset": offset + len(output),
+                "is_finished": job.status
+                in (Job.Status.FINISHED, Job.Status.STOPPED, Job.Status.FAILED),
+            }
+        )
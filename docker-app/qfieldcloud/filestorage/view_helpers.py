@@ -2,6 +2,7 @@ import logging
 from pathlib import PurePath
 from uuid import UUID
 
+from constance import config
 from django.conf import settings
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
@@ -19,10 +20,10 @@ from qfieldcloud.core.exceptions import (
     RestrictedProjectModificationError,
 )
 from qfieldcloud.core.models import (
-    Job,
     ProcessProjectfileJob,
     Project,
 )
+from qfieldcloud.core.utils2 import jobs
 from qfieldcloud.core.utils2.storage import (
     get_attachment_dir_prefix,
 )
@@ -123,21 +124,13 @@ def upload_project_file_version(
                     project.the_qgis_file_name = filename
                     update_fields.append("the_qgis_file_name")
 
-                running_jobs = ProcessProjectfileJob.objects.filter(
-                    project=project,
-                    created_by=request.user,
-                    status__in=[
-                        Job.Status.PENDING,
-                        Job.Status.QUEUED,
-                        Job.Status.STARTED,
-                    ],
+                jobs.get_or_create_pending_job(
+                    ProcessProjectfileJob,
+                    project,
+                    request.user,
+                    settle_s=config.WORKER_JOB_SETTLE_S,
                 )
 
-                if not running_jobs.exists():
-                    ProcessProjectfileJob.objects.create(
-                        project=project, created_by=request.user
-                    )
-
             project.data_last_updated_at = timezone.now()
             project.file_storage_bytes += file_version.size
             project.save(update_fields=update_fields)
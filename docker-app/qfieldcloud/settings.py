@@ -622,6 +622,66 @@ CONSTANCE_CONFIG = {
         "Share of CPUs for each QGIS worker container. By default all containers have value 1024 set by docker.",
         int,
     ),
+    "WORKER_QGIS_WARM_POOL_SIZE": (
+        0,
+        "Number of idle QGIS worker containers with QGIS already started, kept ready by each worker wrapper. Value 0 disables the warm pool.",
+        int,
+    ),
+    "WORKER_ADAPTIVE_LIMITS": (
+        False,
+        "Choose the memory limit and the timeout of each QGIS worker container from the recent jobs of the same project and job type, within the min and max bounds below. If disabled, `WORKER_QGIS_MEMORY_LIMIT` and `WORKER_TIMEOUT_S` are used for all jobs.",
+        bool,
+    ),
+    "WORKER_QGIS_MEMORY_LIMIT_MIN": (
+        "500m",
+        "Minimum memory for each QGIS worker container when adaptive limits are enabled.",
+        str,
+    ),
+    "WORKER_QGIS_MEMORY_LIMIT_MAX": (
+        "4000m",
+        "Maximum memory for each QGIS worker container when adaptive limits are enabled.",
+        str,
+    ),
+    "WORKER_TIMEOUT_MIN_S": (
+        120,
+        "Minimum timeout of the workers in seconds when adaptive limits are enabled.",
+        int,
+    ),
+    "WORKER_TIMEOUT_MAX_S": (
+        3600,
+        "Maximum timeout of the workers in seconds when adaptive limits are enabled.",
+        int,
+    ),
+    "WORKER_FILE_CACHE_MAX_SIZE": (
+        "20g",
+        "Maximum size of the project files cache shared by the QGIS workers on the same host, the least recently used files are evicted first.",
+        str,
+    ),
+    "WORKER_CHECKPOINT_MAX_AGE_S": (
+        3600,
+        "Maximum age in seconds of the workflow checkpoint of a failed packaging job. A retried job of the same project revision resumes from the checkpoint if it is younger.",
+        int,
+    ),
+    "WORKER_JOB_SETTLE_S": (
+        5,
+        "Delay in seconds before a QGIS project file processing job is dispatched after the last file upload. Uploads within that delay are coalesced into the same job.",
+        int,
+    ),
+    "WORKER_JOB_TYPE_PRIORITIES": (
+        "delta_apply,package,process_projectfile",
+        "Comma separated job types in the order they should be dequeued. Job types that are not listed get the lowest priority.",
+        str,
+    ),
+    "WORKER_JOB_PRIORITY_AGING_S": (
+        1800,
+        "Pending jobs older than that many seconds get the highest priority regardless of their type, so no job type starves. Value 0 disables aging.",
+        int,
+    ),
+    "WORKER_FAIR_SHARE": (
+        True,
+        "Dequeue the jobs round-robin across project owners, so an owner with many pending jobs cannot block the jobs of other owners.",
+        bool,
+    ),
     "TRIAL_PERIOD_DAYS": (
         28,
         "Days in which the trial period expires.",
@@ -641,6 +701,18 @@ CONSTANCE_CONFIG_FIELDSETS = {
         "WORKER_TIMEOUT_S",
         "WORKER_QGIS_MEMORY_LIMIT",
         "WORKER_QGIS_CPU_SHARES",
+        "WORKER_QGIS_WARM_POOL_SIZE",
+        "WORKER_ADAPTIVE_LIMITS",
+        "WORKER_QGIS_MEMORY_LIMIT_MIN",
+        "WORKER_QGIS_MEMORY_LIMIT_MAX",
+        "WORKER_TIMEOUT_MIN_S",
+        "WORKER_TIMEOUT_MAX_S",
+        "WORKER_FILE_CACHE_MAX_SIZE",
+        "WORKER_CHECKPOINT_MAX_AGE_S",
+        "WORKER_JOB_SETTLE_S",
+        "WORKER_JOB_TYPE_PRIORITIES",
+        "WORKER_JOB_PRIORITY_AGING_S",
+        "WORKER_FAIR_SHARE",
     ),
     "Debug": ("SENTRY_REQUEST_MAX_SIZE_TO_SEND",),
     "Subscription": ("TRIAL_PERIOD_DAYS",),
@@ -667,6 +739,12 @@ QFIELDCLOUD_TRANSFORMATION_GRIDS_VOLUME_NAME = os.environ.get(
     "QFIELDCLOUD_TRANSFORMATION_GRIDS_VOLUME_NAME"
 )
 
+# Volume name where the project files are cached by the worker containers, the cache is disabled if not set.
+# NOTE the volume is shared across all projects and mounted read-write into every worker container, see `.env.example`
+QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME = os.environ.get(
+    "QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME"
+)
+
 # Name of the docker compose network to be used by the worker containers
 QFIELDCLOUD_DEFAULT_NETWORK = os.environ.get("QFIELDCLOUD_DEFAULT_NETWORK")
 
@@ -1,38 +1,51 @@
+import codecs
+import hashlib
 import json
 import logging
+import os
 import shutil
+import socket
 import sys
 import tempfile
+import threading
+import time
 import traceback
 import uuid
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any
 
 import docker
 import requests
 import sentry_sdk
 from constance import config
 from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
 from django.core.files.base import ContentFile
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.forms.models import model_to_dict
 from django.utils import timezone
 from docker.client import DockerClient
 from docker.errors import APIError
 from docker.models.containers import Container
+from docker.utils import parse_bytes
 from qfieldcloud.authentication.models import AuthToken
 from qfieldcloud.core.models import (
     ApplyJob,
     ApplyJobDelta,
     Delta,
     Job,
+    JobContainerStats,
+    JobLogChunk,
+    JobStepMetrics,
     PackageJob,
     ProcessProjectfileJob,
     Secret,
 )
 from qfieldcloud.core.utils import get_qgis_project_file
-from qfieldcloud.core.utils2 import storage
+from qfieldcloud.core.utils2 import jobs, storage
 from qfieldcloud.filestorage.models import File
 from tenacity import (
     retry,
@@ -47,18 +60,200 @@ RETRY_COUNT = 5
 TIMEOUT_ERROR_EXIT_CODE = -1
 DOCKER_SIGKILL_EXIT_CODE = 137
 TMP_FILE = Path("/tmp")
+# idle warm workers exit by themselves after that many seconds, so they are not left behind if the wrapper dies
+WARM_WORKER_IDLE_TIMEOUT_S = 3600
+# the idle warm workers are checked for having exited at most that often, as each check is a docker API request
+WARM_WORKER_CHECK_INTERVAL_S = 30
+# the hostname of the worker wrapper container, used to distinguish the warm workers of different wrappers
+WRAPPER_ID = socket.gethostname()
+# the container logs are written to the database at least that often while the job is running
+LOG_FLUSH_INTERVAL_S = 1
+# the container logs are written to the database as soon as there are that many characters buffered
+LOG_FLUSH_SIZE = 64 * 1024
+# how long to wait for the log stream to end after the container has been stopped
+LOG_STREAM_JOIN_TIMEOUT_S = 30
+# number of deltas fetched from the database at once when writing the deltas file
+DELTAFILE_CHUNK_SIZE = 500
+# the workflow checkpoints of the failed resumable jobs, by job type and project id.
+# NOTE the checkpoints are local to the host, a job resumes only if dequeued by a wrapper on the same host
+CHECKPOINTS_DIR = TMP_FILE.joinpath("qfc_checkpoints")
+# the id of the QGIS worker image is read again after that many seconds, so a newly pulled image is noticed
+QGIS_IMAGE_ID_CACHE_TTL_S = 60
 
 
 class QgisException(Exception):
     pass
 
 
+class JobLogStreamer(threading.Thread):
+    """Follows the logs of a worker container and stores them as `JobLogChunk`s while the job is running.
+
+    The chunks are buffered and written at most every `LOG_FLUSH_INTERVAL_S` seconds,
+    or as soon as the buffer grows over `LOG_FLUSH_SIZE` characters.
+    """
+
+    def __init__(self, job: Job, container: Container) -> None:
+        super().__init__(name=f"logs-{job.id}", daemon=True)
+
+        self.job = job
+        self.container = container
+        self.offset = 0
+        self.is_complete = False
+        self._buffer: list[str] = []
+        self._buffer_size = 0
+        self._last_flushed_at = time.monotonic()
+
+    def run(self) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        try:
+            for data in self.container.logs(stream=True, follow=True):
+                self.append(decoder.decode(data))
+
+                if (
+                    self._buffer_size >= LOG_FLUSH_SIZE
+                    or time.monotonic() - self._last_flushed_at >= LOG_FLUSH_INTERVAL_S
+                ):
+                    self.flush()
+
+            self.append(decoder.decode(b"", final=True))
+            self.flush()
+
+            self.is_complete = True
+        except Exception as err:
+            logger.error(
+                f"Failed to stream the logs of container {self.container.id}.",
+                exc_info=err,
+            )
+        finally:
+            # NOTE the thread has its own database connection, make sure it is not leaked
+            connection.close()
+
+    def append(self, text: str) -> None:
+        if not text:
+            return
+
+        self._buffer.append(text)
+        self._buffer_size += len(text)
+
+    def flush(self) -> None:
+        self._last_flushed_at = time.monotonic()
+
+        if not self._buffer:
+            return
+
+        content = "".join(self._buffer)
+        self._buffer = []
+        self._buffer_size = 0
+
+        JobLogChunk.objects.create(
+            job_id=self.job.id,
+            offset=self.offset,
+            content=content,
+        )
+
+        self.offset += len(content)
+
+        logger.info(f"Job {self.job.id} output:\n{content}")
+
+
+class ContainerStatsCollector(threading.Thread):
+    """Follows the `docker stats` of a worker container and aggregates the resource usage.
+
+    Docker emits a stats sample about every second. The CPU, block I/O and network counters are cumulative,
+    so only their maximum is kept, while for the memory the peak of all samples is kept.
+    """
+
+    def __init__(self, container: Container) -> None:
+        super().__init__(name=f"stats-{container.id}", daemon=True)
+
+        self.container = container
+        self.peak_memory_bytes = 0
+        self.memory_limit_bytes = 0
+        self.cpu_seconds = 0.0
+        self.block_read_bytes = 0
+        self.block_write_bytes = 0
+        self.network_rx_bytes = 0
+        self.network_tx_bytes = 0
+        self.samples_count = 0
+
+    def run(self) -> None:
+        try:
+            for sample in self.container.stats(stream=True, decode=True):
+                self.add_sample(sample)
+        except Exception as err:
+            logger.warning(
+                f"Failed to collect the stats of container {self.container.id}.",
+                exc_info=err,
+            )
+
+    def add_sample(self, sample: dict[str, Any]) -> None:
+        memory_stats = sample.get("memory_stats") or {}
+        # NOTE the page cache is part of the memory usage, cgroup v1 and v2 use different names for it
+        memory_cache = (memory_stats.get("stats") or {}).get(
+            "inactive_file",
+            (memory_stats.get("stats") or {}).get("total_inactive_file", 0),
+        )
+        memory_bytes = max(memory_stats.get("usage", 0) - memory_cache, 0)
+
+        self.peak_memory_bytes = max(self.peak_memory_bytes, memory_bytes)
+        self.memory_limit_bytes = max(
+            self.memory_limit_bytes, memory_stats.get("limit", 0)
+        )
+
+        cpu_usage = (sample.get("cpu_stats") or {}).get("cpu_usage") or {}
+        self.cpu_seconds = max(self.cpu_seconds, cpu_usage.get("total_usage", 0) / 1e9)
+
+        block_read_bytes = 0
+        block_write_bytes = 0
+        blkio_stats = sample.get("blkio_stats") or {}
+        for entry in blkio_stats.get("io_service_bytes_recursive") or []:
+            if entry["op"].lower() == "read":
+                block_read_bytes += entry["value"]
+            elif entry["op"].lower() == "write":
+                block_write_bytes += entry["value"]
+
+        self.block_read_bytes = max(self.block_read_bytes, block_read_bytes)
+        self.block_write_bytes = max(self.block_write_bytes, block_write_bytes)
+
+        networks = (sample.get("networks") or {}).values()
+        self.network_rx_bytes = max(
+            self.network_rx_bytes, sum(n.get("rx_bytes", 0) for n in networks)
+        )
+        self.network_tx_bytes = max(
+            self.network_tx_bytes, sum(n.get("tx_bytes", 0) for n in networks)
+        )
+
+        self.samples_count += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "memory_limit_bytes": self.memory_limit_bytes,
+            "cpu_seconds": self.cpu_seconds,
+            "block_read_bytes": self.block_read_bytes,
+            "block_write_bytes": self.block_write_bytes,
+            "network_rx_bytes": self.network_rx_bytes,
+            "network_tx_bytes": self.network_tx_bytes,
+            "samples_count": self.samples_count,
+        }
+
+
 class JobRun:
     container_timeout_secs = config.WORKER_TIMEOUT_S
     job_class = Job
     command = []
+    is_oom_killed = False
+    # whether the workflow checkpoint of a failed run is kept, so the next job of the same type and project can resume from it
+    is_resumable = False
+    checkpoint_revision = ""
 
     def __init__(self, job_id: str) -> None:
+        # NOTE initialized per instance, as the job runs might run concurrently in different threads
+        self.warm_worker_feedback: dict[str, Any] = {}
+        self.resource_limits: dict[str, Any] = {}
+        self.checkpoint_feedback: dict[str, Any] = {}
+
         try:
             self.job_id = job_id
             self.job = self.job_class.objects.select_related().get(id=job_id)
@@ -95,6 +290,14 @@ class JobRun:
         context = self.get_context()
         return [p % context for p in ["python3", "entrypoint.py", *self.command]]
 
+    def reuse_previous_run(self) -> bool:
+        """Finishes the job with the results of a previous identical job, without running the worker.
+
+        Returns:
+            bool: whether the results of a previous job were reused.
+        """
+        return False
+
     def before_docker_run(self) -> None:
         pass
 
@@ -140,6 +343,14 @@ class JobRun:
                 return
             # # # /CONCURRENCY CHECK # # #
 
+            if self.reuse_previous_run():
+                # NOTE the worker is not run, so the shared directory is not needed
+                shutil.rmtree(str(self.shared_tempdir), ignore_errors=True)
+                return
+
+            if self.is_resumable:
+                self._restore_checkpoint()
+
             self.before_docker_run()
 
             command = self.get_command()
@@ -151,7 +362,15 @@ class JobRun:
                 volumes=volumes,
             )
 
-            if exit_code == DOCKER_SIGKILL_EXIT_CODE:
+            if exit_code == DOCKER_SIGKILL_EXIT_CODE and self.is_oom_killed:
+                feedback["error"] = (
+                    f"Worker ran out of memory, the limit is {self.resource_limits['memory_limit_bytes']} bytes."
+                )
+                feedback["error_type"] = "OOM_KILLED"
+                feedback["error_class"] = ""
+                feedback["error_origin"] = "container"
+                feedback["error_stack"] = ""
+            elif exit_code == DOCKER_SIGKILL_EXIT_CODE:
                 feedback["error"] = "Docker engine sigkill."
                 feedback["error_type"] = "DOCKER_ENGINE_SIGKILL"
                 feedback["error_class"] = ""
@@ -190,15 +409,29 @@ class JobRun:
                     feedback["error_stack"] = traceback.format_tb(tb)
 
             feedback["container_exit_code"] = exit_code
+            feedback["warm_worker"] = self.warm_worker_feedback
+            feedback["resource_limits"] = self.resource_limits
+            feedback["checkpoint"] = self.checkpoint_feedback
 
-            self.job.output = output.decode("utf-8")
             self.job.feedback = feedback
-            self.job.save(update_fields=["output", "feedback"])
+
+            if output is None:
+                # the output has been streamed to `JobLogChunk`s while the job was running
+                self.save_output_from_log_chunks()
+                self.job.save(update_fields=["feedback"])
+            else:
+                self.job.output = output.decode("utf-8")
+                self.job.save(update_fields=["output", "feedback"])
+
+            self._save_step_metrics(feedback)
 
             if exit_code != 0 or feedback.get("error") is not None:
                 self.job.status = Job.Status.FAILED
                 self.job.save(update_fields=["status"])
 
+                if self.is_resumable:
+                    self._store_checkpoint()
+
                 try:
                     self.after_docker_exception()
                 except Exception as err:
@@ -247,17 +480,59 @@ class JobRun:
                     )
 
                 self.job.save(update_fields=["status", "feedback", "finished_at"])
+
+                if self.job.output is None:
+                    self.save_output_from_log_chunks()
+
+                if self.is_resumable:
+                    self._store_checkpoint()
             except Exception as err:
                 logger.error(
                     "Failed to handle exception and update the job status", exc_info=err
                 )
 
+    def save_output_from_log_chunks(self) -> None:
+        """Concatenates the streamed `JobLogChunk`s into `Job.output` and deletes them.
+
+        The concatenation happens in the database, so the whole output is never held in the memory of the wrapper.
+        """
+        with transaction.atomic():
+            Job.objects.filter(pk=self.job.pk).update(
+                output=Coalesce(
+                    Subquery(
+                        JobLogChunk.objects.filter(job_id=OuterRef("pk"))
+                        .values("job_id")
+                        .annotate(
+                            output=StringAgg("content", delimiter="", ordering="offset")
+                        )
+                        .values("output")
+                    ),
+                    Value(""),
+                )
+            )
+            JobLogChunk.objects.filter(job_id=self.job.pk).delete()
+
+        self.job.refresh_from_db(fields=["output"])
+
     def _run_docker(
         self, command: list[str], volumes: list[str], run_opts: dict[str, Any] = {}
-    ) -> tuple[int, bytes]:
+    ) -> tuple[int, bytes | None]:
+        """Runs the worker container and waits for it to finish.
+
+        Returns:
+            tuple[int, bytes | None]: the container exit code and the container logs.
+                The logs are `None` if they have been streamed to `JobLogChunk`s.
+        """
         assert settings.QFIELDCLOUD_WORKER_QFIELDCLOUD_URL
         assert settings.QFIELDCLOUD_TRANSFORMATION_GRIDS_VOLUME_NAME
 
+        self.resource_limits = self.get_resource_limits()
+        self.container_timeout_secs = self.resource_limits["timeout_s"]
+
+        logger.info(
+            f"Resource limits for job {self.job.id}: {json.dumps(self.resource_limits)}"
+        )
+
         token = AuthToken.objects.create(
             user=self.job.created_by,
             client_type=AuthToken.ClientType.WORKER,
@@ -293,51 +568,128 @@ class JobRun:
                 f"{settings.QFIELDCLOUD_QFIELDCLOUD_SDK_VOLUME_PATH}:/qfieldcloud-sdk-python:ro"
             )
 
+        if settings.QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME:
+            volumes.append(
+                f"{settings.QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME}:/file_cache:rw"
+            )
+
+        environment = {
+            "PGSERVICE_FILE_CONTENTS": pgservice_file_contents,
+            "QFIELDCLOUD_TOKEN": token.key,
+            "QFIELDCLOUD_URL": settings.QFIELDCLOUD_WORKER_QFIELDCLOUD_URL,
+            "JOB_ID": self.job_id,
+            "PROJ_DOWNLOAD_DIR": "/transformation_grids",
+            "QT_QPA_PLATFORM": "offscreen",
+        }
+
+        if settings.QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME:
+            environment["FILE_CACHE_DIR"] = "/file_cache"
+            environment["FILE_CACHE_MAX_SIZE_BYTES"] = str(
+                parse_bytes(config.WORKER_FILE_CACHE_MAX_SIZE)
+            )
+
+        # the output of a previous run of the same job will be replaced by the streamed logs
+        JobLogChunk.objects.filter(job_id=self.job.pk).delete()
+        self.job.output = None
+
         # `docker_started_at`/`docker_finished_at` tracks the time spent on docker only
         self.job.docker_started_at = timezone.now()
-        self.job.save(update_fields=["docker_started_at"])
+        self.job.save(update_fields=["output", "docker_started_at"])
 
-        container: Container = client.containers.run(  # type:ignore
-            settings.QFIELDCLOUD_QGIS_IMAGE_NAME,
-            command,
-            environment={
-                "PGSERVICE_FILE_CONTENTS": pgservice_file_contents,
-                "QFIELDCLOUD_TOKEN": token.key,
-                "QFIELDCLOUD_URL": settings.QFIELDCLOUD_WORKER_QFIELDCLOUD_URL,
-                "JOB_ID": self.job_id,
-                "PROJ_DOWNLOAD_DIR": "/transformation_grids",
-                "QT_QPA_PLATFORM": "offscreen",
-            },
-            volumes=volumes,
-            # TODO stream the logs to something like redis, so they can be streamed back in project jobs page to the user live
-            # auto_remove=True,
-            network=settings.QFIELDCLOUD_DEFAULT_NETWORK,
-            detach=True,
-            mem_limit=config.WORKER_QGIS_MEMORY_LIMIT,
-            cpu_shares=config.WORKER_QGIS_CPU_SHARES,
-            labels={
-                "app": f"{settings.ENVIRONMENT}_worker",
-                "type": self.job.type,
-                "job_id": str(self.job.id),
-                "project_id": str(self.job.project_id),
-            },
-        )
+        warm_worker = warm_worker_pool.acquire()
+
+        if warm_worker:
+            container = warm_worker.container
+            self.warm_worker_feedback = {
+                "is_warm": True,
+                "saved_startup_s": warm_worker.get_startup_duration(),
+            }
+
+            # move the files prepared in `before_docker_run` to the `/io` directory of the warm worker
+            for path in self.shared_tempdir.iterdir():
+                shutil.move(str(path), str(warm_worker.shared_tempdir))
+
+            shutil.rmtree(str(self.shared_tempdir), ignore_errors=True)
+            self.shared_tempdir = warm_worker.shared_tempdir
+
+            try:
+                # NOTE the warm worker has been started with the default memory limit
+                container.update(
+                    mem_limit=self.resource_limits["memory_limit_bytes"],
+                    memswap_limit=self.resource_limits["memory_limit_bytes"] * 2,
+                )
+            except Exception as err:
+                logger.warning(
+                    f"Failed to update the memory limit of warm worker {container.id}.",
+                    exc_info=err,
+                )
+                self.resource_limits["memory_limit_bytes"] = parse_bytes(
+                    config.WORKER_QGIS_MEMORY_LIMIT
+                )
+                self.resource_limits["reason"] += (
+                    " Failed to apply the memory limit to the warm worker, used the default."
+                )
+
+            logger.info(f"Handing over the job to warm worker {container.id} ...")
+
+            warm_worker.assign(self.job, command[2:], environment)
+        else:
+            self.warm_worker_feedback = {
+                "is_warm": False,
+                "saved_startup_s": 0,
+            }
+
+            container: Container = client.containers.run(  # type:ignore
+                settings.QFIELDCLOUD_QGIS_IMAGE_NAME,
+                command,
+                environment=environment,
+                volumes=volumes,
+                # auto_remove=True,
+                network=settings.QFIELDCLOUD_DEFAULT_NETWORK,
+                detach=True,
+                mem_limit=self.resource_limits["memory_limit_bytes"],
+                cpu_shares=config.WORKER_QGIS_CPU_SHARES,
+                labels={
+                    "app": f"{settings.ENVIRONMENT}_worker",
+                    "type": self.job.type,
+                    "job_id": str(self.job.id),
+                    "project_id": str(self.job.project_id),
+                },
+            )
 
         self.job.container_id = container.id
         self.job.save(update_fields=["docker_started_at", "container_id"])
+
+        if warm_worker:
+            warm_worker_pool.mark_assigned(warm_worker)
+
         logger.info(f"Starting worker {container.id} ...")
 
+        log_streamer = JobLogStreamer(self.job, container)
+        log_streamer.start()
+
+        stats_collector = ContainerStatsCollector(container)
+        stats_collector.start()
+
         response = {"StatusCode": TIMEOUT_ERROR_EXIT_CODE}
 
         try:
             # will throw an `requests.exceptions.ConnectionError`, but the container is still alive
             response = container.wait(timeout=self.container_timeout_secs)
 
-            if response["StatusCode"] == DOCKER_SIGKILL_EXIT_CODE:
+            # NOTE the out of memory killed container has the same exit code as the cancelled one
+            self.is_oom_killed = self._get_is_oom_killed(container)
+
+            if (
+                response["StatusCode"] == DOCKER_SIGKILL_EXIT_CODE
+                and not self.is_oom_killed
+            ):
                 logger.info(
                     "Job canceled, probably due to deleted Project and Jobs.",
                 )
 
+                log_streamer.join(timeout=LOG_STREAM_JOIN_TIMEOUT_S)
+
                 # No further action required, received by wrapper's autoclean mechanism when the `Project` is deleted
                 return (
                     response["StatusCode"],
@@ -351,14 +703,6 @@ class JobRun:
         self.job.docker_finished_at = timezone.now()
         self.job.save(update_fields=["docker_finished_at"])
 
-        logs = b""
-        # Retry reading the logs, as it may fail
-        # NOTE when reading the logs of a finished container, it might timeout with an ``.
-        # This leads to exception and prevents the container to be removed few lines below.
-        # Therefore try reading the logs, as they are important, and if it fails, just use a
-        # generic "failed to read logs" message.
-        # Similar issue here: https://github.com/docker/docker-py/issues/2266
-
         retriable = retry(
             wait=wait_random_exponential(max=10),
             stop=stop_after_attempt(RETRY_COUNT),
@@ -366,26 +710,250 @@ class JobRun:
             reraise=True,
         )
 
-        try:
-            logs = retriable(lambda: container.logs())()
-        except requests.exceptions.ConnectionError:
-            logs = b"[QFC/Worker/1001] Failed to read logs."
-
         retriable(lambda: container.stop())()
-        retriable(lambda: container.remove())()
 
-        logger.info(
-            f"Finished execution with code {response['StatusCode']}, logs:\n{logs.decode()}"
-        )
+        # the log and stats streams end once the container is stopped
+        log_streamer.join(timeout=LOG_STREAM_JOIN_TIMEOUT_S)
+        stats_collector.join(timeout=LOG_STREAM_JOIN_TIMEOUT_S)
 
+        self._save_container_stats(stats_collector)
+
+        timeout_msg = ""
         if response["StatusCode"] == TIMEOUT_ERROR_EXIT_CODE:
-            logs += f"\nTimeout error! The job failed to finish within {self.container_timeout_secs} seconds!\n".encode()
+            timeout_msg = f"\nTimeout error! The job failed to finish within {self.container_timeout_secs} seconds!\n"
+
+        logs: bytes | None = None
+        if log_streamer.is_complete:
+            log_streamer.append(timeout_msg)
+            log_streamer.flush()
+        else:
+            logger.warning(
+                f"Streaming the logs of worker {container.id} failed, reading them at once."
+            )
+
+            # Retry reading the logs, as it may fail
+            # NOTE when reading the logs of a finished container, it might timeout with an ``.
+            # This leads to exception and prevents the container to be removed few lines below.
+            # Therefore try reading the logs, as they are important, and if it fails, just use a
+            # generic "failed to read logs" message.
+            # Similar issue here: https://github.com/docker/docker-py/issues/2266
+            try:
+                logs = retriable(lambda: container.logs())()
+            except requests.exceptions.ConnectionError:
+                logs = b"[QFC/Worker/1001] Failed to read logs."
+
+            logs += timeout_msg.encode()
+
+        retriable(lambda: container.remove())()
+
+        logger.info(f"Finished execution with code {response['StatusCode']}.")
 
         return response["StatusCode"], logs
 
+    def get_resource_limits(self) -> dict[str, Any]:
+        """Chooses the memory limit and the timeout of the worker container.
+
+        If `WORKER_ADAPTIVE_LIMITS` is enabled, the limits are derived from the recent jobs of the same project and type,
+        see `jobs.get_adaptive_resource_limits`. Otherwise the global `WORKER_QGIS_MEMORY_LIMIT` and `WORKER_TIMEOUT_S` are used.
+
+        Returns:
+            dict[str, Any]: the `memory_limit_bytes`, the `timeout_s` and a human readable `reason` for them.
+        """
+        memory_limit_bytes = parse_bytes(config.WORKER_QGIS_MEMORY_LIMIT)
+        timeout_s = config.WORKER_TIMEOUT_S
+
+        if not config.WORKER_ADAPTIVE_LIMITS:
+            return {
+                "memory_limit_bytes": memory_limit_bytes,
+                "timeout_s": timeout_s,
+                "reason": "Adaptive limits are disabled, used the defaults.",
+            }
+
+        resource_limits = jobs.get_adaptive_resource_limits(
+            self.job,
+            parse_bytes(config.WORKER_QGIS_MEMORY_LIMIT_MIN),
+            parse_bytes(config.WORKER_QGIS_MEMORY_LIMIT_MAX),
+        )
+
+        if resource_limits is None:
+            return {
+                "memory_limit_bytes": memory_limit_bytes,
+                "timeout_s": timeout_s,
+                "reason": "No recent jobs of the same project and type, used the defaults.",
+            }
+
+        return resource_limits
+
+    def _get_is_oom_killed(self, container: Container) -> bool:
+        try:
+            container.reload()
+
+            return bool(container.attrs["State"].get("OOMKilled"))
+        except Exception as err:
+            logger.warning(
+                f"Failed to check whether worker {container.id} ran out of memory.",
+                exc_info=err,
+            )
+
+            return False
+
+    def _save_container_stats(self, stats_collector: ContainerStatsCollector) -> None:
+        stats = stats_collector.get_stats()
+
+        logger.info(f"Job {self.job.id} container stats: {json.dumps(stats)}")
+
+        try:
+            JobContainerStats.objects.update_or_create(
+                job_id=self.job.pk,
+                defaults={
+                    **stats,
+                    "is_oom_killed": self.is_oom_killed,
+                },
+            )
+        except Exception as err:
+            # the stats are nice to have, never fail the job because of them
+            logger.error(
+                f"Failed to save the container stats of job {self.job.id}.",
+                exc_info=err,
+            )
+
+    def _save_step_metrics(self, feedback: dict[str, Any]) -> None:
+        """Stores the metrics of each workflow step from the feedback, so they can be aggregated across jobs."""
+        try:
+            step_metrics = []
+            for step_index, step in enumerate(feedback.get("steps", [])):
+                metrics = step.get("metrics")
+
+                if not metrics:
+                    continue
+
+                step_metrics.append(
+                    JobStepMetrics(
+                        job_id=self.job.pk,
+                        step_index=step_index,
+                        step_id=step["id"],
+                        stage=step["stage"],
+                        wall_time_s=metrics["wall_time_s"],
+                        cpu_time_s=metrics["cpu_time_s"],
+                        peak_rss_delta_bytes=metrics["peak_rss_delta_bytes"],
+                        read_bytes=metrics["read_bytes"],
+                        write_bytes=metrics["write_bytes"],
+                    )
+                )
+
+            with transaction.atomic():
+                # NOTE the job might be rerun, keep only the metrics of the latest run
+                JobStepMetrics.objects.filter(job_id=self.job.pk).delete()
+                JobStepMetrics.objects.bulk_create(step_metrics)
+        except Exception as err:
+            # the metrics are nice to have, never fail the job because of them
+            logger.error(
+                f"Failed to save the step metrics of job {self.job.id}.",
+                exc_info=err,
+            )
+
+    def get_checkpoint_dir(self) -> Path:
+        return CHECKPOINTS_DIR.joinpath(self.job.type, str(self.job.project_id))
+
+    def get_checkpoint_revision(self) -> str:
+        """Returns the revision of the job inputs, the checkpoint is restored only for the same revision.
+
+        Only the file based layers are tracked by `data_last_updated_at`, so an empty revision is returned
+        if the project might have online vector layers, which disables the checkpoint.
+        The checkpoints are discarded after `WORKER_CHECKPOINT_MAX_AGE_S` anyway.
+        """
+        # the data of the online vector layers (PostGIS, WFS etc) might change without notice
+        if self.job.project.has_online_vector_data is not False:
+            return ""
+
+        data_last_updated_at = self.job.project.data_last_updated_at
+        revision = json.dumps(
+            [
+                self.get_command(),
+                data_last_updated_at.isoformat() if data_last_updated_at else None,
+            ]
+        )
+
+        return hashlib.sha256(revision.encode()).hexdigest()
+
+    def _restore_checkpoint(self) -> None:
+        """Moves the checkpoint of a previous failed job with the same revision into the `/io` directory of the worker."""
+        self.checkpoint_feedback = {"is_restored": False}
+
+        try:
+            self.checkpoint_revision = self.get_checkpoint_revision()
+            checkpoint_dir = self.get_checkpoint_dir()
+            revision_filename = checkpoint_dir.joinpath("revision")
+
+            if not self.checkpoint_revision:
+                shutil.rmtree(str(checkpoint_dir), ignore_errors=True)
+                return
+
+            try:
+                revision = revision_filename.read_text()
+                age_s = time.time() - revision_filename.stat().st_mtime
+            except FileNotFoundError:
+                return
+
+            if (
+                revision == self.checkpoint_revision
+                and age_s <= config.WORKER_CHECKPOINT_MAX_AGE_S
+            ):
+                shutil.move(
+                    str(checkpoint_dir.joinpath("checkpoint")),
+                    str(self.shared_tempdir.joinpath("checkpoint")),
+                )
+
+                self.checkpoint_feedback = {
+                    "is_restored": True,
+                    "age_s": round(age_s),
+                }
+
+                logger.info(f"Restored the workflow checkpoint of job {self.job.id}.")
+
+            # the checkpoint is either restored or stale
+            shutil.rmtree(str(checkpoint_dir), ignore_errors=True)
+        except Exception as err:
+            # the checkpoint is best effort, the job just runs from the start
+            logger.error(
+                f"Failed to restore the workflow checkpoint of job {self.job.id}.",
+                exc_info=err,
+            )
+
+    def _store_checkpoint(self) -> None:
+        """Keeps the workflow checkpoint of the failed job, so the next job with the same revision can resume from it."""
+        try:
+            checkpoint_dir = self.get_checkpoint_dir()
+            shutil.rmtree(str(checkpoint_dir), ignore_errors=True)
+
+            if (
+                self.checkpoint_revision
+                and self.shared_tempdir.joinpath("checkpoint").is_dir()
+            ):
+                checkpoint_dir.mkdir(parents=True)
+                shutil.move(
+                    str(self.shared_tempdir.joinpath("checkpoint")),
+                    str(checkpoint_dir.joinpath("checkpoint")),
+                )
+                checkpoint_dir.joinpath("revision").write_text(self.checkpoint_revision)
+
+            # the checkpoints of the projects that never got another job
+            for revision_filename in CHECKPOINTS_DIR.glob("*/*/revision"):
+                if (
+                    time.time() - revision_filename.stat().st_mtime
+                    > config.WORKER_CHECKPOINT_MAX_AGE_S
+                ):
+                    shutil.rmtree(str(revision_filename.parent), ignore_errors=True)
+        except Exception as err:
+            logger.error(
+                f"Failed to store the workflow checkpoint of job {self.job.id}.",
+                exc_info=err,
+            )
+
 
 class PackageJobRun(JobRun):
     job_class = PackageJob
+    is_resumable = True
     command = [
         "package",
         "%(project__id)s",
@@ -393,12 +961,141 @@ class PackageJobRun(JobRun):
         "%(project__packaging_offliner)s",
     ]
     data_last_packaged_at = None
+    package_cache_key: str | None = None
+
+    def get_package_cache_key(self) -> str | None:
+        """Returns the key of the package built from the current project files, or `None` if the package cannot be reused.
+
+        The key covers:
+        - the name and the ETag of each project file.
+        - the project fields used for packaging, e.g. the QGIS project file name and the offliner type.
+        - the names of the project secrets. Their values matter only for the online layers, which never reuse the package.
+        - the QGIS worker image, which pins the libqfieldsync and QGIS versions.
+
+        NOTE the area of interest and the rest of the packaging configuration are stored in the QGIS project file,
+        so they are covered by its ETag. Any packaging configuration stored elsewhere must be added to the key.
+        """
+        project = self.job.project
+
+        # the data of the online vector layers (PostGIS, WFS etc) might change without notice
+        if project.has_online_vector_data is not False:
+            return None
+
+        # TODO Delete with QF-4963 Drop support for legacy storage
+        if project.uses_legacy_storage:
+            return None
+
+        # used for local development of QFieldCloud, the mounted libqfieldsync is not part of the image
+        if settings.QFIELDCLOUD_LIBQFIELDSYNC_VOLUME_PATH:
+            return None
+
+        files = list(
+            File.objects.filter(
+                project=project,
+                file_type=File.FileType.PROJECT_FILE,
+            )
+            .order_by("name")
+            .values_list("name", "latest_version__etag")
+        )
+
+        secrets = list(
+            project.secrets.order_by("name").values_list("name", "type", "created_at")
+        )
+
+        key = json.dumps(
+            {
+                "files": files,
+                "project": {
+                    "id": str(project.id),
+                    "the_qgis_file_name": project.the_qgis_file_name,
+                    "packaging_offliner": project.packaging_offliner,
+                },
+                "secrets": secrets,
+                "command": self.get_command(),
+                "image_id": get_qgis_image_id(),
+            },
+            sort_keys=True,
+            default=str,
+        )
+
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def reuse_previous_run(self) -> bool:
+        try:
+            self.package_cache_key = self.get_package_cache_key()
+        except Exception as err:
+            logger.warning(
+                f"Failed to get the package cache key of job {self.job.id}.",
+                exc_info=err,
+            )
+            return False
+
+        if not self.package_cache_key:
+            return False
+
+        previous_job = self.job.project.last_package_job
+
+        if (
+            previous_job is None
+            or previous_job.status != Job.Status.FINISHED
+            or (previous_job.feedback or {}).get("package_cache", {}).get("key")
+            != self.package_cache_key
+            or not File.objects.filter(
+                project=self.job.project,
+                file_type=File.FileType.PACKAGE_FILE,
+                package_job=previous_job,
+            ).exists()
+        ):
+            return False
+
+        logger.info(
+            f"Reusing the package of job {previous_job.id} for job {self.job.id}."
+        )
+
+        now = timezone.now()
+
+        self.job.feedback = {
+            **{
+                key: value
+                for key, value in previous_job.feedback.items()
+                if key
+                in (
+                    "feedback_version",
+                    "workflow_version",
+                    "workflow_id",
+                    "workflow_name",
+                    "steps",
+                    "outputs",
+                )
+            },
+            "package_cache": {
+                "key": self.package_cache_key,
+                "is_hit": True,
+                "package_job_id": str(previous_job.id),
+            },
+        }
+        self.job.output = f"The project files have not changed since they were packaged by job {previous_job.id}, reusing that package."
+        self.job.status = Job.Status.FINISHED
+        self.job.finished_at = now
+        self.job.save(update_fields=["feedback", "output", "status", "finished_at"])
+
+        # NOTE the project keeps pointing to the package files of the previous job
+        self.job.project.data_last_packaged_at = now
+        self.job.project.save(update_fields=["data_last_packaged_at"])
+
+        return True
 
     def before_docker_run(self) -> None:
         # at the start of docker we assume we make the snapshot of the data
         self.data_last_packaged_at = timezone.now()
 
     def after_docker_run(self) -> None:
+        self.job.feedback["package_cache"] = {
+            "key": self.package_cache_key,
+            "is_hit": False,
+        }
+        self.job.save(update_fields=["feedback"])
+
         # only successfully finished packaging jobs should update the Project.data_last_packaged_at
         self.job.project.data_last_packaged_at = self.data_last_packaged_at
         self.job.project.last_package_job = self.job
@@ -467,15 +1164,12 @@ class DeltaApplyJobRun(JobRun):
         if self.job.overwrite_conflicts:
             self.command = [*self.command, "--overwrite-conflicts"]
 
-    def _prepare_deltas(self, deltas: Iterable[Delta]) -> dict[str, Any]:
-        delta_contents = []
-        delta_client_ids = []
-
-        for delta in deltas:
-            delta_contents.append(delta.content)
+    def _write_deltafile(self, deltas: QuerySet[Delta], filename: Path) -> None:
+        """Writes the deltas file as JSON Lines, a header line with the delta file attributes, then a line per delta.
 
-            if "clientId" in delta.content:
-                delta_client_ids.append(delta.content["clientId"])
+        The deltas are streamed from the database, so the whole delta file is never held in memory.
+        """
+        delta_client_ids = deltas.order_by().values("client_id").distinct()
 
         local_to_remote_pk_deltas = Delta.objects.filter(
             client_id__in=delta_client_ids,
@@ -488,8 +1182,7 @@ class DeltaApplyJobRun(JobRun):
             key = f"{delta_with_modified_pk['client_id']}__{delta_with_modified_pk['content__localPk']}"
             client_pks_map[key] = delta_with_modified_pk["last_modified_pk"]
 
-        deltafile_contents = {
-            "deltas": delta_contents,
+        deltafile_header = {
             "files": [],
             "id": str(uuid.uuid4()),
             "project": str(self.job.project.id),
@@ -497,14 +1190,21 @@ class DeltaApplyJobRun(JobRun):
             "clientPks": client_pks_map,
         }
 
-        return deltafile_contents
+        with open(filename, "w") as f:
+            f.write(json.dumps(deltafile_header))
+            f.write("\n")
+
+            for content in deltas.values_list("content", flat=True).iterator(
+                chunk_size=DELTAFILE_CHUNK_SIZE
+            ):
+                f.write(json.dumps(content))
+                f.write("\n")
 
     @transaction.atomic()
     def before_docker_run(self) -> None:
         deltas = self.job.deltas_to_apply.all()
-        deltafile_contents = self._prepare_deltas(deltas)
 
-        self.delta_ids = [d.id for d in deltas]
+        self.delta_ids = list(deltas.values_list("id", flat=True))
 
         ApplyJobDelta.objects.filter(
             apply_job_id=self.job_id,
@@ -513,46 +1213,11 @@ class DeltaApplyJobRun(JobRun):
 
         self.job.deltas_to_apply.update(last_status=Delta.Status.STARTED)
 
-        with open(self.shared_tempdir.joinpath("deltafile.json"), "w") as f:
-            json.dump(deltafile_contents, f)
+        self._write_deltafile(deltas, self.shared_tempdir.joinpath("deltafile.jsonl"))
 
     def after_docker_run(self) -> None:
         delta_feedback = self.job.feedback["outputs"]["apply_deltas"]["delta_feedback"]
-        is_data_modified = False
-
-        for feedback in delta_feedback:
-            delta_id = feedback["delta_id"]
-            status = feedback["status"]
-            modified_pk = feedback["modified_pk"]
-
-            if status == "status_applied":
-                status = Delta.Status.APPLIED
-                is_data_modified = True
-            elif status == "status_conflict":
-                status = Delta.Status.CONFLICT
-            elif status == "status_apply_failed":
-                status = Delta.Status.NOT_APPLIED
-            else:
-                status = Delta.Status.ERROR
-                # not certain what happened
-                is_data_modified = True
-
-            Delta.objects.filter(pk=delta_id).update(
-                last_status=status,
-                last_feedback=feedback,
-                last_modified_pk=modified_pk,
-                last_apply_attempt_at=self.job.started_at,
-                last_apply_attempt_by=self.job.created_by,
-            )
-
-            ApplyJobDelta.objects.filter(
-                apply_job_id=self.job_id,
-                delta_id=delta_id,
-            ).update(
-                status=status,
-                feedback=feedback,
-                modified_pk=modified_pk,
-            )
+        is_data_modified = jobs.save_apply_job_delta_feedback(self.job, delta_feedback)
 
         if is_data_modified:
             self.job.project.data_last_updated_at = timezone.now()
@@ -633,6 +1298,249 @@ class ProcessProjectfileJobRun(JobRun):
             project.save(update_fields=("project_details",))
 
 
+class WarmWorker:
+    """A pre-started QGIS worker container, which already initialized QGIS and waits for a job."""
+
+    def __init__(
+        self, container: Container, shared_tempdir: Path, started_at: float
+    ) -> None:
+        self.container = container
+        self.shared_tempdir = shared_tempdir
+        self.started_at = started_at
+
+    def is_running(self) -> bool:
+        try:
+            self.container.reload()
+        except docker.errors.NotFound:
+            return False
+
+        return self.container.status == "running"
+
+    def get_startup_duration(self) -> float | None:
+        """Returns the seconds the worker needed to start and initialize QGIS, or None if not ready yet."""
+        try:
+            with open(self.shared_tempdir.joinpath("ready.json")) as f:
+                return json.load(f)["ready_at"] - self.started_at
+        except Exception:
+            return None
+
+    def assign(self, job: Job, args: list[str], environment: dict[str, str]) -> None:
+        job_filename = self.shared_tempdir.joinpath("job.json")
+        tmp_job_filename = self.shared_tempdir.joinpath("job.json.tmp")
+
+        # NOTE the job contains the job token and the project secrets, only the owner may read it
+        with open(
+            os.open(tmp_job_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+            "w",
+        ) as f:
+            json.dump({"args": args, "environment": environment}, f)
+
+        # NOTE the rename is atomic, so the worker never reads a partially written file
+        tmp_job_filename.rename(job_filename)
+
+        # NOTE the labels of a container cannot be changed, so the assigned job is recorded in the container name
+        try:
+            self.container.rename(f"{settings.ENVIRONMENT}_worker_{job.type}_{job.id}")
+        except APIError as err:
+            logger.warning(
+                f"Failed to rename warm worker {self.container.id} assigned to job {job.id}.",
+                exc_info=err,
+            )
+
+    def remove(self) -> None:
+        try:
+            self.container.kill()
+        except APIError:
+            # Container already stopped
+            pass
+
+        try:
+            self.container.remove()
+        except APIError:
+            # Container already removed
+            pass
+
+        shutil.rmtree(str(self.shared_tempdir), ignore_errors=True)
+
+
+class WarmWorkerPool:
+    """A pool of idle `WarmWorker`s, so jobs do not wait for the container and QGIS to start.
+
+    Each warm worker runs a single job and then exits, as the job token, the project secrets and
+    the QGIS state should never be shared between jobs.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle_workers: list[WarmWorker] = []
+        # container ids of the workers that are acquired, but not yet stored as `Job.container_id`
+        self._assigning_container_ids: set[str] = set()
+        self._checked_at = 0.0
+
+    def get_reserved_container_ids(self) -> set[str]:
+        with self._lock:
+            return {
+                *[w.container.id for w in self._idle_workers],
+                *self._assigning_container_ids,
+            }
+
+    def acquire(self) -> WarmWorker | None:
+        with self._lock:
+            while self._idle_workers:
+                warm_worker = self._idle_workers.pop(0)
+
+                if warm_worker.is_running():
+                    self._assigning_container_ids.add(warm_worker.container.id)
+
+                    return warm_worker
+
+                logger.info(f"Removing exited warm worker {warm_worker.container.id}")
+                warm_worker.remove()
+
+        return None
+
+    def mark_assigned(self, warm_worker: WarmWorker) -> None:
+        with self._lock:
+            self._assigning_container_ids.discard(warm_worker.container.id)
+
+    def fill(self, size: int) -> None:
+        """Starts or removes warm workers, so there are exactly `size` idle ones."""
+        with self._lock:
+            # NOTE the warm workers exit on their own after the idle timeout, they should not count as idle.
+            # `acquire` checks each worker anyway, so it is fine to notice the exited ones a bit later.
+            if time.monotonic() - self._checked_at >= WARM_WORKER_CHECK_INTERVAL_S:
+                self._checked_at = time.monotonic()
+
+                for warm_worker in [
+                    w for w in self._idle_workers if not w.is_running()
+                ]:
+                    logger.info(
+                        f"Removing exited warm worker {warm_worker.container.id}"
+                    )
+                    self._idle_workers.remove(warm_worker)
+                    warm_worker.remove()
+
+            idle_count = len(self._idle_workers)
+
+            while len(self._idle_workers) > size:
+                self._idle_workers.pop().remove()
+
+        for _i in range(size - idle_count):
+            warm_worker = self._start_worker()
+
+            with self._lock:
+                self._idle_workers.append(warm_worker)
+
+    def clear(self) -> None:
+        """Removes all idle warm workers of this wrapper, including the ones left from a previous run."""
+        with self._lock:
+            self._idle_workers = []
+
+        client: DockerClient = docker.from_env()
+        containers: list[Container] = client.containers.list(
+            all=True,
+            filters={
+                "label": [
+                    f"app={settings.ENVIRONMENT}_worker",
+                    "type=warm",
+                    f"wrapper={WRAPPER_ID}",
+                ]
+            },
+        )
+        assigned_container_ids = set(
+            Job.objects.filter(
+                container_id__in=[c.id for c in containers],
+            ).values_list("container_id", flat=True)
+        )
+
+        for container in containers:
+            if container.id in assigned_container_ids:
+                continue
+
+            WarmWorker(
+                container,
+                Path(container.labels.get("shared_tempdir", "")),
+                0,
+            ).remove()
+
+    def _start_worker(self) -> WarmWorker:
+        client: DockerClient = docker.from_env()
+        shared_tempdir = Path(tempfile.mkdtemp(dir=TMP_FILE))
+        volumes = [
+            f"{str(shared_tempdir)}:/io/:rw",
+            f"{settings.QFIELDCLOUD_TRANSFORMATION_GRIDS_VOLUME_NAME}:/transformation_grids:ro",
+        ]
+
+        # used for local development of QFieldCloud
+        if settings.QFIELDCLOUD_LIBQFIELDSYNC_VOLUME_PATH:
+            volumes.append(
+                f"{settings.QFIELDCLOUD_LIBQFIELDSYNC_VOLUME_PATH}:/libqfieldsync:ro"
+            )
+
+        # used for local development of QFieldCloud
+        if settings.QFIELDCLOUD_QFIELDCLOUD_SDK_VOLUME_PATH:
+            volumes.append(
+                f"{settings.QFIELDCLOUD_QFIELDCLOUD_SDK_VOLUME_PATH}:/qfieldcloud-sdk-python:ro"
+            )
+
+        if settings.QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME:
+            volumes.append(
+                f"{settings.QFIELDCLOUD_WORKER_FILE_CACHE_VOLUME_NAME}:/file_cache:rw"
+            )
+
+        started_at = time.time()
+        container: Container = client.containers.run(  # type:ignore
+            settings.QFIELDCLOUD_QGIS_IMAGE_NAME,
+            [
+                "python3",
+                "entrypoint.py",
+                "wait_for_job",
+                "--idle-timeout",
+                str(WARM_WORKER_IDLE_TIMEOUT_S),
+            ],
+            environment={
+                "QFIELDCLOUD_URL": settings.QFIELDCLOUD_WORKER_QFIELDCLOUD_URL,
+                "PROJ_DOWNLOAD_DIR": "/transformation_grids",
+                "QT_QPA_PLATFORM": "offscreen",
+            },
+            volumes=volumes,
+            network=settings.QFIELDCLOUD_DEFAULT_NETWORK,
+            detach=True,
+            mem_limit=config.WORKER_QGIS_MEMORY_LIMIT,
+            cpu_shares=config.WORKER_QGIS_CPU_SHARES,
+            labels={
+                "app": f"{settings.ENVIRONMENT}_worker",
+                "type": "warm",
+                "wrapper": WRAPPER_ID,
+                "shared_tempdir": str(shared_tempdir),
+            },
+        )
+
+        logger.info(f"Started warm worker {container.id}")
+
+        return WarmWorker(container, shared_tempdir, started_at)
+
+
+warm_worker_pool = WarmWorkerPool()
+
+# the id of the QGIS worker image and when it was read, see `get_qgis_image_id`
+_qgis_image_id: tuple[str, float] | None = None
+
+
+def get_qgis_image_id() -> str:
+    """Returns the id of the QGIS worker image, cached for `QGIS_IMAGE_ID_CACHE_TTL_S`, so each job does not query docker."""
+    global _qgis_image_id
+
+    if (
+        _qgis_image_id is None
+        or time.monotonic() - _qgis_image_id[1] > QGIS_IMAGE_ID_CACHE_TTL_S
+    ):
+        image = docker.from_env().images.get(settings.QFIELDCLOUD_QGIS_IMAGE_NAME)
+        _qgis_image_id = (image.id, time.monotonic())
+
+    return _qgis_image_id[0]
+
+
 def cancel_orphaned_workers() -> None:
     client: DockerClient = docker.from_env()
 
@@ -657,6 +1565,14 @@ def cancel_orphaned_workers() -> None:
     # Find all running worker containers where its Project and Job were deleted from the database
     worker_without_job_ids = set(worker_ids) - set(worker_with_job_ids)
 
+    # Idle warm workers have no job yet, the ones of other wrappers are handled by their own wrapper
+    worker_without_job_ids -= warm_worker_pool.get_reserved_container_ids()
+    worker_without_job_ids -= {
+        c.id
+        for c in running_workers
+        if c.labels.get("wrapper", WRAPPER_ID) != WRAPPER_ID
+    }
+
     for worker_id in worker_without_job_ids:
         container = client.containers.get(worker_id)
         try:
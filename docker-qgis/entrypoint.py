@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import logging
 import os
+import time
 from pathlib import Path
-from typing import Union
 
 import qfc_worker.apply_deltas
 import qfc_worker.process_projectfile
@@ -13,30 +14,30 @@ from libqfieldsync.offliners import OfflinerType, PythonMiniOffliner, QgisCoreOf
 from libqfieldsync.project import ProjectConfiguration
 from libqfieldsync.utils.file_utils import get_project_in_folder
 from qfc_worker.utils import (
+    ProjectSession,
     Step,
     StepOutput,
     WorkDirPath,
     WorkDirPathAsStr,
     Workflow,
-    get_layers_data,
     layers_data_to_string,
-    open_qgis_project,
 )
-from qgis.core import QgsCoordinateTransform, QgsProject, QgsRectangle
+from qgis.core import QgsProject, QgsRectangle
 
-PGSERVICE_FILE_CONTENTS = os.environ.get("PGSERVICE_FILE_CONTENTS")
+# how often to check whether the worker wrapper handed over a job to a warm worker
+WAIT_FOR_JOB_POLL_INTERVAL_S = 0.05
 
 logger = logging.getLogger("ENTRYPNT")
 logger.setLevel(logging.INFO)
 
 
 def _call_libqfieldsync_packager(
-    the_qgis_file_name: Path, package_dir: Path, offliner_type: OfflinerType
+    project_session: ProjectSession, package_dir: Path, offliner_type: OfflinerType
 ) -> str:
     """Call `libqfieldsync` to package a project for QField"""
     logger.info("Preparing QGIS project for packaging…")
 
-    project = open_qgis_project(str(the_qgis_file_name))
+    project = project_session.project
 
     layers = project.mapLayers()
     project_config = ProjectConfiguration(project)
@@ -49,32 +50,17 @@ def _call_libqfieldsync_packager(
         vl_extent_wkt = project_config.area_of_interest
         vl_extent_crs = project_config.area_of_interest_crs
     else:
-        vl_extent = QgsRectangle()
-        for layer in layers.values():
-            layer_extent = layer.extent()
-
-            if layer_extent.isNull() or not layer_extent.isFinite():
-                continue
-
-            try:
-                transform = QgsCoordinateTransform(layer.crs(), project.crs(), project)
-                vl_extent.combineExtentWith(
-                    transform.transformBoundingBox(layer_extent)
-                )
-            except Exception as err:
-                logger.error(
-                    "Failed to transform the bbox for layer {} from {} to {} CRS.".format(
-                        layer.name(), layer.crs(), project.crs()
-                    ),
-                    exc_info=err,
-                )
+        vl_extent = qfc_worker.utils.get_layers_extent(
+            project,
+            list(layers.values()),
+            concurrency=qfc_worker.utils.get_package_layer_concurrency(),
+        )
 
         if vl_extent.isNull() or not vl_extent.isFinite():
             logger.info("Failed to obtain the project extent from project layers.")
 
             try:
-                vl_extent = qfc_worker.utils.extract_project_details(project)["extent"]
-                vl_extent = QgsRectangle.fromWkt(vl_extent)
+                vl_extent = QgsRectangle.fromWkt(project_session.get_extent_wkt())
             except Exception as err:
                 logger.error(
                     "Failed to get the project extent from the current map canvas.",
@@ -131,11 +117,10 @@ def _call_libqfieldsync_packager(
     return the_packaged_qgis_filename
 
 
-def _extract_layer_data(the_qgis_file_name: Union[str, Path]) -> dict:
+def _extract_layer_data(project_session: ProjectSession) -> dict:
     logger.info("Extracting QGIS project layer data…")
 
-    project = open_qgis_project(str(the_qgis_file_name))
-    layers_by_id: dict = get_layers_data(project)
+    layers_by_id: dict = project_session.get_layers_data()
 
     logger.info(
         f"QGIS project layer data\n{layers_data_to_string(layers_by_id)}",
@@ -144,7 +129,7 @@ def _extract_layer_data(the_qgis_file_name: Union[str, Path]) -> dict:
     return layers_by_id
 
 
-def _open_read_only_project(the_qgis_file_name: str) -> QgsProject:
+def _open_read_only_project(the_qgis_file_name: str) -> ProjectSession:
     flags = (
         # TODO we use `QgsProject` read flags, as the ones in `Qgis.ProjectReadFlags` do not work in QGIS 3.34.2
         QgsProject.ReadFlags()
@@ -153,7 +138,7 @@ def _open_read_only_project(the_qgis_file_name: str) -> QgsProject:
         | QgsProject.FlagDontLoad3DViews
         | QgsProject.DontLoadProjectStyles
     )
-    return open_qgis_project(
+    return ProjectSession.open(
         the_qgis_file_name,
         force_reload=True,
         disable_feature_count=True,
@@ -183,40 +168,65 @@ def cmd_package_project(args: argparse.Namespace):
                     "skip_attachments": True,
                 },
                 method=qfc_worker.utils.download_project,
-                return_names=["tmp_project_dir"],
+                return_names=["tmp_project_dir", "file_cache_stats", "transfer_stats"],
+                thread_safe=True,
+                checkpoint=True,
+            ),
+            Step(
+                id="open_project",
+                name="Open Project",
+                arguments={
+                    "the_qgis_file_name": WorkDirPathAsStr("files", args.project_file),
+                },
+                method=qfc_worker.utils.open_project_session,
+                return_names=["project_session"],
             ),
             Step(
                 id="qgis_layers_data",
                 name="QGIS Layers Data",
                 arguments={
-                    "the_qgis_file_name": WorkDirPath("files", args.project_file),
+                    "project_session": StepOutput("open_project", "project_session"),
                 },
                 method=_extract_layer_data,
                 return_names=["layers_by_id"],
                 outputs=["layers_by_id"],
+                checkpoint=True,
             ),
             Step(
                 id="package_project",
                 name="Package Project",
                 arguments={
-                    "the_qgis_file_name": WorkDirPath("files", args.project_file),
+                    "project_session": StepOutput("open_project", "project_session"),
                     "package_dir": WorkDirPath("export", mkdir=True),
                     "offliner_type": args.offliner_type,
                 },
                 method=_call_libqfieldsync_packager,
                 return_names=["the_qgis_file_name_in_qfield"],
+                checkpoint=True,
             ),
             Step(
-                id="qfield_layer_data",
-                name="Packaged Layers Data",
+                id="open_packaged_project",
+                name="Open Packaged Project",
                 arguments={
                     "the_qgis_file_name": StepOutput(
                         "package_project", "the_qgis_file_name_in_qfield"
                     ),
                 },
+                method=qfc_worker.utils.open_project_session,
+                return_names=["project_session"],
+            ),
+            Step(
+                id="qfield_layer_data",
+                name="Packaged Layers Data",
+                arguments={
+                    "project_session": StepOutput(
+                        "open_packaged_project", "project_session"
+                    ),
+                },
                 method=_extract_layer_data,
                 return_names=["layers_by_id"],
                 outputs=["layers_by_id"],
+                checkpoint=True,
             ),
             Step(
                 id="stop_qgis_app",
@@ -231,6 +241,10 @@ def cmd_package_project(args: argparse.Namespace):
                     "package_dir": WorkDirPath("export", mkdir=True),
                 },
                 method=qfc_worker.utils.upload_package,
+                return_names=["transfer_stats"],
+                # NOTE QGIS keeps the packaged layers open until the app is stopped
+                depends_on=["stop_qgis_app"],
+                thread_safe=True,
             ),
         ],
     )
@@ -238,6 +252,8 @@ def cmd_package_project(args: argparse.Namespace):
     qfc_worker.utils.run_workflow(
         workflow,
         Path("/io/feedback.json"),
+        # NOTE the worker wrapper keeps the checkpoint of the failed jobs, so a retry can skip the already packaged layers
+        checkpoint_dir=Path("/io/checkpoint"),
     )
 
 
@@ -262,16 +278,20 @@ def cmd_apply_deltas(args: argparse.Namespace):
                     "skip_attachments": True,
                 },
                 method=qfc_worker.utils.download_project,
-                return_names=["tmp_project_dir"],
+                return_names=["tmp_project_dir", "file_cache_stats", "transfer_stats"],
+                thread_safe=True,
             ),
             Step(
                 id="apply_deltas",
                 name="Apply Deltas",
                 arguments={
                     "the_qgis_file_name": WorkDirPath("files", args.project_file),
-                    "delta_filename": "/io/deltafile.json",
+                    "delta_filename": "/io/deltafile.jsonl",
                     "inverse": args.inverse,
                     "overwrite_conflicts": args.overwrite_conflicts,
+                    "batched": True,
+                    "transaction": True,
+                    "compact": True,
                 },
                 method=qfc_worker.apply_deltas.delta_apply,
                 return_names=["delta_feedback"],
@@ -290,6 +310,10 @@ def cmd_apply_deltas(args: argparse.Namespace):
                     "project_dir": WorkDirPath("files"),
                 },
                 method=qfc_worker.utils.upload_project,
+                return_names=["transfer_stats"],
+                # NOTE QGIS keeps the modified layers open until the app is stopped
+                depends_on=["stop_qgis_app"],
+                thread_safe=True,
             ),
         ],
     )
@@ -321,7 +345,8 @@ def cmd_process_projectfile(args: argparse.Namespace):
                     "skip_attachments": True,
                 },
                 method=qfc_worker.utils.download_project,
-                return_names=["tmp_project_dir"],
+                return_names=["tmp_project_dir", "file_cache_stats", "transfer_stats"],
+                thread_safe=True,
             ),
             Step(
                 id="project_validity_check",
@@ -330,6 +355,7 @@ def cmd_process_projectfile(args: argparse.Namespace):
                     "the_qgis_file_name": WorkDirPath("files", args.project_file),
                 },
                 method=qfc_worker.process_projectfile.check_valid_project_file,
+                thread_safe=True,
             ),
             Step(
                 id="opening_check",
@@ -338,13 +364,15 @@ def cmd_process_projectfile(args: argparse.Namespace):
                     "the_qgis_file_name": WorkDirPathAsStr("files", args.project_file),
                 },
                 method=_open_read_only_project,
-                return_names=["project"],
+                return_names=["project_session"],
+                # NOTE never open an invalid project file with QGIS
+                depends_on=["project_validity_check"],
             ),
             Step(
                 id="project_details",
                 name="Project Details",
                 arguments={
-                    "project": StepOutput("opening_check", "project"),
+                    "project_session": StepOutput("opening_check", "project_session"),
                 },
                 method=qfc_worker.process_projectfile.extract_project_details,
                 return_names=["project_details"],
@@ -354,7 +382,7 @@ def cmd_process_projectfile(args: argparse.Namespace):
                 id="generate_thumbnail_image",
                 name="Generate Thumbnail Image",
                 arguments={
-                    "the_qgis_file_name": WorkDirPathAsStr("files", args.project_file),
+                    "project_session": StepOutput("opening_check", "project_session"),
                     "thumbnail_filename": Path("/io/thumbnail.png"),
                 },
                 method=qfc_worker.process_projectfile.generate_thumbnail,
@@ -373,20 +401,52 @@ def cmd_process_projectfile(args: argparse.Namespace):
     )
 
 
-def main() -> None:
-    from qfc_worker.utils import setup_basic_logging_config
+def cmd_wait_for_job(args: argparse.Namespace):
+    """Starts the QGIS application in advance and waits for the worker wrapper to hand over a job.
 
-    setup_basic_logging_config()
+    The job is handed over as `/io/job.json` file, containing the job command arguments
+    and the environment variables specific to that job.
+    """
+    qfc_worker.utils.start_app()
 
-    # Set S3 logging levels
-    logging.getLogger("nose").setLevel(logging.CRITICAL)
-    logging.getLogger("s3transfer").setLevel(logging.CRITICAL)
-    logging.getLogger("urllib3").setLevel(logging.CRITICAL)
+    with open("/io/ready.json", "w") as f:
+        json.dump({"ready_at": time.time()}, f)
+
+    logger.info("Warm worker is ready, waiting for a job…")
+
+    job_filename = Path("/io/job.json")
+    waiting_since = time.monotonic()
+
+    while not job_filename.exists():
+        if time.monotonic() - waiting_since > args.idle_timeout:
+            logger.info("No job has been received, exiting.")
+            return
+
+        time.sleep(WAIT_FOR_JOB_POLL_INTERVAL_S)
+
+    with open(job_filename) as f:
+        job = json.load(f)
+
+    # NOTE the job file contains the job token and the project secrets, do not keep it around
+    job_filename.unlink()
 
-    if PGSERVICE_FILE_CONTENTS:
+    os.environ.update(job["environment"])
+
+    setup_pgservice_file()
+
+    job_args = get_parser().parse_args(job["args"])
+    job_args.func(job_args)
+
+
+def setup_pgservice_file() -> None:
+    pgservice_file_contents = os.environ.get("PGSERVICE_FILE_CONTENTS")
+
+    if pgservice_file_contents:
         with open(Path.home().joinpath(".pg_service.conf"), "w") as f:
-            f.write(PGSERVICE_FILE_CONTENTS)
+            f.write(pgservice_file_contents)
+
 
+def get_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="COMMAND")
 
     subparsers = parser.add_subparsers(dest="cmd")
@@ -420,7 +480,34 @@ def main() -> None:
     )
     parser_process_projectfile.set_defaults(func=cmd_process_projectfile)
 
-    args: argparse.Namespace = parser.parse_args()
+    parser_wait_for_job = subparsers.add_parser(
+        "wait_for_job", help="Start QGIS and wait for a job to be handed over"
+    )
+    parser_wait_for_job.add_argument(
+        "--idle-timeout",
+        dest="idle_timeout",
+        type=int,
+        default=3600,
+        help="Exit if no job has been handed over within that many seconds",
+    )
+    parser_wait_for_job.set_defaults(func=cmd_wait_for_job)
+
+    return parser
+
+
+def main() -> None:
+    from qfc_worker.utils import setup_basic_logging_config
+
+    setup_basic_logging_config()
+
+    # Set S3 logging levels
+    logging.getLogger("nose").setLevel(logging.CRITICAL)
+    logging.getLogger("s3transfer").setLevel(logging.CRITICAL)
+    logging.getLogger("urllib3").setLevel(logging.CRITICAL)
+
+    setup_pgservice_file()
+
+    args: argparse.Namespace = get_parser().parse_args()
     args.func(args)
 
 
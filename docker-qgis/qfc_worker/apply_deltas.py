@@ -2,7 +2,7 @@
 
 import re
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Set, Union, cast
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union, cast
 
 try:
     # 3.8
@@ -23,13 +23,16 @@ import jsonschema
 
 # pylint: disable=no-name-in-module
 from qgis.core import (
+    Qgis,
     QgsExpression,
     QgsFeature,
+    QgsFeatureRequest,
     QgsGeometry,
     QgsMapLayer,
     QgsMapLayerType,
     QgsProject,
     QgsProviderRegistry,
+    QgsTransaction,
     QgsVectorLayer,
     QgsVectorLayerEditPassthrough,
     QgsVectorLayerUtils,
@@ -58,6 +61,8 @@ class DeltaOptions(BaseOptions):
     overwrite_conflicts: bool
     inverse: bool
     transaction: bool
+    batched: bool
+    compact: bool
 
 
 class DeltaMethod(str, Enum):
@@ -165,6 +170,12 @@ class DeltaException(Exception):
 
 
 BACKUP_SUFFIX = ".qfieldcloudbackup"
+# the delta files with that suffix are in JSON Lines format, see `delta_file_jsonl_loader`
+DELTA_FILE_JSONL_SUFFIX = ".jsonl"
+# maximum number of deltas applied in a single edit session, see `apply_delta_batch`
+DELTA_BATCH_MAX_SIZE = 1000
+# maximum number of primary keys in a single `IN (...)` filter, see `FeatureCache`
+FEATURE_PREFETCH_CHUNK_SIZE = 1000
 delta_log = []
 
 
@@ -252,6 +263,9 @@ def delta_apply(
     delta_filename: Path,
     inverse: bool,
     overwrite_conflicts: bool,
+    batched: bool = False,
+    transaction: bool = False,
+    compact: bool = False,
 ):
     del delta_log[:]
 
@@ -260,13 +274,16 @@ def delta_apply(
     project.read(str(the_qgis_file_name))
 
     logging.info(f'Loading delta file "{delta_filename}"...')
-    delta_file = delta_file_file_loader({"delta_file": delta_filename})  # type: ignore
-
-    if not delta_file:
-        raise Exception("Missing delta file")
-
-    all_applied = apply_deltas_without_transaction(
-        project, delta_file, inverse, overwrite_conflicts
+    delta_file = load_delta_file({"delta_file": str(delta_filename)})  # type: ignore
+
+    all_applied = apply_deltas(
+        project,
+        delta_file,
+        inverse,
+        overwrite_conflicts,
+        batched,
+        transaction,
+        compact,
     )
 
     project.clear()
@@ -289,11 +306,14 @@ def cmd_delta_apply(project: QgsProject, opts: DeltaOptions) -> bool:
     try:
         del delta_log[:]
         deltas = load_delta_file(opts)
-        accepted_state = apply_deltas_without_transaction(
+        accepted_state = apply_deltas(
             project,
             deltas,
             inverse=opts["inverse"],
             overwrite_conflicts=opts["overwrite_conflicts"],
+            batched=opts.get("batched", False),
+            transaction=opts["transaction"],
+            compact=opts.get("compact", False),
         )
 
         project.clear()
@@ -383,6 +403,46 @@ def get_json_schema_validator() -> jsonschema.Draft7Validator:
     return jsonschema.Draft7Validator(schema_dict)
 
 
+@lru_cache(maxsize=128)
+def get_header_json_schema_validator() -> jsonschema.Draft7Validator:
+    """Creates a JSON schema validator to check whether the header line of a JSON Lines delta file is valid,
+    i.e. the delta file attributes without the `deltas`. The function result is cached.
+
+    Returns:
+        jsonschema.Draft7Validator -- JSON Schema validator
+    """
+    schema_dict = {**get_json_schema_validator().schema}
+    schema_dict["properties"] = {
+        key: value
+        for key, value in schema_dict["properties"].items()
+        if key != "deltas"
+    }
+    schema_dict["required"] = [
+        key for key in schema_dict["required"] if key != "deltas"
+    ]
+
+    return jsonschema.Draft7Validator(schema_dict)
+
+
+@lru_cache(maxsize=128)
+def get_delta_json_schema_validator() -> jsonschema.Draft7Validator:
+    """Creates a JSON schema validator to check whether a single delta is valid. The function result is cached.
+
+    Returns:
+        jsonschema.Draft7Validator -- JSON Schema validator
+    """
+    schema_dict = get_json_schema_validator().schema
+
+    return jsonschema.Draft7Validator(
+        {
+            **schema_dict["properties"]["deltas"]["items"],
+            "$schema": schema_dict["$schema"],
+            # NOTE the `$ref`s in the delta schema point to the definitions of the delta file schema
+            "definitions": schema_dict["definitions"],
+        }
+    )
+
+
 def delta_file_args_loader(args: DeltaOptions) -> Optional[DeltaFile]:
     """Get delta file contents as a dictionary passed in the args. Mostly used for testing.
 
@@ -426,6 +486,9 @@ def delta_file_file_loader(args: DeltaOptions) -> Optional[DeltaFile]:
     delta_file_path = Path(args["delta_file"])  # type: ignore
     delta_file: DeltaFile
 
+    if delta_file_path.suffix == DELTA_FILE_JSONL_SUFFIX:
+        return None
+
     with delta_file_path.open("r") as f:
         obj = json.load(f)
         get_json_schema_validator().validate(obj)
@@ -438,20 +501,96 @@ def delta_file_file_loader(args: DeltaOptions) -> Optional[DeltaFile]:
             obj["clientPks"],
         )
 
-        # NOTE Sometimes QField does not fill the `sourceLayerId` field
-        # In recent QGIS versions, offline editing replaces the data source of the layers, so the layer ids do not change
-        # See https://github.com/opengisch/qfieldcloud/issues/415#issuecomment-1322922349
         for delta in delta_file.deltas:
-            if delta["sourceLayerId"] == "" and delta["localLayerId"] != "":
-                delta["sourceLayerId"] = delta["localLayerId"]
-                logger.warning(
-                    "Patching project %s delta's empty sourceLayerId from localLayerId",
-                    delta_file.project_id,
+            patch_empty_source_layer_id(delta, delta_file.project_id)
+
+    return delta_file
+
+
+def delta_file_jsonl_loader(args: DeltaOptions) -> Optional[DeltaFile]:
+    """Get delta file contents from a filesystem file in JSON Lines format.
+
+    The first line is the delta file attributes without the `deltas`, then each line is a single delta.
+    The file is read and validated line by line, so the raw contents of the whole file are never held in memory.
+    NOTE the parsed deltas are still all kept in `DeltaFile.deltas`, as the batching, the compaction and the feature prefetch need random access to them.
+
+    Arguments:
+        args {DeltaOptions} -- main options
+
+    Returns:
+        Optional[DeltaFile] -- loaded delta file on success, otherwise none
+    """
+    if not isinstance(args.get("delta_file"), str):
+        return None
+
+    delta_file_path = Path(args["delta_file"])  # type: ignore
+
+    if delta_file_path.suffix != DELTA_FILE_JSONL_SUFFIX:
+        return None
+
+    delta_file: Optional[DeltaFile] = None
+    delta_validator = get_delta_json_schema_validator()
+
+    with delta_file_path.open("r") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as err:
+                raise Exception(
+                    f"Invalid JSON on line {line_no} of the delta file: {err}"
+                ) from err
+
+            if delta_file is None:
+                try:
+                    get_header_json_schema_validator().validate(obj)
+                except jsonschema.ValidationError as err:
+                    raise Exception(
+                        f"Invalid header on line {line_no} of the delta file: {err.message}"
+                    ) from err
+
+                delta_file = DeltaFile(
+                    obj["id"],
+                    obj["project"],
+                    obj["version"],
+                    [],
+                    obj["files"],
+                    # NOTE `clientPks` is not required by the schema
+                    obj.get("clientPks", {}),
                 )
+                continue
+
+            try:
+                delta_validator.validate(obj)
+            except jsonschema.ValidationError as err:
+                raise Exception(
+                    f"Invalid delta on line {line_no} of the delta file: {err.message}"
+                ) from err
+
+            delta = cast(Delta, obj)
+            patch_empty_source_layer_id(delta, delta_file.project_id)
+            delta_file.deltas.append(delta)
+
+    if delta_file is None:
+        raise Exception("Empty delta file!")
 
     return delta_file
 
 
+def patch_empty_source_layer_id(delta: Delta, project_id: str) -> None:
+    # NOTE Sometimes QField does not fill the `sourceLayerId` field
+    # In recent QGIS versions, offline editing replaces the data source of the layers, so the layer ids do not change
+    # See https://github.com/opengisch/qfieldcloud/issues/415#issuecomment-1322922349
+    if delta["sourceLayerId"] == "" and delta["localLayerId"] != "":
+        delta["sourceLayerId"] = delta["localLayerId"]
+        logger.warning(
+            "Patching project %s delta's empty sourceLayerId from localLayerId",
+            project_id,
+        )
+
+
 def load_delta_file(args: DeltaOptions) -> DeltaFile:
     """Loads delta file, using the provided {args}.
 
@@ -465,6 +604,7 @@ def load_delta_file(args: DeltaOptions) -> DeltaFile:
 
     delta_file_loaders = [
         delta_file_args_loader,
+        delta_file_jsonl_loader,
         delta_file_file_loader,
     ]
 
@@ -479,201 +619,1096 @@ def load_delta_file(args: DeltaOptions) -> DeltaFile:
     return deltas
 
 
-def apply_deltas_without_transaction(
+def apply_deltas(
     project: QgsProject,
     delta_file: DeltaFile,
     inverse: bool = False,
     overwrite_conflicts: bool = False,
+    batched: bool = False,
+    transaction: bool = False,
+    compact: bool = False,
 ) -> bool:
-    has_applied_all_deltas = True
+    """Applies the deltas, see `apply_deltas_without_transaction` and `apply_deltas_with_transaction`.
 
-    # apply deltas on each individual layer
-    for idx, delta in enumerate(delta_file.deltas):
-        delta_status = DeltaStatus.Applied
-        layer_id: str = delta.get("sourceLayerId", "")
-        layer: QgsVectorLayer = project.mapLayer(layer_id)
-        feature = QgsFeature()
+    If `compact`, the chains of deltas on the same feature are folded first, see `compact_deltas`.
+    The delta log still has an entry per original delta.
 
-        try:
-            if not isinstance(layer, QgsVectorLayer):
-                raise DeltaException(f'No layer with id "{layer_id}"')
+    Returns:
+        bool -- whether all the deltas have been applied
+    """
+    if transaction:
+        apply_deltas_func = apply_deltas_with_transaction
+    else:
+        apply_deltas_func = apply_deltas_without_transaction
 
-            if not layer.isValid():
-                raise DeltaException(f'Invalid layer "{layer_id}"')
+    # NOTE the inverse deltas are applied in the same order, folding them would not be equivalent
+    if not compact or inverse:
+        return apply_deltas_func(
+            project, delta_file, inverse, overwrite_conflicts, batched
+        )
 
-            if not layer.isEditable() and not layer.startEditing():
-                raise DeltaException(
-                    f'Cannot start editing layer "{layer_id}"',
-                    provider_errors=layer.dataProvider().errors(),
-                )
+    compacted_deltas = compact_deltas(project, delta_file.deltas, delta_file.client_pks)
+    compacted_delta_file = DeltaFile(
+        delta_file.id,
+        delta_file.project_id,
+        delta_file.version,
+        [delta for delta, _indices in compacted_deltas if delta is not None],
+        delta_file.files,
+        delta_file.client_pks,
+    )
+    log_start = len(delta_log)
 
-            pk_attr_name = get_pk_attr_name(layer)
-            if not pk_attr_name:
-                raise DeltaException(f'Layer "{layer.name()}" has no primary key.')
+    logger.info(
+        f"Compacted {len(delta_file.deltas)} deltas into {len(compacted_delta_file.deltas)}."
+    )
 
-            has_edit_buffer = layer.editBuffer() and not isinstance(
-                layer.editBuffer(), QgsVectorLayerEditPassthrough
-            )
-            delta = inverse_delta(delta) if inverse else delta
+    try:
+        return apply_deltas_func(
+            project, compacted_delta_file, inverse, overwrite_conflicts, batched
+        )
+    finally:
+        expand_delta_log(delta_file, compacted_deltas, log_start)
 
-            if delta["method"] == str(DeltaMethod.CREATE):
-                # don't use the returned feature as the PK might contain the "Autogenerated" string value, instead the real one
-                created_feature = create_feature(
-                    layer, delta, overwrite_conflicts=overwrite_conflicts
-                )
 
-                # apparently the only way to obtain the feature if there is no edit buffer is use the returned created_feature
-                if not has_edit_buffer:
-                    feature = created_feature
-            elif delta["method"] == str(DeltaMethod.PATCH):
-                feature = patch_feature(
-                    layer,
-                    delta,
-                    overwrite_conflicts=overwrite_conflicts,
-                    client_pks=delta_file.client_pks,
-                )
-            elif delta["method"] == str(DeltaMethod.DELETE):
-                feature = delete_feature(
-                    layer,
-                    delta,
-                    overwrite_conflicts=overwrite_conflicts,
-                    client_pks=delta_file.client_pks,
-                )
-            else:
-                raise DeltaException("Unknown delta method")
+def compact_deltas(
+    project: QgsProject, deltas: List[Delta], client_pks: Dict[str, str]
+) -> List[Tuple[Optional[Delta], List[int]]]:
+    """Folds the chains of deltas on the same feature into the minimal equivalent deltas.
 
-            def committed_features_added_cb(layer_id, features):
-                if len(features) != 0 and len(features) != 1:
-                    raise DeltaException(
-                        f"Expected only one feature, but actually {len(features)} were added."
-                    )
+    The deltas of a chain have the same layer, `clientId` and `localPk`:
+        - create, then patch -> create with the patched values
+        - create, then delete -> nothing, the feature never reaches the layer
+        - patch, then patch -> patch from the first old to the last new values
+        - patch, then delete -> delete, with the values before the patch as old values
+    A chain is folded only as long as no other delta on the same data source falls between its deltas,
+    as the folded chain is applied at the position of its first delta. Otherwise the changes on the other features
+    could be reordered, e.g. creating a child feature referencing a parent feature created in between.
 
-                if layer_id != layer.id():
-                    raise DeltaException(
-                        f"Expected the layer with the added layer to be {layer.id()}, but got {layer_id}."
-                    )
+    Returns:
+        List[Tuple[Optional[Delta], List[int]]] -- the deltas to apply, in the order of the first delta of each chain,
+        with the indices of the original deltas they stand for. The delta is `None` if the chain cancels out.
+    """
+    compacted_deltas: List[Tuple[Optional[Delta], List[int]]] = []
+    # the feature and the index in `compacted_deltas` of the chain that can still be folded, per data source
+    open_chains: Dict[Tuple[str, str], Tuple[Tuple[str, str, str], int]] = {}
 
-                nonlocal feature
-                feature = features[0]
+    for idx, delta in enumerate(deltas):
+        layer_id = delta.get("sourceLayerId", "")
+        # NOTE the deltas on a missing or invalid layer will fail anyway, they only close the chains of their layer
+        data_source_key = get_connection_key(project.mapLayer(layer_id))
+        if data_source_key is None:
+            data_source_key = ("", layer_id)
 
-            if has_edit_buffer:
-                # in QGIS the only way to get the real features that have been added after commit, if edit buffer is present, is to use this signal.
-                layer.committedFeaturesAdded.connect(committed_features_added_cb)
+        chain_key = None
 
-            if not layer.commitChanges():
-                raise DeltaException(
-                    "Failed to commit changes",
-                    provider_errors=layer.dataProvider().errors(),
-                )
+        if delta.get("clientId") and delta.get("localPk"):
+            chain_key = (layer_id, str(delta["clientId"]), str(delta["localPk"]))
 
-            if has_edit_buffer:
-                QCoreApplication.processEvents()
-                layer.committedFeaturesAdded.disconnect(committed_features_added_cb)
+        # NOTE any other delta on the same data source closes the open chain
+        open_chain = open_chains.pop(data_source_key, None)
 
-            logger.info(
-                f'Successfully applied delta "{delta.get("uuid")}" on layer "{layer_id}"!'
+        if chain_key is None:
+            compacted_deltas.append((delta, [idx]))
+            continue
+
+        if open_chain is not None and open_chain[0] == chain_key:
+            chain_idx = open_chain[1]
+            chain_delta, indices = compacted_deltas[chain_idx]
+
+            assert chain_delta is not None
+
+            is_folded, folded_delta = fold_deltas(chain_delta, delta)
+
+            if is_folded:
+                compacted_deltas[chain_idx] = (folded_delta, [*indices, idx])
+
+                if folded_delta is not None:
+                    open_chains[data_source_key] = open_chain
+
+                continue
+
+        open_chains[data_source_key] = (chain_key, len(compacted_deltas))
+        compacted_deltas.append((delta, [idx]))
+
+    return compacted_deltas
+
+
+def fold_deltas(first: Delta, second: Delta) -> Tuple[bool, Optional[Delta]]:
+    """Folds two consecutive deltas on the same feature into one.
+
+    The deltas are not folded if the old values of `second` do not match the new values of `first`,
+    the conflict is then reported when applying `second`, as it would without folding.
+
+    Returns:
+        Tuple[bool, Optional[Delta]] -- whether the deltas can be folded, and the folded delta or `None` if they cancel out
+    """
+    first_method = first["method"]
+    second_method = second["method"]
+    first_old = first.get("old") or {}
+    first_new = first.get("new") or {}
+
+    # NOTE the created feature has all the values in `new`, the patched feature only the changed ones
+    if not has_matching_values(
+        first_new,
+        second.get("old") or {},
+        require_all=first_method == str(DeltaMethod.CREATE),
+    ):
+        return False, None
+
+    if first_method == str(DeltaMethod.CREATE):
+        if second_method == str(DeltaMethod.PATCH):
+            folded = {
+                **first,
+                "new": merge_delta_features(first_new, second.get("new") or {}),
+            }
+            return True, cast(Delta, folded)
+        elif second_method == str(DeltaMethod.DELETE):
+            return True, None
+    elif first_method == str(DeltaMethod.PATCH):
+        if second_method == str(DeltaMethod.PATCH):
+            folded = {
+                **first,
+                "old": merge_delta_features(second.get("old") or {}, first_old),
+                "new": merge_delta_features(first_new, second.get("new") or {}),
+            }
+            return True, cast(Delta, folded)
+        elif second_method == str(DeltaMethod.DELETE):
+            folded = {
+                **second,
+                "old": merge_delta_features(second.get("old") or {}, first_old),
+            }
+            return True, cast(Delta, folded)
+
+    return False, None
+
+
+def has_matching_values(
+    new: DeltaFeature, old: DeltaFeature, require_all: bool
+) -> bool:
+    """Returns whether the geometry and the attribute values of `old` are the same in `new`.
+
+    The values missing in `new` are considered matching, unless `require_all`.
+    """
+    if "geometry" in old:
+        if "geometry" in new:
+            if new["geometry"] != old["geometry"]:
+                return False
+        elif require_all:
+            return False
+
+    for key in ("attributes", "file_sha256"):
+        new_values = new.get(key) or {}
+
+        for name, value in (old.get(key) or {}).items():  # type: ignore
+            if name in new_values:
+                if new_values[name] != value:  # type: ignore
+                    return False
+            elif require_all:
+                return False
+
+    return True
+
+
+def merge_delta_features(base: DeltaFeature, update: DeltaFeature) -> DeltaFeature:
+    """Returns a copy of `base`, with the geometry and the attribute values of `update` on top."""
+    merged: Dict[str, Any] = {**base}
+
+    if "geometry" in update:
+        merged["geometry"] = update["geometry"]
+
+    for key in ("attributes", "file_sha256"):
+        if update.get(key):
+            merged[key] = {**(base.get(key) or {}), **update[key]}  # type: ignore
+
+    return cast(DeltaFeature, merged)
+
+
+def expand_delta_log(
+    delta_file: DeltaFile,
+    compacted_deltas: List[Tuple[Optional[Delta], List[int]]],
+    log_start: int,
+) -> None:
+    """Replaces the entries of the compacted deltas in the delta log with an entry per original delta."""
+    indices_by_compacted_idx = [
+        indices for delta, indices in compacted_deltas if delta is not None
+    ]
+    expanded_log = []
+
+    for log in delta_log[log_start:]:
+        for idx in indices_by_compacted_idx[log["delta_index"]]:
+            delta = delta_file.deltas[idx]
+            expanded_log.append(
+                {
+                    **log,
+                    "delta_index": idx,
+                    "delta_id": delta["uuid"],
+                    "feature_pk": delta.get("sourcePk"),
+                    "method": delta["method"],
+                }
             )
 
-            feature_pk = delta.get("sourcePk")
-            modified_pk = None
-            if feature.isValid():
-                modified_pk = feature.attribute(pk_attr_name)
-
-                if (
-                    modified_pk is not None
-                    # if the feature was newly created, do not expect `feature_pk` to match the `modified_pk`,
-                    # as the client cannot know the modified_pk in advance.
-                    and delta["method"] == str(DeltaMethod.CREATE)
-                    and str(modified_pk) != str(feature_pk)
-                ):
-                    logger.warning(
-                        f'The modified feature pk valued does not match "sourcePk" in the delta in "{layer_id}": sourcePk={feature_pk} modifiedFeaturePk={modified_pk}'
-                    )
-            else:
-                logger.warning(
-                    f'The returned modified feature is invalid in "{layer_id}"'
-                )
+    for compacted_delta, indices in compacted_deltas:
+        if compacted_delta is not None:
+            continue
 
-            delta_log.append(
+        for idx in indices:
+            delta = delta_file.deltas[idx]
+            expanded_log.append(
                 {
-                    "msg": "Successfully applied delta!",
-                    "status": delta_status,
+                    "msg": "Successfully applied delta! Cancelled out by the other deltas of the same feature.",
+                    "status": DeltaStatus.Applied,
                     "e_type": None,
                     "delta_file_id": delta_file.id,
-                    "layer_id": layer_id,
+                    "layer_id": delta.get("sourceLayerId"),
                     "delta_index": idx,
                     "delta_id": delta["uuid"],
-                    "feature_pk": feature_pk,
-                    "modified_pk": modified_pk,
+                    "feature_pk": delta.get("sourcePk"),
+                    "modified_pk": None,
                     "conflicts": None,
                     "provider_errors": None,
                     "method": delta["method"],
                 }
             )
 
-        except DeltaException as err:
-            err.layer_id = err.layer_id or layer_id
-            err.delta_file_id = err.delta_file_id or delta_file.id
-            err.delta_idx = err.delta_idx or idx
-            err.delta_id = err.delta_id or delta["uuid"]
-            err.feature_pk = err.feature_pk or delta.get("sourcePk")
-            err.method = err.method or delta.get("method")
-
-            if err.e_type == DeltaExceptionType.Conflict:
-                delta_status = DeltaStatus.Conflict
-                logger.warning(f"Conflicts while applying a single delta: {err}")
+    delta_log[log_start:] = sorted(expanded_log, key=lambda log: log["delta_index"])
+
+
+class FeatureCache:
+    """The features targeted by the patch and delete deltas, prefetched with a few requests per layer.
+
+    Looking up each feature on its own means a full scan per delta on the layers without an index on the primary key, e.g. Shapefiles and CSV files.
+    Instead, the first lookup on a layer fetches the features of all the deltas of that layer at once, filtered with `IN (...)` lists.
+
+    Each prefetched feature is served only once, the following lookups of the same primary key are done with `get_feature`, as the feature might have been modified meanwhile.
+    For the same reason, the prefetched features of a layer are discarded once a delta is applied through another layer on the same data source,
+    e.g. the same table added twice with different filters, see `discard_shared`.
+    """
+
+    def __init__(self, delta_file: DeltaFile, inverse: bool = False) -> None:
+        self.delta_file = delta_file
+        self.inverse = inverse
+        self.features_by_layer: Dict[LayerId, Dict[str, QgsFeature]] = {}
+        # the ids of the prefetched layers by their data source
+        self.layer_ids_by_data_source: Dict[Tuple[str, str], Set[LayerId]] = {}
+
+    def pop(self, layer: QgsVectorLayer, delta: Delta) -> Optional[QgsFeature]:
+        if layer.id() not in self.features_by_layer:
+            self.features_by_layer[layer.id()] = self.prefetch(layer)
+            self.layer_ids_by_data_source.setdefault(
+                get_data_source_key(layer), set()
+            ).add(layer.id())
+
+        source_pk = get_source_pk(delta, self.delta_file.client_pks)
+
+        return self.features_by_layer[layer.id()].pop(str(source_pk), None)
+
+    def prefetch(self, layer: QgsVectorLayer) -> Dict[str, QgsFeature]:
+        pk_attr_name = get_pk_attr_name(layer)
+        source_pks: Dict[str, Any] = {}
+        created_pks: Set[str] = set()
+
+        for delta in self.delta_file.deltas:
+            if delta.get("sourceLayerId") != layer.id():
+                continue
+
+            delta = inverse_delta(delta) if self.inverse else delta
+            source_pk = get_source_pk(delta, self.delta_file.client_pks)
+
+            if delta["method"] == str(DeltaMethod.CREATE):
+                created_pks.add(str(source_pk))
+            elif pk_attr_name in ((delta.get("new") or {}).get("attributes") or {}):
+                # NOTE the primary keys change while applying the deltas, the prefetched features cannot be trusted
+                return {}
             else:
-                delta_status = DeltaStatus.ApplyFailed
-                logger.warning(f"Error while applying a single delta: {err}")
+                source_pks[str(source_pk)] = source_pk
+
+        # NOTE the created features might collide with the prefetched ones, let `get_feature` detect it
+        for created_pk in created_pks:
+            source_pks.pop(created_pk, None)
+
+        values = list(source_pks.values())
+        features: Dict[str, QgsFeature] = {}
+        duplicated_pks: Set[str] = set()
+
+        for start in range(0, len(values), FEATURE_PREFETCH_CHUNK_SIZE):
+            expr = "{} IN ({})".format(
+                QgsExpression.quotedColumnRef(pk_attr_name),
+                ", ".join(
+                    QgsExpression.quotedValue(value)
+                    for value in values[start : start + FEATURE_PREFETCH_CHUNK_SIZE]
+                ),
+            )
+
+            for feature in layer.getFeatures(
+                QgsFeatureRequest().setFilterExpression(expr)
+            ):
+                pk = str(feature.attribute(pk_attr_name))
+
+                if pk in features:
+                    duplicated_pks.add(pk)
+
+                features[pk] = feature
+
+        # NOTE let `get_feature` raise on the features with non-unique primary key
+        for duplicated_pk in duplicated_pks:
+            del features[duplicated_pk]
+
+        logger.info(
+            f'Prefetched {len(features)} of {len(values)} features targeted by the deltas on layer "{layer.id()}".'
+        )
+
+        return features
+
+    def discard_shared(self, layer: QgsVectorLayer) -> None:
+        """Discards the prefetched features of the other layers on the same data source, as a delta is about to modify it through `layer`.
+
+        NOTE the discarded layers are not prefetched again, their features are looked up with `get_feature` from now on.
+        """
+        data_source_key = get_data_source_key(layer)
+
+        for layer_id in self.layer_ids_by_data_source.get(data_source_key, set()):
+            if layer_id != layer.id():
+                self.features_by_layer[layer_id] = {}
+
+
+def apply_deltas_without_transaction(
+    project: QgsProject,
+    delta_file: DeltaFile,
+    inverse: bool = False,
+    overwrite_conflicts: bool = False,
+    batched: bool = False,
+) -> bool:
+    """Applies the deltas one after the other, each delta is committed on its own.
+
+    If `batched`, the consecutive deltas of the same layer are committed together, see `apply_delta_batch`.
+
+    Returns:
+        bool -- whether all the deltas have been applied
+    """
+    has_applied_all_deltas = True
+    feature_cache = FeatureCache(delta_file, inverse)
+
+    if batched:
+        batches = get_delta_batches(delta_file.deltas, inverse)
+    else:
+        batches = [[idx] for idx in range(len(delta_file.deltas))]
+
+    for batch in batches:
+        if len(batch) == 1:
+            is_applied = apply_delta(
+                project,
+                delta_file,
+                batch[0],
+                inverse,
+                overwrite_conflicts,
+                feature_cache,
+            )
+        else:
+            is_applied = apply_delta_batch(
+                project,
+                delta_file,
+                batch,
+                inverse,
+                overwrite_conflicts,
+                feature_cache,
+            )
+
+        has_applied_all_deltas = is_applied and has_applied_all_deltas
+
+    return has_applied_all_deltas
+
+
+def apply_deltas_with_transaction(
+    project: QgsProject,
+    delta_file: DeltaFile,
+    inverse: bool = False,
+    overwrite_conflicts: bool = False,
+    batched: bool = False,
+) -> bool:
+    """Applies the deltas within a single transaction per data source, e.g. per GeoPackage file or PostgreSQL database.
+
+    Each delta is wrapped in its own edit command, which QGIS backs with a savepoint in transaction mode,
+    so a delta that conflicts or fails is rolled back alone and reported on its own.
+    All the deltas on the same data source are committed at once in the end, if the commit fails, none of them is applied.
+    The deltas on layers which data source does not support transactions, e.g. Shapefiles, are applied as with `apply_deltas_without_transaction`.
+
+    Returns:
+        bool -- whether all the deltas have been applied
+    """
+    if not project.setTransactionMode(Qgis.TransactionMode.AutomaticGroups):
+        raise Exception("Failed to enable the transaction mode of the project!")
+
+    has_applied_all_deltas = True
+    feature_cache = FeatureCache(delta_file, inverse)
+    log_start = len(delta_log)
+    # a layer per transaction group, committing it commits all the layers of the group
+    layers_by_group: Dict[Tuple[str, str], QgsVectorLayer] = {}
+    # the deltas applied within each transaction, waiting for the commit
+    applied_deltas_by_group: Dict[
+        Tuple[str, str], List[Tuple[int, Delta, QgsFeature, QgsVectorLayer]]
+    ] = {}
+
+    if batched:
+        batches = get_delta_batches(delta_file.deltas, inverse)
+    else:
+        batches = [[idx] for idx in range(len(delta_file.deltas))]
+
+    try:
+        for batch in batches:
+            layer_id: str = delta_file.deltas[batch[0]].get("sourceLayerId", "")
+            layer: QgsVectorLayer = project.mapLayer(layer_id)
+            group_key = get_transaction_group_key(project, layer)
+
+            if group_key is None:
+                if len(batch) == 1:
+                    is_applied = apply_delta(
+                        project,
+                        delta_file,
+                        batch[0],
+                        inverse,
+                        overwrite_conflicts,
+                        feature_cache,
+                    )
+                else:
+                    is_applied = apply_delta_batch(
+                        project,
+                        delta_file,
+                        batch,
+                        inverse,
+                        overwrite_conflicts,
+                        feature_cache,
+                    )
+
+                has_applied_all_deltas = is_applied and has_applied_all_deltas
+                continue
+
+            layers_by_group.setdefault(group_key, layer)
+            applied_deltas = applied_deltas_by_group.setdefault(group_key, [])
+
+            for idx in batch:
+                is_applied = apply_delta_in_transaction(
+                    layer,
+                    delta_file,
+                    idx,
+                    inverse,
+                    overwrite_conflicts,
+                    feature_cache,
+                    applied_deltas,
+                )
+
+                has_applied_all_deltas = is_applied and has_applied_all_deltas
+    except Exception as err:
+        # NOTE the deltas applied within the transactions are not reported, as they are rolled back
+        for layer in layers_by_group.values():
+            if layer.isEditable() and not layer.rollBack():
+                logger.error(f'Failed to rollback layer "{layer.id()}": {err}')
 
-            if layer is not None and not layer.rollBack():
-                logger.error(f'Failed to rollback layer "{layer_id}": {err}')
+        delta_log[log_start:] = sorted(
+            delta_log[log_start:], key=lambda log: log["delta_index"]
+        )
+
+        raise err
+
+    for group_key, layer in layers_by_group.items():
+        applied_deltas = applied_deltas_by_group[group_key]
+
+        if not layer.isEditable():
+            continue
+
+        if layer.commitChanges():
+            for idx, delta, feature, delta_layer in applied_deltas:
+                delta_log.append(
+                    get_applied_delta_log(
+                        delta_file,
+                        idx,
+                        delta,
+                        delta_layer.id(),
+                        feature,
+                        get_pk_attr_name(delta_layer),
+                    )
+                )
 
+            continue
+
+        provider_errors = layer.commitErrors()
+
+        logger.warning(
+            f'Failed to commit the transaction of {len(applied_deltas)} deltas on "{group_key[1]}": {provider_errors}'
+        )
+
+        if not layer.rollBack():
+            logger.error(f'Failed to rollback layer "{layer.id()}"')
+
+        for idx, delta, _feature, delta_layer in applied_deltas:
             has_applied_all_deltas = False
             delta_log.append(
-                {
-                    "msg": str(err),
-                    "status": delta_status,
-                    "e_type": err.e_type,
-                    "delta_file_id": err.delta_file_id,
-                    "layer_id": err.layer_id,
-                    "delta_index": err.delta_idx,
-                    "delta_id": err.delta_id,
-                    "feature_pk": err.feature_pk,
-                    "modified_pk": err.modified_pk,
-                    "conflicts": err.conflicts,
-                    "provider_errors": err.provider_errors,
-                    "method": err.method,
-                }
+                get_failed_delta_log(
+                    DeltaException(
+                        "Failed to commit changes", provider_errors=provider_errors
+                    ),
+                    delta_file,
+                    idx,
+                    delta,
+                    delta_layer.id(),
+                )
+            )
+
+    delta_log[log_start:] = sorted(
+        delta_log[log_start:], key=lambda log: log["delta_index"]
+    )
+
+    return has_applied_all_deltas
+
+
+def get_transaction_group_key(
+    project: QgsProject, layer: Optional[QgsMapLayer]
+) -> Optional[Tuple[str, str]]:
+    """Returns the provider key and connection string of the transaction group of the layer, or `None` if the layer is not in a transaction group."""
+    connection_key = get_connection_key(layer)
+
+    if connection_key is None or project.transactionGroup(*connection_key) is None:
+        return None
+
+    return connection_key
+
+
+def get_connection_key(layer: Optional[QgsMapLayer]) -> Optional[Tuple[str, str]]:
+    """Returns the provider key and connection string of the database or file of the layer, or `None` if the layer is not a valid vector layer."""
+    if not isinstance(layer, QgsVectorLayer) or not layer.isValid():
+        return None
+
+    return (layer.providerType(), QgsTransaction.connectionString(layer.source()))
+
+
+def apply_delta_in_transaction(
+    layer: QgsVectorLayer,
+    delta_file: DeltaFile,
+    idx: int,
+    inverse: bool,
+    overwrite_conflicts: bool,
+    feature_cache: FeatureCache,
+    applied_deltas: List[Tuple[int, Delta, QgsFeature, QgsVectorLayer]],
+) -> bool:
+    """Applies a single delta within the transaction of the layer, without committing it.
+
+    The applied delta is appended to `applied_deltas`, to be reported once the transaction is committed.
+
+    Returns:
+        bool -- whether the delta has been applied
+    """
+    delta = delta_file.deltas[idx]
+    layer_id = layer.id()
+
+    try:
+        if not layer.isEditable() and not layer.startEditing():
+            raise DeltaException(
+                f'Cannot start editing layer "{layer_id}"',
+                provider_errors=layer.dataProvider().errors(),
             )
+
+        # NOTE raises if the layer has no primary key
+        get_pk_attr_name(layer)
+    except DeltaException as err:
+        delta_log.append(get_failed_delta_log(err, delta_file, idx, delta, layer_id))
+
+        return False
+
+    delta = inverse_delta(delta) if inverse else delta
+
+    layer.beginEditCommand(f'Apply delta "{delta.get("uuid")}"')
+
+    try:
+        # NOTE there is no edit buffer in transaction mode, the changes are written to the data source immediately
+        feature = apply_delta_method(
+            layer,
+            delta,
+            overwrite_conflicts,
+            delta_file.client_pks,
+            False,
+            feature_cache,
+        )
+    except DeltaException as err:
+        layer.destroyEditCommand()
+        delta_log.append(get_failed_delta_log(err, delta_file, idx, delta, layer_id))
+
+        return False
+    except Exception as err:
+        layer.destroyEditCommand()
+        delta_log.append(
+            get_unknown_error_delta_log(err, delta_file, idx, delta, layer_id)
+        )
+
+        raise err
+
+    layer.endEditCommand()
+    applied_deltas.append((idx, delta, feature, layer))
+
+    return True
+
+
+def get_delta_batches(deltas: List[Delta], inverse: bool) -> List[List[int]]:
+    """Groups the indices of the consecutive deltas of the same layer, so they can be applied in a single edit session.
+
+    A create delta can be followed only by other create deltas in the same batch,
+    as the following patch or delete deltas might refer to the primary key assigned on commit.
+    """
+    batches: List[List[int]] = []
+    previous_delta: Optional[Delta] = None
+
+    for idx, delta in enumerate(deltas):
+        delta = inverse_delta(delta) if inverse else delta
+
+        if (
+            previous_delta is not None
+            and previous_delta.get("sourceLayerId") == delta.get("sourceLayerId")
+            and len(batches[-1]) < DELTA_BATCH_MAX_SIZE
+            and (
+                previous_delta["method"] != str(DeltaMethod.CREATE)
+                or delta["method"] == str(DeltaMethod.CREATE)
+            )
+        ):
+            batches[-1].append(idx)
+        else:
+            batches.append([idx])
+
+        previous_delta = delta
+
+    return batches
+
+
+def apply_delta(
+    project: QgsProject,
+    delta_file: DeltaFile,
+    idx: int,
+    inverse: bool,
+    overwrite_conflicts: bool,
+    feature_cache: Optional[FeatureCache] = None,
+) -> bool:
+    """Applies a single delta in its own edit session.
+
+    Returns:
+        bool -- whether the delta has been applied
+    """
+    delta = delta_file.deltas[idx]
+    layer_id: str = delta.get("sourceLayerId", "")
+    layer: QgsVectorLayer = project.mapLayer(layer_id)
+    feature = QgsFeature()
+
+    try:
+        if not isinstance(layer, QgsVectorLayer):
+            raise DeltaException(f'No layer with id "{layer_id}"')
+
+        if not layer.isValid():
+            raise DeltaException(f'Invalid layer "{layer_id}"')
+
+        if not layer.isEditable() and not layer.startEditing():
+            raise DeltaException(
+                f'Cannot start editing layer "{layer_id}"',
+                provider_errors=layer.dataProvider().errors(),
+            )
+
+        pk_attr_name = get_pk_attr_name(layer)
+        if not pk_attr_name:
+            raise DeltaException(f'Layer "{layer.name()}" has no primary key.')
+
+        has_edit_buffer = layer.editBuffer() and not isinstance(
+            layer.editBuffer(), QgsVectorLayerEditPassthrough
+        )
+        delta = inverse_delta(delta) if inverse else delta
+
+        feature = apply_delta_method(
+            layer,
+            delta,
+            overwrite_conflicts,
+            delta_file.client_pks,
+            has_edit_buffer,
+            feature_cache,
+        )
+
+        def committed_features_added_cb(layer_id, features):
+            if len(features) != 0 and len(features) != 1:
+                raise DeltaException(
+                    f"Expected only one feature, but actually {len(features)} were added."
+                )
+
+            if layer_id != layer.id():
+                raise DeltaException(
+                    f"Expected the layer with the added layer to be {layer.id()}, but got {layer_id}."
+                )
+
+            nonlocal feature
+            feature = features[0]
+
+        if has_edit_buffer:
+            # in QGIS the only way to get the real features that have been added after commit, if edit buffer is present, is to use this signal.
+            layer.committedFeaturesAdded.connect(committed_features_added_cb)
+
+        if not layer.commitChanges():
+            raise DeltaException(
+                "Failed to commit changes",
+                provider_errors=layer.dataProvider().errors(),
+            )
+
+        if has_edit_buffer:
+            QCoreApplication.processEvents()
+            layer.committedFeaturesAdded.disconnect(committed_features_added_cb)
+
+        delta_log.append(
+            get_applied_delta_log(
+                delta_file, idx, delta, layer_id, feature, pk_attr_name
+            )
+        )
+
+        return True
+    except DeltaException as err:
+        delta_log.append(get_failed_delta_log(err, delta_file, idx, delta, layer_id))
+
+        if layer is not None and not layer.rollBack():
+            logger.error(f'Failed to rollback layer "{layer_id}": {err}')
+
+        return False
+    except Exception as err:
+        delta_log.append(
+            get_unknown_error_delta_log(err, delta_file, idx, delta, layer_id)
+        )
+
+        raise err
+
+
+def apply_delta_batch(
+    project: QgsProject,
+    delta_file: DeltaFile,
+    batch: List[int],
+    inverse: bool,
+    overwrite_conflicts: bool,
+    feature_cache: Optional[FeatureCache] = None,
+) -> bool:
+    """Applies the consecutive deltas of the same layer in a single edit session, with a single commit.
+
+    Each delta is wrapped in its own edit command, so a delta that conflicts or fails is reverted alone, like with a savepoint, and reported on its own.
+    If the edit session cannot be committed, it is rolled back and its deltas are applied one by one, so the failing delta gets reported.
+
+    Returns:
+        bool -- whether all the deltas in the batch have been applied
+    """
+    layer_id: str = delta_file.deltas[batch[0]].get("sourceLayerId", "")
+    layer: QgsVectorLayer = project.mapLayer(layer_id)
+
+    try:
+        if (
+            not isinstance(layer, QgsVectorLayer)
+            or not layer.isValid()
+            or not (layer.isEditable() or layer.startEditing())
+        ):
+            raise DeltaException(f'Cannot apply deltas on layer "{layer_id}"')
+
+        pk_attr_name = get_pk_attr_name(layer)
+    except DeltaException:
+        # the deltas would fail anyway, apply them one by one to report the error of each.
+        # NOTE the layer might be left editable, `apply_delta` rolls it back on the failure of each delta
+        return apply_deltas_one_by_one(
+            project, delta_file, batch, inverse, overwrite_conflicts, feature_cache
+        )
+
+    has_edit_buffer = layer.editBuffer() and not isinstance(
+        layer.editBuffer(), QgsVectorLayerEditPassthrough
+    )
+    has_applied_all_deltas = True
+    # the deltas applied to the edit buffer, waiting for the commit
+    applied_deltas: List[Tuple[int, Delta, QgsFeature]] = []
+    batch_log: List[Dict[str, Any]] = []
+    unknown_error: Optional[Exception] = None
+
+    for idx in batch:
+        delta = delta_file.deltas[idx]
+        delta = inverse_delta(delta) if inverse else delta
+
+        layer.beginEditCommand(f'Apply delta "{delta.get("uuid")}"')
+
+        try:
+            feature = apply_delta_method(
+                layer,
+                delta,
+                overwrite_conflicts,
+                delta_file.client_pks,
+                has_edit_buffer,
+                feature_cache,
+            )
+        except DeltaException as err:
+            layer.destroyEditCommand()
+
+            has_applied_all_deltas = False
+            batch_log.append(
+                get_failed_delta_log(err, delta_file, idx, delta, layer_id)
+            )
+            continue
         except Exception as err:
-            delta_status = DeltaStatus.UnknownError
-            delta_log.append(
-                {
-                    "msg": str(err),
-                    "status": delta_status,
-                    "e_type": None,
-                    "delta_file_id": delta_file.id,
-                    "layer_id": layer_id,
-                    "delta_index": idx,
-                    "delta_id": delta.get("uuid"),
-                    "feature_pk": None,
-                    "modified_pk": None,
-                    "conflicts": None,
-                    "provider_errors": None,
-                    "method": delta.get("method"),
-                }
+            layer.destroyEditCommand()
+
+            # NOTE the deltas applied so far are still committed, as if they were applied one by one
+            unknown_error = err
+            unknown_error_log = get_unknown_error_delta_log(
+                err, delta_file, idx, delta, layer_id
             )
+            break
+
+        layer.endEditCommand()
+        applied_deltas.append((idx, delta, feature))
+
+    added_features: List[QgsFeature] = []
+
+    def committed_features_added_cb(layer_id, features):
+        added_features.extend(features)
+
+    if has_edit_buffer:
+        # in QGIS the only way to get the real features that have been added after commit, if edit buffer is present, is to use this signal.
+        layer.committedFeaturesAdded.connect(committed_features_added_cb)
+
+    is_committed = layer.commitChanges()
 
-            logger.error(
-                f"An unknown error has been encountered while applying delta: {err}"
+    if has_edit_buffer:
+        QCoreApplication.processEvents()
+        layer.committedFeaturesAdded.disconnect(committed_features_added_cb)
+
+    if not is_committed:
+        logger.warning(
+            f'Failed to commit {len(applied_deltas)} deltas at once on layer "{layer_id}", applying them one by one: {layer.commitErrors()}'
+        )
+
+        if not layer.rollBack():
+            logger.error(f'Failed to rollback layer "{layer_id}"')
+
+        log_start = len(delta_log)
+
+        is_applied = apply_deltas_one_by_one(
+            project,
+            delta_file,
+            [idx for idx, _delta, _feature in applied_deltas],
+            inverse,
+            overwrite_conflicts,
+            feature_cache,
+        )
+
+        # NOTE the deltas that failed within the batch are logged along the retried ones, in the order of the deltas
+        delta_log[log_start:] = sorted(
+            delta_log[log_start:] + batch_log, key=lambda log: log["delta_index"]
+        )
+
+        if unknown_error:
+            delta_log.append(unknown_error_log)
+            raise unknown_error
+
+        return is_applied and has_applied_all_deltas
+
+    if has_edit_buffer:
+        created_indices = [
+            entry_idx
+            for entry_idx, (_idx, delta, _feature) in enumerate(applied_deltas)
+            if delta["method"] == str(DeltaMethod.CREATE)
+        ]
+
+        # NOTE QGIS commits the added features in the order they have been added
+        if len(created_indices) == len(added_features):
+            for entry_idx, feature in zip(created_indices, added_features):
+                idx, delta, _feature = applied_deltas[entry_idx]
+                applied_deltas[entry_idx] = (idx, delta, feature)
+        else:
+            logger.warning(
+                f'Expected {len(created_indices)} features to be added to layer "{layer_id}", but actually {len(added_features)} were added.'
+            )
+
+    for idx, delta, feature in applied_deltas:
+        batch_log.append(
+            get_applied_delta_log(
+                delta_file, idx, delta, layer_id, feature, pk_attr_name
             )
+        )
+
+    delta_log.extend(sorted(batch_log, key=lambda log: log["delta_index"]))
+
+    if unknown_error:
+        delta_log.append(unknown_error_log)
+        raise unknown_error
+
+    return has_applied_all_deltas
+
 
-            raise err
+def apply_deltas_one_by_one(
+    project: QgsProject,
+    delta_file: DeltaFile,
+    indices: List[int],
+    inverse: bool,
+    overwrite_conflicts: bool,
+    feature_cache: Optional[FeatureCache] = None,
+) -> bool:
+    has_applied_all_deltas = True
+
+    for idx in indices:
+        is_applied = apply_delta(
+            project, delta_file, idx, inverse, overwrite_conflicts, feature_cache
+        )
+        has_applied_all_deltas = is_applied and has_applied_all_deltas
 
     return has_applied_all_deltas
 
 
+def apply_delta_method(
+    layer: QgsVectorLayer,
+    delta: Delta,
+    overwrite_conflicts: bool,
+    client_pks: Dict[str, str],
+    has_edit_buffer: bool,
+    feature_cache: Optional[FeatureCache] = None,
+) -> QgsFeature:
+    """Applies the delta on the layer in editing mode, without committing it.
+
+    Returns:
+        QgsFeature -- the modified feature. Invalid for the created features if there is an edit buffer, as they get their real primary key on commit.
+    """
+    feature = QgsFeature()
+
+    if feature_cache is not None:
+        feature_cache.discard_shared(layer)
+
+    if delta["method"] == str(DeltaMethod.CREATE):
+        # don't use the returned feature as the PK might contain the "Autogenerated" string value, instead the real one
+        created_feature = create_feature(
+            layer, delta, overwrite_conflicts=overwrite_conflicts
+        )
+
+        # apparently the only way to obtain the feature if there is no edit buffer is use the returned created_feature
+        if not has_edit_buffer:
+            feature = created_feature
+    elif delta["method"] == str(DeltaMethod.PATCH):
+        feature = patch_feature(
+            layer,
+            delta,
+            overwrite_conflicts=overwrite_conflicts,
+            client_pks=client_pks,
+            feature_cache=feature_cache,
+        )
+    elif delta["method"] == str(DeltaMethod.DELETE):
+        feature = delete_feature(
+            layer,
+            delta,
+            overwrite_conflicts=overwrite_conflicts,
+            client_pks=client_pks,
+            feature_cache=feature_cache,
+        )
+    else:
+        raise DeltaException("Unknown delta method")
+
+    return feature
+
+
+def get_applied_delta_log(
+    delta_file: DeltaFile,
+    idx: int,
+    delta: Delta,
+    layer_id: str,
+    feature: QgsFeature,
+    pk_attr_name: str,
+) -> Dict[str, Any]:
+    logger.info(
+        f'Successfully applied delta "{delta.get("uuid")}" on layer "{layer_id}"!'
+    )
+
+    feature_pk = delta.get("sourcePk")
+    modified_pk = None
+    if feature.isValid():
+        modified_pk = feature.attribute(pk_attr_name)
+
+        if (
+            modified_pk is not None
+            # if the feature was newly created, do not expect `feature_pk` to match the `modified_pk`,
+            # as the client cannot know the modified_pk in advance.
+            and delta["method"] == str(DeltaMethod.CREATE)
+            and str(modified_pk) != str(feature_pk)
+        ):
+            logger.warning(
+                f'The modified feature pk valued does not match "sourcePk" in the delta in "{layer_id}": sourcePk={feature_pk} modifiedFeaturePk={modified_pk}'
+            )
+    else:
+        logger.warning(f'The returned modified feature is invalid in "{layer_id}"')
+
+    return {
+        "msg": "Successfully applied delta!",
+        "status": DeltaStatus.Applied,
+        "e_type": None,
+        "delta_file_id": delta_file.id,
+        "layer_id": layer_id,
+        "delta_index": idx,
+        "delta_id": delta["uuid"],
+        "feature_pk": feature_pk,
+        "modified_pk": modified_pk,
+        "conflicts": None,
+        "provider_errors": None,
+        "method": delta["method"],
+    }
+
+
+def get_failed_delta_log(
+    err: DeltaException,
+    delta_file: DeltaFile,
+    idx: int,
+    delta: Delta,
+    layer_id: str,
+) -> Dict[str, Any]:
+    err.layer_id = err.layer_id or layer_id
+    err.delta_file_id = err.delta_file_id or delta_file.id
+    err.delta_idx = err.delta_idx or idx
+    err.delta_id = err.delta_id or delta["uuid"]
+    err.feature_pk = err.feature_pk or delta.get("sourcePk")
+    err.method = err.method or delta.get("method")
+
+    if err.e_type == DeltaExceptionType.Conflict:
+        delta_status = DeltaStatus.Conflict
+        logger.warning(f"Conflicts while applying a single delta: {err}")
+    else:
+        delta_status = DeltaStatus.ApplyFailed
+        logger.warning(f"Error while applying a single delta: {err}")
+
+    return {
+        "msg": str(err),
+        "status": delta_status,
+        "e_type": err.e_type,
+        "delta_file_id": err.delta_file_id,
+        "layer_id": err.layer_id,
+        "delta_index": err.delta_idx,
+        "delta_id": err.delta_id,
+        "feature_pk": err.feature_pk,
+        "modified_pk": err.modified_pk,
+        "conflicts": err.conflicts,
+        "provider_errors": err.provider_errors,
+        "method": err.method,
+    }
+
+
+def get_unknown_error_delta_log(
+    err: Exception,
+    delta_file: DeltaFile,
+    idx: int,
+    delta: Delta,
+    layer_id: str,
+) -> Dict[str, Any]:
+    logger.error(f"An unknown error has been encountered while applying delta: {err}")
+
+    return {
+        "msg": str(err),
+        "status": DeltaStatus.UnknownError,
+        "e_type": None,
+        "delta_file_id": delta_file.id,
+        "layer_id": layer_id,
+        "delta_index": idx,
+        "delta_id": delta.get("uuid"),
+        "feature_pk": None,
+        "modified_pk": None,
+        "conflicts": None,
+        "provider_errors": None,
+        "method": delta.get("method"),
+    }
+
+
 def rollback_deltas(
     layers_by_id: Dict[LayerId, QgsVectorLayer],
     committed_layer_ids: Set[LayerId] = set(),
@@ -807,13 +1842,7 @@ def get_pk_attr_name(layer: QgsVectorLayer) -> str:
     return pk_attr_name
 
 
-def get_feature(
-    layer: QgsVectorLayer, delta: Delta, client_pks: Dict[str, str] = None
-) -> QgsFeature:
-    pk_attr_name = get_pk_attr_name(layer)
-
-    assert pk_attr_name
-
+def get_source_pk(delta: Delta, client_pks: Dict[str, str] = None) -> str:
     source_pk = delta["sourcePk"]
 
     if client_pks:
@@ -821,6 +1850,27 @@ def get_feature(
         if client_pk_key in client_pks:
             source_pk = client_pks[client_pk_key]
 
+    return source_pk
+
+
+def get_feature(
+    layer: QgsVectorLayer,
+    delta: Delta,
+    client_pks: Dict[str, str] = None,
+    feature_cache: Optional[FeatureCache] = None,
+) -> QgsFeature:
+    if feature_cache is not None:
+        cached_feature = feature_cache.pop(layer, delta)
+
+        if cached_feature is not None:
+            return cached_feature
+
+    pk_attr_name = get_pk_attr_name(layer)
+
+    assert pk_attr_name
+
+    source_pk = get_source_pk(delta, client_pks)
+
     expr = " {} = {} ".format(
         QgsExpression.quotedColumnRef(pk_attr_name),
         QgsExpression.quotedValue(source_pk),
@@ -897,6 +1947,7 @@ def patch_feature(
     delta: Delta,
     overwrite_conflicts: bool,
     client_pks: Dict[str, str],
+    feature_cache: Optional[FeatureCache] = None,
 ) -> QgsFeature:
     """Patches a feature in layer
 
@@ -904,13 +1955,14 @@ def patch_feature(
         layer {QgsVectorLayer} -- target layer. Must be in edit mode!
         delta {Delta} -- delta describing the patch
         overwrite_conflicts {bool} -- if there are conflicts with an existing feature, ignore them
+        feature_cache {FeatureCache} -- the prefetched features, if any
 
     Raises:
         DeltaException: whenever the feature cannot be patched
     """
     new_feature_delta = delta["new"]
     old_feature_delta = delta["old"]
-    old_feature = get_feature(layer, delta, client_pks)
+    old_feature = get_feature(layer, delta, client_pks, feature_cache)
 
     if not old_feature.isValid():
         raise DeltaException("Unable to find feature")
@@ -984,6 +2036,7 @@ def delete_feature(
     delta: Delta,
     overwrite_conflicts: bool,
     client_pks: Dict[str, str],
+    feature_cache: Optional[FeatureCache] = None,
 ) -> QgsFeature:
     """Deletes a feature from layer
 
@@ -991,12 +2044,13 @@ def delete_feature(
         layer {QgsVectorLayer} -- target layer. Must be in edit mode!
         delta {Delta} -- delta describing the deleted feature
         overwrite_conflicts {bool} -- if there are conflicts with an existing feature, ignore them
+        feature_cache {FeatureCache} -- the prefetched features, if any
 
     Raises:
         DeltaException: whenever the feature cannot be deleted
     """
     old_feature_delta = delta["old"]
-    old_feature = get_feature(layer, delta, client_pks)
+    old_feature = get_feature(layer, delta, client_pks, feature_cache)
 
     if not old_feature.isValid():
         raise DeltaException("Unable to find feature")
@@ -1108,6 +2162,30 @@ def get_layer_path(layer: QgsMapLayer) -> Path:
     return Path(data_source_decoded["path"])
 
 
+@lru_cache(maxsize=128)
+def get_data_source_key(layer: QgsVectorLayer) -> Tuple[str, str]:
+    """Returns the provider key and the data source URI of the given layer, without the filter of the layer.
+
+    Arguments:
+        layer {QgsVectorLayer} -- target layer
+
+    Returns:
+        Tuple[str, str] -- provider key and data source URI, the same for all the layers on the same table
+    """
+    provider_key = layer.providerType()
+    data_source_decoded = QgsProviderRegistry.instance().decodeUri(
+        provider_key, layer.source()
+    )
+    # NOTE the filter is named `subset` by the OGR provider and `sql` by the PostgreSQL provider
+    data_source_decoded.pop("subset", None)
+    data_source_decoded.pop("sql", None)
+
+    return (
+        provider_key,
+        QgsProviderRegistry.instance().encodeUri(provider_key, data_source_decoded),
+    )
+
+
 def get_backup_path(path: Path) -> Path:
     """Returns a `Path` object of with backup suffix
 
@@ -1199,6 +2277,21 @@ if __name__ == "__main__":
         action="store_true",
         help="Inverses the direction of the deltas. Makes the delta `old` to `new` and `new` to `old`. Mainly used to rollback the applied changes using the same delta file..",
     )
+    parser_delta_apply.add_argument(
+        "--batched",
+        action="store_true",
+        help="Apply the consecutive deltas of the same layer in a single edit session, with a single commit.",
+    )
+    parser_delta_apply.add_argument(
+        "--transaction",
+        action="store_true",
+        help="Apply the deltas within a single transaction per data source, on the data sources that support transactions.",
+    )
+    parser_delta_apply.add_argument(
+        "--compact",
+        action="store_true",
+        help="Fold the chains of deltas on the same feature, e.g. create then patch, before applying them.",
+    )
     parser_delta_apply.set_defaults(func=cmd_delta_apply)
     # /deltas
 
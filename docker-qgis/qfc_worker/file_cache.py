@@ -0,0 +1,160 @@
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from qfieldcloud_sdk.utils import calc_etag
+
+# `ioctl` request to clone a file as copy-on-write, see `man ioctl_ficlone`
+FICLONE = 0x40049409
+
+
+class FileCache:
+    """Project files cache shared by all the QGIS workers on the same host.
+
+    The files are stored by their ETag, so the same file content is stored only once, no matter the project or the filename.
+    The least recently used files are evicted when the total size of the cache exceeds `max_size_bytes`.
+
+    NOTE The cached files are materialized as copy-on-write clones (or plain copies on filesystems that do not support it),
+    never as hardlinks, as the jobs modify the project files in place (e.g. applying deltas on a GeoPackage).
+    """
+
+    def __init__(self, cache_dir: Path, max_size_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.objects_dir = cache_dir.joinpath("objects")
+        self.tmp_dir = cache_dir.joinpath("tmp")
+        self.max_size_bytes = max_size_bytes
+        self.hits_count = 0
+        self.hits_bytes = 0
+        self.misses_count = 0
+        self.misses_bytes = 0
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def from_env() -> "FileCache | None":
+        """Returns the file cache configured by the `FILE_CACHE_DIR` and `FILE_CACHE_MAX_SIZE_BYTES` envvars, or `None` if not configured."""
+        cache_dir = os.environ.get("FILE_CACHE_DIR")
+        max_size_bytes = int(os.environ.get("FILE_CACHE_MAX_SIZE_BYTES", 0))
+
+        if not cache_dir or max_size_bytes <= 0:
+            return None
+
+        return FileCache(Path(cache_dir), max_size_bytes)
+
+    def get_object_path(self, etag: str) -> Path:
+        # NOTE multipart ETags have a `-<parts_count>` suffix, which is safe for filenames
+        etag = etag.strip('"')
+
+        return self.objects_dir.joinpath(etag[:2], etag)
+
+    def materialize(self, file: dict[str, Any], destination: Path) -> bool:
+        """Materializes the cached file into `destination`.
+
+        Args:
+            file (dict[str, Any]): the remote file dict, as returned by `sdk.Client.list_remote_files`.
+            destination (Path): the path where the file should be materialized.
+
+        Returns:
+            bool: whether the file was found in the cache.
+        """
+        object_path = self.get_object_path(file["etag"])
+
+        try:
+            src = open(object_path, "rb")
+        except FileNotFoundError:
+            self.misses_count += 1
+            self.misses_bytes += file["size"]
+            return False
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+
+        with src, open(destination, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        # NOTE the modification time of the object is used as the last access time for the LRU eviction
+        try:
+            os.utime(object_path)
+        except FileNotFoundError:
+            pass
+
+        self.hits_count += 1
+        self.hits_bytes += file["size"]
+
+        return True
+
+    def store(self, file: dict[str, Any], source: Path) -> None:
+        """Stores the downloaded `source` file in the cache, if its ETag matches the remote file.
+
+        The ETag might not match if the remote file has been modified in the meantime.
+        """
+        if calc_etag(str(source)) != file["etag"]:
+            logging.info(
+                f'Skipping caching "{file["name"]}", the downloaded file ETag does not match.'
+            )
+            return
+
+        object_path = self.get_object_path(file["etag"])
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # NOTE copy to a temporary file first, so the other workers never read a partially written object
+        with tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False) as dst:
+            try:
+                with open(source, "rb") as src:
+                    try:
+                        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                    except OSError:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+            except OSError as err:
+                # the cache is best effort, e.g. the cache volume might be full
+                logging.warning(f'Failed to cache "{file["name"]}": {err}')
+                Path(dst.name).unlink(missing_ok=True)
+                return
+
+        os.replace(dst.name, object_path)
+
+    def evict(self) -> None:
+        """Removes the least recently used objects until the cache is smaller than `max_size_bytes`."""
+        with open(self.cache_dir.joinpath(".lock"), "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # another worker is already evicting
+                return
+
+            objects = []
+            total_size = 0
+            for object_path in self.objects_dir.glob("*/*"):
+                try:
+                    stat = object_path.stat()
+                except FileNotFoundError:
+                    continue
+
+                objects.append((stat.st_mtime, stat.st_size, object_path))
+                total_size += stat.st_size
+
+            objects.sort()
+
+            for _mtime, size, object_path in objects:
+                if total_size <= self.max_size_bytes:
+                    break
+
+                object_path.unlink(missing_ok=True)
+                total_size -= size
+
+                logging.info(f'Evicted "{object_path.name}" from the file cache.')
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "hits_count": self.hits_count,
+            "hits_bytes": self.hits_bytes,
+            "misses_count": self.misses_count,
+            "misses_bytes": self.misses_bytes,
+        }
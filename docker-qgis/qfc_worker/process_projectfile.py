@@ -1,24 +1,16 @@
 import logging
 from pathlib import Path
-from typing import Callable
 from xml.etree import ElementTree
 
-from qgis.core import (
-    QgsLayerTree,
-    QgsMapRendererCustomPainterJob,
-    QgsMapSettings,
-    QgsProject,
-)
-from qgis.PyQt.QtCore import QSize
-from qgis.PyQt.QtGui import QColor, QImage, QPainter
-from qgis.PyQt.QtXml import QDomDocument
+from qgis.core import QgsMapRendererCustomPainterJob
+from qgis.PyQt.QtGui import QImage, QPainter
 
 from .utils import (
     FailedThumbnailGenerationException,
     InvalidFileExtensionException,
     InvalidXmlFileException,
     ProjectFileNotFoundException,
-    get_layers_data,
+    ProjectSession,
     get_qgis_xml_error_context,
     layers_data_to_string,
 )
@@ -52,72 +44,11 @@ def check_valid_project_file(the_qgis_file_name: Path) -> None:
     logger.info("QGIS project file is valid!")
 
 
-def extract_project_details(project: QgsProject) -> dict[str, str]:
+def extract_project_details(project_session: ProjectSession) -> dict[str, str]:
     """Extract project details"""
     logger.info("Extract project details…")
 
-    details = {}
-
-    logger.info("Reading QGIS project file…")
-    map_settings = QgsMapSettings()
-
-    def on_project_read_wrapper(
-        tmp_project: QgsProject,
-    ) -> Callable[[QDomDocument], None]:
-        def on_project_read(doc: QDomDocument) -> None:
-            r, _success = tmp_project.readNumEntry("Gui", "/CanvasColorRedPart", 255)
-            g, _success = tmp_project.readNumEntry("Gui", "/CanvasColorGreenPart", 255)
-            b, _success = tmp_project.readNumEntry("Gui", "/CanvasColorBluePart", 255)
-            background_color = QColor(r, g, b)
-            map_settings.setBackgroundColor(background_color)
-
-            details["background_color"] = background_color.name()
-
-            nodes = doc.elementsByTagName("mapcanvas")
-
-            for i in range(nodes.size()):
-                node = nodes.item(i)
-                element = node.toElement()
-                if (
-                    element.hasAttribute("name")
-                    and element.attribute("name") == "theMapCanvas"
-                ):
-                    map_settings.readXml(node)
-
-            map_settings.setRotation(0)
-            map_settings.setOutputSize(QSize(1024, 768))
-
-            details["extent"] = map_settings.extent().asWktPolygon()
-
-        return on_project_read
-
-    # NOTE use a temporary project to get the project extent and background color
-    # as we can disable resolving layers, which results in great speed gains
-    tmp_project = QgsProject()
-    tmp_project_read_flags = (
-        # TODO we use `QgsProject` read flags, as the ones in `Qgis.ProjectReadFlags` do not work in QGIS 3.34.2
-        QgsProject.ReadFlags()
-        | QgsProject.FlagDontResolveLayers
-        | QgsProject.FlagDontLoadLayouts
-        | QgsProject.FlagDontLoad3DViews
-        | QgsProject.DontLoadProjectStyles
-    )
-    tmp_project.readProject.connect(on_project_read_wrapper(tmp_project))
-    tmp_project.read(project.fileName(), tmp_project_read_flags)
-
-    # NOTE force delete the `QgsProject`, otherwise the `QgsApplication` might be deleted by the time the project is garbage collected
-    del tmp_project
-
-    details["crs"] = project.crs().authid()
-    details["project_name"] = project.title()
-
-    logger.info("Extracting layer and datasource details…")
-
-    details["layers_by_id"] = get_layers_data(project)
-    details["ordered_layer_ids"] = list(details["layers_by_id"].keys())
-    details["attachment_dirs"], _ = project.readListEntry(
-        "QFieldSync", "attachmentDirs", ["DCIM"]
-    )
+    details = project_session.get_details()
 
     logger.info(
         f'QGIS project layer checks\n{layers_data_to_string(details["layers_by_id"])}',
@@ -126,66 +57,20 @@ def extract_project_details(project: QgsProject) -> dict[str, str]:
     return details
 
 
-def generate_thumbnail(the_qgis_file_name: str, thumbnail_filename: Path) -> None:
+def generate_thumbnail(
+    project_session: ProjectSession, thumbnail_filename: Path
+) -> None:
     """Create a thumbnail for the project
 
     As from https://docs.qgis.org/3.16/en/docs/pyqgis_developer_cookbook/composer.html#simple-rendering
 
     Args:
-        the_qgis_file_name (str)
+        project_session (ProjectSession)
         thumbnail_filename (Path)
     """
     logger.info("Generate project thumbnail image…")
 
-    map_settings = QgsMapSettings()
-
-    def on_project_read_wrapper(
-        tmp_project: QgsProject,
-        tmp_layer_tree: QgsLayerTree,
-    ) -> Callable[[QDomDocument], None]:
-        def on_project_read(doc: QDomDocument) -> None:
-            r, _success = tmp_project.readNumEntry("Gui", "/CanvasColorRedPart", 255)
-            g, _success = tmp_project.readNumEntry("Gui", "/CanvasColorGreenPart", 255)
-            b, _success = tmp_project.readNumEntry("Gui", "/CanvasColorBluePart", 255)
-            map_settings.setBackgroundColor(QColor(r, g, b))
-
-            nodes = doc.elementsByTagName("mapcanvas")
-
-            for i in range(nodes.size()):
-                node = nodes.item(i)
-                element = node.toElement()
-                if (
-                    element.hasAttribute("name")
-                    and element.attribute("name") == "theMapCanvas"
-                ):
-                    map_settings.readXml(node)
-
-            map_settings.setRotation(0)
-            map_settings.setTransformContext(tmp_project.transformContext())
-            map_settings.setPathResolver(tmp_project.pathResolver())
-            map_settings.setOutputSize(QSize(100, 100))
-            map_settings.setLayers(reversed(list(tmp_layer_tree.customLayerOrder())))
-
-        return on_project_read
-
-    # NOTE use a temporary project to generate the layer rendering with improved speed
-    tmp_project = QgsProject()
-    tmp_layer_tree = tmp_project.layerTreeRoot()
-    tmp_project_read_flags = (
-        # TODO we use `QgsProject` read flags, as the ones in `Qgis.ProjectReadFlags` do not work in QGIS 3.34.2
-        QgsProject.ReadFlags()
-        | QgsProject.ForceReadOnlyLayers
-        | QgsProject.FlagDontLoadLayouts
-        | QgsProject.FlagDontLoad3DViews
-        | QgsProject.DontLoadProjectStyles
-    )
-    tmp_project.readProject.connect(
-        on_project_read_wrapper(tmp_project, tmp_layer_tree)
-    )
-    tmp_project.read(
-        the_qgis_file_name,
-        tmp_project_read_flags,
-    )
+    map_settings = project_session.get_thumbnail_map_settings(100)
 
     img = QImage(map_settings.outputSize(), QImage.Format_ARGB32)
     painter = QPainter(img)
@@ -203,8 +88,6 @@ def generate_thumbnail(the_qgis_file_name: str, thumbnail_filename: Path) -> Non
     del job
     del painter
     del img
-    # NOTE force delete the `QgsProject`, otherwise the `QgsApplication` might be deleted by the time the project is garbage collected
-    del tmp_project
 
     logger.info("Project thumbnail image generated!")
 
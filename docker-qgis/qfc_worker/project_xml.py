@@ -0,0 +1,181 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import IO
+from xml.parsers import expat
+
+# matches the attribute holding the feature count flag in `<legendlayer>` and `<Option name="showFeatureCount">` start tags
+FEATURE_COUNT_ATTR_RE = re.compile(
+    rb"""(\s(?:showFeatureCount|value)\s*=\s*)(?:"[^"]*"|'[^']*')"""
+)
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def find_feature_count_offsets(xml_file: IO[bytes]) -> list[int]:
+    """Returns the byte offsets of the start tags with feature count enabled.
+
+    The XML is streamed through `expat`, so the memory usage does not depend on the project size.
+
+    Args:
+        xml_file (IO[bytes]): the QGIS project XML.
+
+    Returns:
+        list[int]: the byte offsets of the `<` of each start tag to be rewritten, in ascending order.
+    """
+    offsets = []
+    # names of the open elements and their `type` attribute
+    stack: list[tuple[str, str | None]] = []
+    parser = expat.ParserCreate()
+
+    def on_start_element(name: str, attrs: dict[str, str]) -> None:
+        if name == "legendlayer":
+            if attrs.get("showFeatureCount", "0") != "0":
+                offsets.append(parser.CurrentByteIndex)
+        elif (
+            name == "Option"
+            and attrs.get("name") == "showFeatureCount"
+            and attrs.get("value", "0") != "0"
+            and len(stack) >= 3
+            and stack[-1] == ("Option", "Map")
+            and stack[-2][0] == "customproperties"
+            and stack[-3][0] == "layer-tree-layer"
+        ):
+            offsets.append(parser.CurrentByteIndex)
+
+        stack.append((name, attrs.get("type")))
+
+    def on_end_element(name: str) -> None:
+        stack.pop()
+
+    parser.StartElementHandler = on_start_element
+    parser.EndElementHandler = on_end_element
+    parser.ParseFile(xml_file)
+
+    return offsets
+
+
+def read_start_tag(src: IO[bytes]) -> bytes:
+    """Reads a start tag from the current position of `src`, up to the closing `>` outside attribute values."""
+    tag = bytearray()
+    quote = None
+
+    while True:
+        char = src.read(1)
+
+        if not char:
+            raise Exception("Unexpected end of the QGIS project XML!")
+
+        tag += char
+
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in (b'"', b"'"):
+            quote = char
+        elif char == b">":
+            return bytes(tag)
+
+
+def write_without_feature_count(
+    src: IO[bytes], dst: IO[bytes], offsets: list[int]
+) -> None:
+    """Copies `src` into `dst` as is, except the start tags at `offsets`, which get the feature count disabled."""
+    position = 0
+
+    for offset in offsets:
+        remaining = offset - position
+        while remaining > 0:
+            chunk = src.read(min(remaining, COPY_BUFFER_SIZE))
+
+            if not chunk:
+                raise Exception("Unexpected end of the QGIS project XML!")
+
+            dst.write(chunk)
+            remaining -= len(chunk)
+
+        tag = read_start_tag(src)
+        dst.write(FEATURE_COUNT_ATTR_RE.sub(rb'\g<1>"0"', tag))
+        position = offset + len(tag)
+
+    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+def strip_feature_count_from_project_xml(the_qgis_file_name: str) -> None:
+    """Rewrites project XML file with feature count disabled.
+
+    Only the `<legendlayer>` and `<Option name="showFeatureCount">` start tags are touched, the rest of the file is copied byte by byte.
+    The file is not rewritten at all if no layer has the feature count enabled.
+
+    Args:
+        the_qgis_file_name (str): filename of the QGIS filename (.qgs or .qgz)
+    """
+    the_qgis_file_name = str(the_qgis_file_name)
+    tmp_dir = Path(the_qgis_file_name).parent
+
+    if zipfile.is_zipfile(the_qgis_file_name):
+        logging.info("The QGIS file is zipped as .qgz, reading the XML from it…")
+
+        with zipfile.ZipFile(the_qgis_file_name) as archive:
+            xml_member = next(
+                (
+                    info
+                    for info in archive.infolist()
+                    if info.filename.lower().endswith(".qgs")
+                ),
+                None,
+            )
+
+            if not xml_member:
+                raise Exception(
+                    f"Failed to find the .qgs file in {the_qgis_file_name}!"
+                )
+
+            with archive.open(xml_member) as xml_file:
+                offsets = find_feature_count_offsets(xml_file)
+
+            if not offsets:
+                logging.info("No feature count enabled, skip rewriting the QGIS file.")
+                return
+
+            logging.info(f"Disabling feature count in {len(offsets)} place(s)…")
+
+            with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp_file:
+                with zipfile.ZipFile(tmp_file, "w") as tmp_archive:
+                    for info in archive.infolist():
+                        tmp_info = zipfile.ZipInfo(info.filename, info.date_time)
+                        tmp_info.compress_type = info.compress_type
+                        tmp_info.external_attr = info.external_attr
+
+                        with (
+                            archive.open(info) as src,
+                            tmp_archive.open(tmp_info, "w", force_zip64=True) as dst,
+                        ):
+                            if info.filename == xml_member.filename:
+                                write_without_feature_count(src, dst, offsets)
+                            else:
+                                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+    else:
+        with open(the_qgis_file_name, "rb") as xml_file:
+            offsets = find_feature_count_offsets(xml_file)
+
+        if not offsets:
+            logging.info("No feature count enabled, skip rewriting the QGIS file.")
+            return
+
+        logging.info(f"Disabling feature count in {len(offsets)} place(s)…")
+
+        with (
+            open(the_qgis_file_name, "rb") as src,
+            tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp_file,
+        ):
+            write_without_feature_count(src, tmp_file, offsets)
+
+    shutil.copymode(the_qgis_file_name, tmp_file.name)
+    os.replace(tmp_file.name, the_qgis_file_name)
+
+    logging.info("The QGIS file re-written!")
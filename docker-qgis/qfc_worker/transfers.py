@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from qfieldcloud_sdk import sdk
+from qfieldcloud_sdk.utils import calc_etag
+
+# number of files transferred in parallel, can be overridden with the `FILE_TRANSFER_CONCURRENCY` envvar
+TRANSFER_CONCURRENCY = 8
+
+# files larger than that are downloaded in concurrent byte ranges
+RANGED_DOWNLOAD_MIN_SIZE = 64 * 1024 * 1024
+
+# size of each byte range of the ranged downloads
+RANGED_DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+
+# suffix of the file next to the downloaded directory, with the ETag, size and modification time of each downloaded file
+FILES_MANIFEST_SUFFIX = ".manifest.json"
+
+
+def get_transfer_concurrency() -> int:
+    return max(
+        1, int(os.environ.get("FILE_TRANSFER_CONCURRENCY", TRANSFER_CONCURRENCY))
+    )
+
+
+def is_project_file(filename: str) -> bool:
+    return Path(filename).suffix.lower() in (".qgs", ".qgz")
+
+
+def get_files_manifest_filename(local_dir: Path) -> Path:
+    # NOTE the manifest is stored outside `local_dir`, so it is never uploaded or packaged
+    return local_dir.with_name(f"{local_dir.name}{FILES_MANIFEST_SUFFIX}")
+
+
+def write_files_manifest(local_dir: Path, files: list[dict[str, Any]]) -> None:
+    """Records the ETag, size and modification time of the downloaded `files`, so the unchanged ones are not uploaded back."""
+    manifest = {}
+    for file in files:
+        stat = local_dir.joinpath(file["name"]).stat()
+        manifest[file["name"]] = {
+            "etag": file["etag"],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    with open(get_files_manifest_filename(local_dir), "w") as f:
+        json.dump(manifest, f)
+
+
+def read_files_manifest(local_dir: Path) -> dict[str, dict[str, Any]] | None:
+    try:
+        with open(get_files_manifest_filename(local_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def is_file_changed(file: dict[str, Any], manifest: dict[str, dict[str, Any]]) -> bool:
+    """Returns whether the local file differs from the one in the manifest.
+
+    The ETag is calculated only if the size or the modification time changed, as it requires reading the whole file.
+    """
+    entry = manifest.get(file["name"])
+
+    if not entry:
+        return True
+
+    stat = Path(file["absolute_filename"]).stat()
+
+    if stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns"):
+        return False
+
+    return calc_etag(file["absolute_filename"]) != entry["etag"]
+
+
+class FileTransfers:
+    """Transfers many files from and to QFieldCloud in parallel.
+
+    Large files are downloaded in concurrent byte ranges, if the storage supports `Range` requests.
+    Uploads are always done in a single request per file, as the QFieldCloud API does not support chunked uploads.
+
+    NOTE each thread uses its own `sdk.Client`, as `requests.Session` is not thread safe.
+    """
+
+    def __init__(self, concurrency: int | None = None) -> None:
+        self.concurrency = concurrency or get_transfer_concurrency()
+        self._local = threading.local()
+        self.transfers: list[dict[str, Any]] = []
+        self.skipped_files_count = 0
+
+    @property
+    def client(self) -> sdk.Client:
+        if not hasattr(self._local, "client"):
+            self._local.client = sdk.Client()
+
+        return self._local.client
+
+    def download_files(
+        self,
+        files: list[dict[str, Any]],
+        project_id: str,
+        local_dir: Path,
+    ) -> list[dict[str, Any]]:
+        """Downloads the project files into `local_dir`.
+
+        Args:
+            files (list[dict[str, Any]]): the remote files dicts, as returned by `sdk.Client.list_remote_files`.
+            project_id (str): the project id.
+            local_dir (Path): the destination directory.
+
+        Returns:
+            list[dict[str, Any]]: the transfer timings of each file.
+        """
+        # NOTE a separate pool for the byte ranges, so the file downloads never wait for their own pool
+        with (
+            ThreadPoolExecutor(self.concurrency) as files_executor,
+            ThreadPoolExecutor(self.concurrency) as ranges_executor,
+        ):
+            futures = [
+                files_executor.submit(
+                    self._download_file,
+                    ranges_executor,
+                    project_id,
+                    file,
+                    local_dir.joinpath(file["name"]),
+                )
+                for file in files
+            ]
+
+            # NOTE raise the first error, as `throw_on_error=True` did
+            transfers = [future.result() for future in futures]
+
+        self.transfers += transfers
+
+        return transfers
+
+    def upload_files(
+        self,
+        project_id: str,
+        upload_type: sdk.FileTransferType,
+        local_dir: Path,
+        force: bool = False,
+        job_id: str = "",
+    ) -> list[dict[str, Any]]:
+        """Uploads the files from `local_dir`.
+
+        The project files (`.qgs` and `.qgz`) are uploaded last, once all the other files are uploaded.
+        All the files that did not change since they were downloaded are skipped, unless `force` is set.
+        If there is no manifest of the downloaded files, the local files are compared to the remote ones by their ETag.
+        The package files are always uploaded.
+
+        Returns:
+            list[dict[str, Any]]: the transfer timings of each file.
+        """
+        local_files = self.client.list_local_files(str(local_dir), "*")
+
+        if upload_type == sdk.FileTransferType.PROJECT and not force:
+            manifest = read_files_manifest(local_dir)
+
+            if manifest is None:
+                manifest = {
+                    file["name"]: {"etag": file["etag"]}
+                    for file in self.client.list_remote_files(project_id)
+                }
+
+            changed_files = [
+                file for file in local_files if is_file_changed(file, manifest)
+            ]
+            self.skipped_files_count += len(local_files) - len(changed_files)
+
+            logging.info(
+                f"Skipping {len(local_files) - len(changed_files)} unchanged file(s)."
+            )
+
+            local_files = changed_files
+
+        data_files = [f for f in local_files if not is_project_file(f["name"])]
+        project_files = [f for f in local_files if is_project_file(f["name"])]
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            futures = [
+                executor.submit(
+                    self._upload_file, project_id, upload_type, file, job_id
+                )
+                for file in data_files
+            ]
+            transfers = [future.result() for future in futures]
+
+        for file in project_files:
+            transfers.append(self._upload_file(project_id, upload_type, file, job_id))
+
+        self.transfers += transfers
+
+        return transfers
+
+    def _download_file(
+        self,
+        ranges_executor: ThreadPoolExecutor,
+        project_id: str,
+        file: dict[str, Any],
+        local_filename: Path,
+    ) -> dict[str, Any]:
+        started_at = time.perf_counter()
+        ranges_count = 1
+        url = f"files/{project_id}/{file['name']}"
+
+        local_filename.parent.mkdir(parents=True, exist_ok=True)
+
+        if file["size"] < RANGED_DOWNLOAD_MIN_SIZE:
+            self.client.download_file(
+                project_id,
+                sdk.FileTransferType.PROJECT,
+                local_filename,
+                file["name"],
+                show_progress=False,
+            )
+        else:
+            ranges_count = self._download_file_ranges(
+                ranges_executor, url, file["size"], local_filename
+            )
+
+        return {
+            "name": file["name"],
+            "size": file["size"],
+            "direction": "download",
+            "ranges_count": ranges_count,
+            "duration_s": round(time.perf_counter() - started_at, 3),
+        }
+
+    def _download_file_ranges(
+        self,
+        ranges_executor: ThreadPoolExecutor,
+        url: str,
+        size: int,
+        local_filename: Path,
+    ) -> int:
+        """Downloads the file in concurrent byte ranges and returns the number of ranges."""
+        ranges = [
+            (start, min(start + RANGED_DOWNLOAD_CHUNK_SIZE, size) - 1)
+            for start in range(0, size, RANGED_DOWNLOAD_CHUNK_SIZE)
+        ]
+
+        with open(local_filename, "wb") as f:
+            # NOTE the first range tells if the storage supports `Range` requests at all
+            resp = self._request_range(url, *ranges[0])
+
+            if resp.status_code != 206:
+                logging.info(
+                    f'Ranged download not supported for "{local_filename.name}", downloading at once…'
+                )
+                for chunk in resp.iter_content(chunk_size=DOWNLOAD_BUFFER_SIZE):
+                    f.write(chunk)
+
+                return 1
+
+            f.truncate(size)
+            fd = f.fileno()
+
+            self._write_range(resp, fd, ranges[0][0])
+
+            futures = [
+                ranges_executor.submit(self._download_range, url, fd, start, end)
+                for start, end in ranges[1:]
+            ]
+
+            for future in futures:
+                future.result()
+
+        return len(ranges)
+
+    def _download_range(self, url: str, fd: int, start: int, end: int) -> None:
+        resp = self._request_range(url, start, end)
+
+        if resp.status_code != 206:
+            raise Exception(
+                f"Expected a partial content response for range {start}-{end}, got HTTP {resp.status_code}."
+            )
+
+        self._write_range(resp, fd, start)
+
+    def _request_range(self, url: str, start: int, end: int):
+        # NOTE `sdk.Client` has no public API for ranged requests, so this is the only place relying on
+        # the private `sdk.Client._request`, which handles the base URL, the token and the redirects.
+        # It is checked against `qfieldcloud-sdk==0.8.4` as pinned in `requirements.in`, recheck it when upgrading.
+        return self.client._request(
+            "GET", url, headers={"Range": f"bytes={start}-{end}"}, stream=True
+        )
+
+    def _write_range(self, resp, fd: int, offset: int) -> None:
+        for chunk in resp.iter_content(chunk_size=DOWNLOAD_BUFFER_SIZE):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+
+    def _upload_file(
+        self,
+        project_id: str,
+        upload_type: sdk.FileTransferType,
+        file: dict[str, Any],
+        job_id: str,
+    ) -> dict[str, Any]:
+        started_at = time.perf_counter()
+        local_filename = Path(file["absolute_filename"])
+
+        self.client.upload_file(
+            project_id,
+            upload_type,
+            local_filename,
+            file["name"],
+            show_progress=False,
+            job_id=job_id,
+        )
+
+        return {
+            "name": file["name"],
+            "size": local_filename.stat().st_size,
+            "direction": "upload",
+            "ranges_count": 1,
+            "duration_s": round(time.perf_counter() - started_at, 3),
+        }
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "files_count": len(self.transfers),
+            "skipped_files_count": self.skipped_files_count,
+            "bytes": sum(t["size"] for t in self.transfers),
+            "files": self.transfers,
+        }
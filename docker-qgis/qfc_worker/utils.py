@@ -7,13 +7,17 @@ import json
 import logging
 import os
 import re
+import resource
+import shutil
 import socket
 import subprocess
 import sys
 import tempfile
+import threading
+import time
 import traceback
 import uuid
-import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
@@ -28,18 +32,21 @@ from qfieldcloud_sdk import sdk
 from qgis.core import (
     Qgis,
     QgsApplication,
+    QgsCoordinateTransform,
+    QgsCoordinateTransformContext,
+    QgsDataProvider,
     QgsMapLayer,
     QgsMapSettings,
     QgsProject,
-    QgsProjectArchive,
     QgsProviderRegistry,
-    QgsZipUtils,
+    QgsRectangle,
 )
 from qgis.PyQt import QtCore, QtGui
 from tabulate import tabulate
 
-# Get environment variables
-JOB_ID = os.environ.get("JOB_ID")
+from .file_cache import FileCache
+from .project_xml import strip_feature_count_from_project_xml
+from .transfers import FileTransfers, write_files_manifest
 
 qgs_stderr_logger = logging.getLogger("QGSSTDERR")
 qgs_stderr_logger.setLevel(logging.DEBUG)
@@ -245,69 +252,118 @@ def open_qgis_project(
     return project
 
 
-def strip_feature_count_from_project_xml(the_qgis_file_name: str) -> None:
-    """Rewrites project XML file with feature count disabled.
+class ProjectSession:
+    """The QGIS project loaded once per job.
 
-    Args:
-        the_qgis_file_name (str): filename of the QGIS filename (.qgs or .qgz)
+    The map canvas settings are read while the project is loaded, so the project details, extent and thumbnail
+    can be served without reading the project file again.
     """
-    archive = None
-    xml_file = the_qgis_file_name
-    if QgsZipUtils.isZipFile(the_qgis_file_name):
-        logging.info("The QGIS file is zipped as .qgz, unzipping…")
 
-        archive = QgsProjectArchive()
+    def __init__(self, project: QgsProject) -> None:
+        self.project = project
+        self.map_settings = QgsMapSettings()
+        self.background_color = QtGui.QColor(255, 255, 255)
+        self._layers_data: dict[str, dict] | None = None
+
+    @staticmethod
+    def open(
+        the_qgis_file_name: str,
+        force_reload: bool = False,
+        disable_feature_count: bool = False,
+        flags: Qgis.ProjectReadFlags = Qgis.ProjectReadFlags(),
+    ) -> "ProjectSession":
+        """Opens the project, see `open_qgis_project`.
+
+        NOTE if the project is already loaded and not `force_reload`, the map canvas settings are not available.
+        """
+        project_session = ProjectSession(QgsProject.instance())
+
+        project_session.project.readProject.connect(project_session._on_project_read)
+
+        try:
+            open_qgis_project(
+                the_qgis_file_name,
+                force_reload=force_reload,
+                disable_feature_count=disable_feature_count,
+                flags=flags,
+            )
+        finally:
+            project_session.project.readProject.disconnect(
+                project_session._on_project_read
+            )
 
-        if archive.unzip(the_qgis_file_name):
-            logging.info("The QGIS file is unzipped successfully!")
-            xml_file = archive.projectFile()
-        else:
-            logging.error("The QGIS file is unzipping failed!")
+        return project_session
 
-            raise Exception(f"Failed to unzip {the_qgis_file_name} file!")
+    def _on_project_read(self, doc) -> None:
+        r, _success = self.project.readNumEntry("Gui", "/CanvasColorRedPart", 255)
+        g, _success = self.project.readNumEntry("Gui", "/CanvasColorGreenPart", 255)
+        b, _success = self.project.readNumEntry("Gui", "/CanvasColorBluePart", 255)
+        self.background_color = QtGui.QColor(r, g, b)
+        self.map_settings.setBackgroundColor(self.background_color)
 
-    logging.info("Parsing QGIS file XML…")
+        nodes = doc.elementsByTagName("mapcanvas")
 
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+        for i in range(nodes.size()):
+            node = nodes.item(i)
+            element = node.toElement()
+            if (
+                element.hasAttribute("name")
+                and element.attribute("name") == "theMapCanvas"
+            ):
+                self.map_settings.readXml(node)
 
-    logging.info("QGIS project parsed!")
+        self.map_settings.setRotation(0)
+        self.map_settings.setOutputSize(QtCore.QSize(1024, 768))
 
-    for node in root.findall(".//legendlayer"):
-        node.set("showFeatureCount", "0")
+    def get_layers_data(self) -> dict[str, dict]:
+        if self._layers_data is None:
+            self._layers_data = get_layers_data(self.project)
 
-    for node in root.findall(
-        './/layer-tree-layer/customproperties/Option[@type="Map"]/Option[@name="showFeatureCount"]'
-    ):
-        node.set("value", "0")
+        return self._layers_data
 
-    logging.info("Writing the QGIS project XML into a file…")
+    def get_extent_wkt(self) -> str:
+        """Returns the extent of the main map canvas as saved in the project."""
+        return self.map_settings.extent().asWktPolygon()
 
-    if archive:
-        tmp_filename = tempfile.NamedTemporaryFile().name
-        tree.write(tmp_filename, short_empty_elements=False)
+    def get_details(self) -> dict[str, Any]:
+        details: dict[str, Any] = {
+            "background_color": self.background_color.name(),
+            "extent": self.get_extent_wkt(),
+            "crs": self.project.crs().authid(),
+            "project_name": self.project.title(),
+        }
+
+        details["layers_by_id"] = self.get_layers_data()
+        details["ordered_layer_ids"] = list(details["layers_by_id"].keys())
+        details["attachment_dirs"], _ = self.project.readListEntry(
+            "QFieldSync", "attachmentDirs", ["DCIM"]
+        )
 
-        if not archive.clearProjectFile():
-            raise Exception("Failed to clear project path from the archive!")
+        return details
 
-        if not Path(tmp_filename).rename(xml_file):
-            raise Exception("Failed to move the temp xml file into archive dir!")
+    def get_thumbnail_map_settings(self, size: int) -> QgsMapSettings:
+        map_settings = QgsMapSettings(self.map_settings)
+        map_settings.setTransformContext(self.project.transformContext())
+        map_settings.setPathResolver(self.project.pathResolver())
+        map_settings.setOutputSize(QtCore.QSize(size, size))
+        map_settings.setLayers(
+            reversed(list(self.project.layerTreeRoot().customLayerOrder()))
+        )
 
-        archive.addFile(xml_file)
+        return map_settings
 
-        if not archive.zip(the_qgis_file_name):
-            raise Exception(f"Failed to zip QGIS file {the_qgis_file_name}!")
-    else:
-        tree.write(xml_file, short_empty_elements=False)
 
-    logging.info("The QGIS file re-written!")
+def open_project_session(the_qgis_file_name: str) -> ProjectSession:
+    return ProjectSession.open(the_qgis_file_name)
 
 
 def download_project(
     project_id: str, destination: Path | None = None, skip_attachments: bool = True
-) -> Path:
+) -> tuple[Path, dict[str, Any], dict[str, Any]]:
     """Download the files in the project "working" directory from the S3
-    Storage into a temporary directory. Returns the directory path"""
+    Storage into a temporary directory. Returns the directory path, the file cache stats and the transfer stats.
+
+    The files found in the host file cache are materialized from it, only the rest is downloaded in parallel."""
     logging.info("Preparing a temporary directory for project files…")
 
     if not destination:
@@ -319,67 +375,87 @@ def download_project(
     working_dir.mkdir(parents=True)
 
     client = sdk.Client()
-    files = client.list_remote_files(project_id)
+    all_files = client.list_remote_files(project_id)
 
     if skip_attachments:
-        files = [file for file in files if not file["is_attachment"]]
+        all_files = [file for file in all_files if not file["is_attachment"]]
+
+    files = all_files
+    file_cache = FileCache.from_env()
+
+    if file_cache:
+        files = [
+            file
+            for file in all_files
+            if not file_cache.materialize(file, working_dir.joinpath(file["name"]))
+        ]
 
     logging.info("Downloading project files…")
 
-    client.download_files(
-        files,
-        project_id,
-        sdk.FileTransferType.PROJECT,
-        str(working_dir),
-        filter_glob="*",
-        throw_on_error=True,
-        show_progress=False,
-    )
+    transfers = FileTransfers()
+    transfers.download_files(files, project_id, working_dir)
 
     logging.info("Downloading project files finished!")
 
+    write_files_manifest(working_dir, all_files)
+
+    file_cache_stats: dict[str, Any] = {"is_enabled": False}
+
+    if file_cache:
+        for file in files:
+            file_cache.store(file, working_dir.joinpath(file["name"]))
+
+        file_cache.evict()
+
+        file_cache_stats = {
+            "is_enabled": True,
+            **file_cache.get_stats(),
+        }
+
+        logging.info(f"File cache stats: {file_cache_stats}")
+
     list_local_files(project_id, working_dir)
 
-    return destination
+    return destination, file_cache_stats, transfers.get_stats()
 
 
-def upload_package(project_id: str, package_dir: Path) -> None:
-    client = sdk.Client()
+def upload_package(project_id: str, package_dir: Path) -> dict[str, Any]:
+    """Upload the packaged files from the `package_dir` in parallel. Returns the transfer stats."""
     list_local_files(project_id, package_dir)
 
     logging.info("Uploading packaged project files…")
 
-    client.upload_files(
+    transfers = FileTransfers()
+    transfers.upload_files(
         project_id,
         sdk.FileTransferType.PACKAGE,
-        str(package_dir),
-        filter_glob="*",
-        throw_on_error=True,
-        show_progress=False,
-        job_id=JOB_ID,
+        package_dir,
+        # NOTE read the job id when uploading, as warm workers receive it after the module is imported
+        job_id=os.environ.get("JOB_ID", ""),
     )
 
     logging.info("Uploading packaged project files finished!")
 
+    return transfers.get_stats()
 
-def upload_project(project_id: str, project_dir: Path) -> None:
-    """Upload the files from the `project_dir` to the permanent file storage."""
-    client = sdk.Client()
+
+def upload_project(project_id: str, project_dir: Path) -> dict[str, Any]:
+    """Upload the changed files from the `project_dir` to the permanent file storage in parallel. Returns the transfer stats."""
     list_local_files(project_id, project_dir)
 
     logging.info("Uploading project files…")
 
-    client.upload_files(
+    transfers = FileTransfers()
+    transfers.upload_files(
         project_id,
         sdk.FileTransferType.PROJECT,
-        str(project_dir),
-        filter_glob="*",
-        throw_on_error=True,
-        show_progress=False,
+        project_dir,
     )
 
     logging.info("Uploading packaged project files finished!")
 
+    return transfers.get_stats()
+
 
 def list_local_files(project_id: str, project_dir: Path):
     client = sdk.Client()
@@ -460,8 +536,49 @@ class Workflow:
                         f'The workflow "{self.id}" method "{step.method.__name__}" receives a parameter "{name}" that is not available in the method definition, expected one of {param_names}.'
                     )
 
+            for step_id in step.depends_on:
+                if step_id not in all_step_returns:
+                    raise WorkflowValidationException(
+                        f'The workflow "{self.id}" has step "{step.id}" that depends on a non-existing step "{step_id}". Previous step with that id does not exist.'
+                    )
+
             all_step_returns[step.id] = all_step_returns.get(step.id, step.return_names)
 
+    def get_dependencies(self) -> list[set[int]]:
+        """Returns the indices of the steps each step depends on.
+
+        A step depends on:
+        - the steps whose `StepOutput` it receives as arguments;
+        - the steps listed in its `depends_on`;
+        - all the previous steps that receive an overlapping `WorkDirPathBase`, e.g. `WorkDirPath()` overlaps with `WorkDirPath("files")`.
+
+        The dependencies are always previous steps, so the graph is acyclic.
+        """
+        dependencies: list[set[int]] = []
+        step_indices: dict[str, int] = {}
+        workdir_paths: list[tuple[int, tuple[str, ...]]] = []
+
+        for idx, step in enumerate(self.steps):
+            step_dependencies = {step_indices[step_id] for step_id in step.depends_on}
+
+            for value in step.arguments.values():
+                if isinstance(value, StepOutput):
+                    step_dependencies.add(step_indices[value.step_id])
+                elif isinstance(value, WorkDirPathBase):
+                    parts = Path(*value.parts).parts
+
+                    for other_idx, other_parts in workdir_paths:
+                        shortest = min(len(parts), len(other_parts))
+                        if parts[:shortest] == other_parts[:shortest]:
+                            step_dependencies.add(other_idx)
+
+                    workdir_paths.append((idx, parts))
+
+            dependencies.append(step_dependencies)
+            step_indices[step.id] = idx
+
+        return dependencies
+
 
 class Step:
     def __init__(
@@ -472,6 +589,9 @@ class Step:
         arguments: dict[str, Any] = {},
         return_names: list[str] = [],
         outputs: list[str] = [],
+        depends_on: list[str] = [],
+        thread_safe: bool = False,
+        checkpoint: bool = False,
     ):
         self.id = id
         self.name = name
@@ -481,7 +601,18 @@ class Step:
         self.return_names = return_names
         # names of method return values that will be part of the outputs. They are assumed to be safe to be shown to the user.
         self.outputs = outputs
+        # ids of previous steps that must be finished before this step starts, on top of the ones deduced from the arguments, see `Workflow.get_dependencies`
+        self.depends_on = depends_on
+        # whether the step can run in a worker thread, concurrently with the other steps. Steps touching QGIS must run on the main thread.
+        self.thread_safe = thread_safe
+        # whether the step returns are stored in the workflow checkpoint, so a retried job can skip the step. The returns must be JSON serializable, `Path`s are supported.
+        self.checkpoint = checkpoint
+        # whether the step returns were restored from the workflow checkpoint, or the step was not needed at all, see `WorkflowCheckpoint`
+        self.is_restored = False
+        self.is_skipped = False
         self.stage = 0
+        # resource usage of the step execution, see `get_step_metrics`
+        self.metrics: dict[str, Any] = {}
 
 
 class StepOutput:
@@ -514,18 +645,155 @@ class WorkDirPathAsStr(WorkDirPathBase):
         return str(super().eval(root))
 
 
+class ResourceUsage(NamedTuple):
+    wall_time_s: float
+    cpu_time_s: float
+    # the peak resident set size of the process so far
+    max_rss_bytes: int
+    # the bytes read from or written to the storage, `None` if `/proc/self/io` is not available
+    read_bytes: int | None
+    write_bytes: int | None
+
+
+def get_resource_usage() -> ResourceUsage:
+    read_bytes = None
+    write_bytes = None
+
+    try:
+        with open("/proc/self/io") as f:
+            io_counters = dict(line.split(": ") for line in f.read().splitlines())
+
+        read_bytes = int(io_counters["read_bytes"])
+        write_bytes = int(io_counters["write_bytes"])
+    except Exception:
+        pass
+
+    return ResourceUsage(
+        wall_time_s=time.perf_counter(),
+        # NOTE includes the CPU time of all threads, e.g. the parallel file transfers
+        cpu_time_s=time.process_time(),
+        # NOTE `ru_maxrss` is in kilobytes on Linux
+        max_rss_bytes=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        read_bytes=read_bytes,
+        write_bytes=write_bytes,
+    )
+
+
+def get_step_metrics(started: ResourceUsage, finished: ResourceUsage) -> dict[str, Any]:
+    """Returns the resources used between the `started` and `finished` resource usages of a step.
+
+    NOTE the peak RSS delta is how much the step raised the peak memory of the process,
+    it is 0 if the step used less memory than a previous step.
+    """
+    metrics = {
+        "wall_time_s": round(finished.wall_time_s - started.wall_time_s, 3),
+        "cpu_time_s": round(finished.cpu_time_s - started.cpu_time_s, 3),
+        "peak_rss_delta_bytes": finished.max_rss_bytes - started.max_rss_bytes,
+        "peak_rss_bytes": finished.max_rss_bytes,
+        "read_bytes": None,
+        "write_bytes": None,
+    }
+
+    if started.read_bytes is not None and finished.read_bytes is not None:
+        metrics["read_bytes"] = finished.read_bytes - started.read_bytes
+
+    if started.write_bytes is not None and finished.write_bytes is not None:
+        metrics["write_bytes"] = finished.write_bytes - started.write_bytes
+
+    return metrics
+
+
+# number of thread safe workflow steps run concurrently
+WORKFLOW_THREADS = 4
+
+# number of remote layers queried at once when packaging, can be overridden with the `PACKAGE_LAYER_CONCURRENCY` envvar
+PACKAGE_LAYER_CONCURRENCY = 8
+
+# name of the file with the returns of the checkpointed steps, see `WorkflowCheckpoint`
+CHECKPOINT_FILENAME = "checkpoint.json"
+
+
+# the log records of the step running in the current thread, if its logs are buffered, see `logger_context`
+_step_log_buffer = threading.local()
+# held while writing the step markers and the buffered logs, so the logs of the concurrent steps never interleave
+_step_log_lock = threading.RLock()
+
+
+class BufferedStepLogFilter(logging.Filter):
+    """Keeps the log records of a step with buffered logs, instead of letting the `handler` emit them right away."""
+
+    def __init__(self, handler: logging.Handler) -> None:
+        super().__init__()
+        self.handler = handler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        records = getattr(_step_log_buffer, "records", None)
+
+        if records is None:
+            return True
+
+        records.append((self.handler, record))
+
+        return False
+
+
+def install_buffered_step_log_filters() -> None:
+    for handler in logging.root.handlers:
+        if not any(isinstance(f, BufferedStepLogFilter) for f in handler.filters):
+            handler.addFilter(BufferedStepLogFilter(handler))
+
+
 @contextmanager
-def logger_context(step: Step):
+def logger_context(step: Step, buffered: bool = False):
+    """Wraps the logs of the step between start and end markers.
+
+    If `buffered`, the logs of the step are kept until it finishes, then written at once together with the markers,
+    so the logs of the steps running concurrently are not interleaved.
+    NOTE the logs of the threads started by the step itself are not buffered.
+    """
     log_uuid = uuid.uuid4()
+    started_resource_usage = get_resource_usage()
+    start_marker = f"::<<<::{log_uuid} {step.name}"
+
+    if buffered:
+        install_buffered_step_log_filters()
+        _step_log_buffer.records = []
+    else:
+        with _step_log_lock:
+            print(start_marker, file=sys.stderr)
 
     try:
         # NOTE we are still using the reference from the `steps` list
         step.stage = 1
-        print(f"::<<<::{log_uuid} {step.name}", file=sys.stderr)
         yield
         step.stage = 2
     finally:
-        print(f"::>>>::{log_uuid} {step.stage}", file=sys.stderr)
+        step.metrics = get_step_metrics(started_resource_usage, get_resource_usage())
+        end_marker = f"::>>>::{log_uuid} {step.stage}"
+
+        if buffered:
+            records = _step_log_buffer.records
+            _step_log_buffer.records = None
+
+            handlers = {handler for handler, _record in records}
+            with _step_log_lock:
+                # NOTE block the other threads from logging while writing the buffered logs
+                for handler in handlers:
+                    handler.acquire()
+
+                try:
+                    print(start_marker, file=sys.stderr)
+
+                    for handler, record in records:
+                        handler.handle(record)
+
+                    print(end_marker, file=sys.stderr)
+                finally:
+                    for handler in handlers:
+                        handler.release()
+        else:
+            with _step_log_lock:
+                print(end_marker, file=sys.stderr)
 
 
 def is_localhost(hostname: str, port: int = None) -> bool:
@@ -578,43 +846,104 @@ def get_layer_filename(layer: QgsMapLayer) -> Optional[str]:
     return None
 
 
-def extract_project_details(project: QgsProject) -> dict[str, str]:
-    """Extract project details"""
-    map_settings = QgsMapSettings()
-    details = {}
+def get_package_layer_concurrency() -> int:
+    return max(
+        1, int(os.environ.get("PACKAGE_LAYER_CONCURRENCY", PACKAGE_LAYER_CONCURRENCY))
+    )
 
-    def on_project_read(doc):
-        r, _success = project.readNumEntry("Gui", "/CanvasColorRedPart", 255)
-        g, _success = project.readNumEntry("Gui", "/CanvasColorGreenPart", 255)
-        b, _success = project.readNumEntry("Gui", "/CanvasColorBluePart", 255)
-        background_color = QtGui.QColor(r, g, b)
-        map_settings.setBackgroundColor(background_color)
 
-        details["background_color"] = background_color.name()
+def is_remote_vector_layer(layer: QgsMapLayer) -> bool:
+    """Returns whether the layer is a valid vector layer backed by a remote data source, e.g. PostGIS or WFS."""
+    return (
+        layer.isValid()
+        and layer.type() == QgsMapLayer.VectorLayer
+        and layer.providerType() not in ("memory", "virtual")
+        and get_layer_filename(layer) is None
+    )
 
-        nodes = doc.elementsByTagName("mapcanvas")
 
-        for i in range(nodes.size()):
-            node = nodes.item(i)
-            element = node.toElement()
-            if (
-                element.hasAttribute("name")
-                and element.attribute("name") == "theMapCanvas"
-            ):
-                map_settings.readXml(node)
+def get_remote_layer_extent(
+    provider_key: str, uri: str, transform_context: QgsCoordinateTransformContext
+) -> QgsRectangle:
+    """Returns the extent of the data source, queried through a new data provider.
 
-        map_settings.setRotation(0)
-        map_settings.setOutputSize(QtCore.QSize(1024, 768))
+    NOTE QGIS data providers are not thread safe, the provider is created, used and deleted in the calling thread.
+    """
+    options = QgsDataProvider.ProviderOptions()
+    options.transformContext = transform_context
 
-        details["extent"] = map_settings.extent().asWktPolygon()
+    provider = QgsProviderRegistry.instance().createProvider(provider_key, uri, options)
 
-    project.readProject.connect(on_project_read)
-    project.read(project.fileName())
+    if provider is None or not provider.isValid():
+        raise Exception("Failed to open the data provider.")
 
-    details["crs"] = project.crs().authid()
-    details["project_name"] = project.title()
+    extent = QgsRectangle(provider.extent())
+    del provider
 
-    return details
+    return extent
+
+
+def get_layers_extent(
+    project: QgsProject, layers: list[QgsMapLayer], concurrency: int = 1
+) -> QgsRectangle:
+    """Returns the combined extent of the layers in the project CRS.
+
+    The extents of the remote vector layers are queried concurrently, as they might take a roundtrip to the database server each.
+    The extents of the rest of the layers are read on the main thread meanwhile.
+    The extents are combined in the order of `layers`, so the result does not depend on the timing.
+
+    Args:
+        project (QgsProject): the project of the layers.
+        layers (list[QgsMapLayer]): the layers.
+        concurrency (int): number of the remote layers queried at once. Defaults to 1, i.e. all the layers are read one after the other.
+    """
+    extents: list[QgsRectangle | None] = [None] * len(layers)
+    # the stored extents are used as is, no need to query the data sources
+    is_trusted = bool(project.flags() & Qgis.ProjectFlag.TrustStoredLayerStatistics)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures: dict[int, Future] = {}
+
+        if concurrency > 1 and not is_trusted:
+            for idx, layer in enumerate(layers):
+                if is_remote_vector_layer(layer):
+                    futures[idx] = executor.submit(
+                        get_remote_layer_extent,
+                        layer.providerType(),
+                        layer.source(),
+                        project.transformContext(),
+                    )
+
+        for idx, layer in enumerate(layers):
+            if idx not in futures:
+                extents[idx] = layer.extent()
+
+        for idx, future in futures.items():
+            try:
+                extents[idx] = future.result()
+            except Exception as err:
+                logging.error(
+                    f'Failed to get the extent of layer "{layers[idx].name()}".',
+                    exc_info=err,
+                )
+
+    combined_extent = QgsRectangle()
+    for layer, extent in zip(layers, extents):
+        if extent is None or extent.isNull() or not extent.isFinite():
+            continue
+
+        try:
+            transform = QgsCoordinateTransform(layer.crs(), project.crs(), project)
+            combined_extent.combineExtentWith(transform.transformBoundingBox(extent))
+        except Exception as err:
+            logging.error(
+                "Failed to transform the bbox for layer {} from {} to {} CRS.".format(
+                    layer.name(), layer.crs(), project.crs()
+                ),
+                exc_info=err,
+            )
+
+    return combined_extent
 
 
 def json_default(obj):
@@ -628,9 +957,323 @@ def json_default(obj):
     return f"<non-serializable: {obj_str}>"
 
 
+def run_step(
+    step: Step,
+    step_returns: dict[str, dict[str, Any]],
+    root_workdir: Path,
+    buffered_logs: bool = False,
+) -> dict[str, Any]:
+    """Runs a single workflow step and returns its return values by name.
+
+    The logs of the steps running concurrently should be `buffered_logs`, see `logger_context`.
+    """
+    with logger_context(step, buffered_logs):
+        arguments = {
+            **step.arguments,
+        }
+        for name, value in arguments.items():
+            if isinstance(value, StepOutput):
+                arguments[name] = step_returns[value.step_id][value.return_name]
+            elif isinstance(value, WorkDirPathBase):
+                arguments[name] = value.eval(root_workdir)
+
+        return_values = step.method(**arguments)
+        return_values = (
+            return_values if len(step.return_names) > 1 else (return_values,)
+        )
+
+        return dict(zip(step.return_names, return_values))
+
+
+def encode_checkpoint_value(obj: Any) -> Any:
+    if isinstance(obj, Path):
+        return {"__path__": str(obj)}
+
+    # NOTE the restored value matches what is written in the feedback
+    return json_default(obj)
+
+
+def decode_checkpoint_value(obj: dict[str, Any]) -> Any:
+    if list(obj.keys()) == ["__path__"]:
+        return Path(obj["__path__"])
+
+    return obj
+
+
+def get_step_fingerprints(workflow: Workflow) -> list[str]:
+    """Returns a fingerprint of the inputs of each step.
+
+    The fingerprint covers the step method, its arguments and the fingerprints of the steps it depends on.
+    The content of the project files is not covered, the checkpoint must be discarded when the project files change.
+    Arguments that cannot be represented in a stable way make the fingerprint change on each run, so the step is never restored.
+    """
+    dependencies = workflow.get_dependencies()
+    fingerprints: list[str] = []
+
+    for idx, step in enumerate(workflow.steps):
+        arguments = {}
+        for name, value in step.arguments.items():
+            if isinstance(value, StepOutput):
+                arguments[name] = f"{value.step_id}.{value.return_name}"
+            elif isinstance(value, WorkDirPathBase):
+                arguments[name] = [type(value).__name__, *value.parts]
+            else:
+                arguments[name] = value
+
+        data = json.dumps(
+            {
+                "workflow": [workflow.id, workflow.version],
+                "id": step.id,
+                "method": f"{step.method.__module__}.{step.method.__qualname__}",
+                "arguments": arguments,
+                "dependencies": sorted(fingerprints[d] for d in dependencies[idx]),
+            },
+            sort_keys=True,
+            default=json_default,
+        )
+        fingerprints.append(hashlib.sha256(data.encode()).hexdigest())
+
+    return fingerprints
+
+
+class WorkflowCheckpoint:
+    """The returns of the completed steps and the workdir of a workflow,
+    kept in `checkpoint_dir`.
+
+    When a job is retried with the same checkpoint directory, the steps with
+    unchanged inputs are restored instead of being run again.
+    It is the responsibility of the caller to provide the checkpoint of the
+    same project files only.
+    """
+
+    def __init__(self, checkpoint_dir: Path, workflow: Workflow) -> None:
+        self.workflow = workflow
+        self.workdir = checkpoint_dir.joinpath("workdir")
+        self.filename = checkpoint_dir.joinpath(CHECKPOINT_FILENAME)
+        self.fingerprints = get_step_fingerprints(workflow)
+        # returns of the checkpointed steps by their fingerprint
+        self.step_returns: dict[str, dict[str, Any]] = self._read()
+
+    def _read(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self.filename) as f:
+                return json.load(f, object_hook=decode_checkpoint_value)["steps"]
+        except FileNotFoundError:
+            return {}
+        except Exception as err:
+            logging.warning(
+                f"Failed to read the workflow checkpoint, ignoring it: {err}"
+            )
+            return {}
+
+    def resume(self, step_returns: dict[str, dict[str, Any]]) -> set[int]:
+        """Restores the checkpointed steps into `step_returns` and returns the
+        indices of the steps that should not run.
+
+        A checkpointed step is restored if its fingerprint matches and all the
+        checkpointed steps it depends on are restored too.
+        A step without checkpoint is skipped if its returns are used only by the
+        restored or skipped steps, e.g. opening the project only to package it.
+        The workdir leftovers of the steps that will run again are removed.
+        """
+        steps = self.workflow.steps
+        dependencies = self.workflow.get_dependencies()
+        ancestors: list[set[int]] = []
+        consumers: list[set[int]] = [set() for _step in steps]
+        step_indices: dict[str, int] = {}
+
+        for idx, step in enumerate(steps):
+            step_ancestors = set(dependencies[idx])
+            for dependency_idx in dependencies[idx]:
+                step_ancestors |= ancestors[dependency_idx]
+
+            ancestors.append(step_ancestors)
+
+            for value in step.arguments.values():
+                if isinstance(value, StepOutput):
+                    consumers[step_indices[value.step_id]].add(idx)
+
+            for step_id in step.depends_on:
+                consumers[step_indices[step_id]].add(idx)
+
+            step_indices[step.id] = idx
+
+        restored: set[int] = set()
+        for idx, step in enumerate(steps):
+            if not step.checkpoint or self.fingerprints[idx] not in self.step_returns:
+                continue
+
+            if all(
+                ancestor_idx in restored or not steps[ancestor_idx].checkpoint
+                for ancestor_idx in ancestors[idx]
+            ):
+                restored.add(idx)
+                step.is_restored = True
+                step.stage = 2
+                step_returns[step.id] = self.step_returns[self.fingerprints[idx]]
+
+        skipped: set[int] = set()
+        for idx in reversed(range(len(steps))):
+            step = steps[idx]
+
+            if idx in restored or step.checkpoint or step.outputs or not consumers[idx]:
+                continue
+
+            if consumers[idx] <= restored | skipped:
+                skipped.add(idx)
+                step.is_skipped = True
+
+        if not restored:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+        else:
+            restored_parts = [
+                Path(*value.parts).parts
+                for idx in restored
+                for value in steps[idx].arguments.values()
+                if isinstance(value, WorkDirPathBase)
+            ]
+
+            for idx, step in enumerate(steps):
+                if idx in restored or idx in skipped:
+                    continue
+
+                for value in step.arguments.values():
+                    if not isinstance(value, WorkDirPathBase) or not value.parts:
+                        continue
+
+                    parts = Path(*value.parts).parts
+
+                    # NOTE never remove a restored path, nor a path nested in it
+                    if not any(
+                        p[: len(parts)] == parts or parts[: len(p)] == p
+                        for p in restored_parts
+                    ):
+                        shutil.rmtree(self.workdir.joinpath(*parts), ignore_errors=True)
+
+        self.workdir.mkdir(parents=True, exist_ok=True)
+
+        # NOTE only the restored steps are kept, the rest will be checkpointed again once they finish
+        self.step_returns = {
+            self.fingerprints[idx]: self.step_returns[self.fingerprints[idx]]
+            for idx in restored
+        }
+        self._write()
+
+        return restored | skipped
+
+    def save_step(self, idx: int, returns: dict[str, Any]) -> None:
+        """Stores the returns of the finished step."""
+        self.step_returns[self.fingerprints[idx]] = returns
+        self._write()
+
+    def _write(self) -> None:
+        tmp_filename = self.filename.with_suffix(".tmp")
+
+        with open(tmp_filename, "w") as f:
+            json.dump(
+                {"steps": self.step_returns},
+                f,
+                default=encode_checkpoint_value,
+            )
+
+        # NOTE the job might be killed at any moment, never leave a partially written checkpoint
+        os.replace(tmp_filename, self.filename)
+
+
+def run_workflow_steps(
+    workflow: Workflow,
+    step_returns: dict[str, dict[str, Any]],
+    root_workdir: Path,
+    checkpoint: WorkflowCheckpoint | None = None,
+) -> None:
+    """Runs the workflow steps as soon as their dependencies are finished.
+
+    The thread safe steps run concurrently in a thread pool.
+    The rest of the steps run on the main thread, one after the other, in the order they are defined in the workflow.
+    Once a step fails, no more steps are started. When the already running steps finish,
+    the error of the failed step that comes first in the workflow is raised, so the feedback does not depend on the timing.
+
+    If a `checkpoint` is given, the steps restored from it are not run and the returns of the finished steps are checkpointed.
+
+    The logs of the thread safe steps are written at once when each of them finishes, so they do not interleave.
+
+    NOTE the metrics of the concurrent steps overlap, as the resource usage is measured per process.
+    """
+    dependencies = workflow.get_dependencies()
+    finished: set[int] = set()
+
+    if checkpoint:
+        finished = checkpoint.resume(step_returns)
+
+    pending = [idx for idx in range(len(workflow.steps)) if idx not in finished]
+    errors: dict[int, Exception] = {}
+
+    with ThreadPoolExecutor(WORKFLOW_THREADS) as executor:
+        running: dict[Future, int] = {}
+
+        while pending or running:
+            if not errors:
+                for idx in list(pending):
+                    step = workflow.steps[idx]
+                    if step.thread_safe and dependencies[idx] <= finished:
+                        pending.remove(idx)
+                        future = executor.submit(
+                            run_step, step, step_returns, root_workdir, True
+                        )
+                        running[future] = idx
+
+                main_thread_idx = next(
+                    (idx for idx in pending if not workflow.steps[idx].thread_safe),
+                    None,
+                )
+
+                if (
+                    main_thread_idx is not None
+                    and dependencies[main_thread_idx] <= finished
+                ):
+                    pending.remove(main_thread_idx)
+                    step = workflow.steps[main_thread_idx]
+
+                    try:
+                        step_returns[step.id] = run_step(
+                            step, step_returns, root_workdir
+                        )
+                        finished.add(main_thread_idx)
+                    except Exception as err:
+                        errors[main_thread_idx] = err
+                    else:
+                        if checkpoint and step.checkpoint:
+                            checkpoint.save_step(main_thread_idx, step_returns[step.id])
+
+                    continue
+
+            if not running:
+                break
+
+            done, _not_done = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                idx = running.pop(future)
+
+                step = workflow.steps[idx]
+
+                try:
+                    step_returns[step.id] = future.result()
+                    finished.add(idx)
+                except Exception as err:
+                    errors[idx] = err
+                else:
+                    if checkpoint and step.checkpoint:
+                        checkpoint.save_step(idx, step_returns[step.id])
+
+    if errors:
+        raise errors[min(errors)]
+
+
 def run_workflow(
     workflow: Workflow,
     feedback_filename: Optional[Path | IO],
+    checkpoint_dir: Path | None = None,
 ) -> dict[str, Any]:
     """Executes the steps required to run a task and return structured feedback from the execution
 
@@ -639,10 +1282,12 @@ def run_workflow(
     Method may return values, as defined in `return_values`.
     Some return values can used as task output, as defined in `output_names`.
     Some return values can used as arguments for next steps, as defined in `public_returns`.
+    Independent steps may run concurrently, see `run_workflow_steps`.
 
     Args:
         workflow (Workflow): workflow to be executed
         feedback_filename (IO | Path): write feedback to an IO device, to Path filename, or don't write it
+        checkpoint_dir (Path | None): directory to checkpoint the workdir and the step returns to, so a retried job can resume. Defaults to None.
     """
     feedback: dict[str, Any] = {
         "feedback_version": "2.0",
@@ -654,27 +1299,15 @@ def run_workflow(
     step_returns = {}
 
     try:
-        root_workdir = Path(tempfile.mkdtemp())
-        for step in workflow.steps:
-            with logger_context(step):
-                arguments = {
-                    **step.arguments,
-                }
-                for name, value in arguments.items():
-                    if isinstance(value, StepOutput):
-                        arguments[name] = step_returns[value.step_id][value.return_name]
-                    elif isinstance(value, WorkDirPathBase):
-                        arguments[name] = value.eval(root_workdir)
-
-                return_values = step.method(**arguments)
-                return_values = (
-                    return_values if len(step.return_names) > 1 else (return_values,)
-                )
+        checkpoint = None
 
-                step_returns[step.id] = {}
-                for name, value in zip(step.return_names, return_values):
-                    step_returns[step.id][name] = value
+        if checkpoint_dir:
+            checkpoint = WorkflowCheckpoint(checkpoint_dir, workflow)
+            root_workdir = checkpoint.workdir
+        else:
+            root_workdir = Path(tempfile.mkdtemp())
 
+        run_workflow_steps(workflow, step_returns, root_workdir, checkpoint)
     except Exception as err:
         feedback["error"] = str(err)
 
@@ -706,12 +1339,19 @@ def run_workflow(
     finally:
         feedback["steps"] = []
         feedback["outputs"] = {}
+        # the steps restored from the checkpoint of a previous run of the job, if any
+        feedback["resumed_from_steps"] = [
+            step.id for step in workflow.steps if step.is_restored
+        ]
 
         for step in workflow.steps:
             step_feedback = {
                 "id": step.id,
                 "name": step.name,
                 "stage": step.stage,
+                "metrics": step.metrics,
+                "is_restored": step.is_restored,
+                "is_skipped": step.is_skipped,
                 "returns": {},
             }
 
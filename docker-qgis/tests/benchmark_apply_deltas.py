@@ -0,0 +1,143 @@
+"""Benchmark applying the deltas one by one against applying them in batched edit sessions and within a transaction.
+
+Generates a GeoPackage layer and a delta file patching each of its features, then applies the deltas with and without `batched`, and with `transaction`.
+Needs to be run within the QGIS worker image.
+
+Usage:
+    python tests/benchmark_apply_deltas.py --deltas 100 1000 10000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qfc_worker.apply_deltas import (  # noqa: E402
+    DeltaFile,
+    DeltaStatus,
+    apply_deltas_with_transaction,
+    apply_deltas_without_transaction,
+    delta_log,
+)
+from qfc_worker.utils import start_app, stop_app  # noqa: E402
+from qgis.core import (  # noqa: E402
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsProject,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+LAYER_NAME = "points"
+
+
+def write_geopackage(filename: Path, features_count: int) -> None:
+    memory_layer = QgsVectorLayer(
+        "Point?crs=EPSG:4326&field=fid:integer&field=int:integer", LAYER_NAME, "memory"
+    )
+
+    features = []
+    for idx in range(1, features_count + 1):
+        feature = QgsFeature(memory_layer.fields())
+        feature.setAttributes([idx, idx])
+        feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(idx % 360 - 180, 0)))
+        features.append(feature)
+
+    memory_layer.dataProvider().addFeatures(features)
+
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = LAYER_NAME
+
+    error, error_msg, _filename, _layer_name = (
+        QgsVectorFileWriter.writeAsVectorFormatV3(
+            memory_layer, str(filename), QgsCoordinateTransformContext(), options
+        )
+    )
+
+    assert error == QgsVectorFileWriter.NoError, error_msg
+
+
+def create_delta_file(layer_id: str, deltas_count: int) -> DeltaFile:
+    deltas = [
+        {
+            "uuid": str(uuid.uuid4()),
+            "clientId": "benchmark",
+            "localPk": str(idx),
+            "sourcePk": str(idx),
+            "localLayerId": layer_id,
+            "sourceLayerId": layer_id,
+            "method": "patch",
+            "new": {"attributes": {"int": -idx}},
+            "old": {"attributes": {"int": idx}},
+        }
+        for idx in range(1, deltas_count + 1)
+    ]
+
+    return DeltaFile(str(uuid.uuid4()), "benchmark", "1.0", deltas, [], {})
+
+
+def measure(deltas_count: int, batched: bool, transaction: bool = False) -> float:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        gpkg_filename = Path(tmp_dir, "data.gpkg")
+        write_geopackage(gpkg_filename, deltas_count)
+
+        project = QgsProject()
+        layer = QgsVectorLayer(
+            f"{gpkg_filename}|layername={LAYER_NAME}", LAYER_NAME, "ogr"
+        )
+        assert layer.isValid()
+        project.addMapLayer(layer)
+
+        delta_file = create_delta_file(layer.id(), deltas_count)
+        del delta_log[:]
+
+        if transaction:
+            apply_deltas = apply_deltas_with_transaction
+        else:
+            apply_deltas = apply_deltas_without_transaction
+
+        started_at = time.perf_counter()
+        all_applied = apply_deltas(project, delta_file, batched=batched)
+        duration_s = time.perf_counter() - started_at
+
+        assert all_applied
+        assert all(log["status"] == DeltaStatus.Applied for log in delta_log)
+        assert sorted(feature["int"] for feature in layer.getFeatures()) == list(
+            range(-deltas_count, 0)
+        )
+
+        project.clear()
+
+    return duration_s
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, nargs="+", default=[100, 1000, 10_000])
+    args = parser.parse_args()
+
+    start_app()
+
+    print(f"{'deltas':>8}{'one by one s':>14}{'batched s':>12}{'transaction s':>15}")
+
+    for deltas_count in args.deltas:
+        one_by_one_s = measure(deltas_count, batched=False)
+        batched_s = measure(deltas_count, batched=True)
+        transaction_s = measure(deltas_count, batched=True, transaction=True)
+
+        print(
+            f"{deltas_count:>8}{one_by_one_s:>14.2f}{batched_s:>12.2f}{transaction_s:>15.2f}"
+        )
+
+    stop_app()
+
+
+if __name__ == "__main__":
+    main()
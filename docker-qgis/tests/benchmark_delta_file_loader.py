@@ -0,0 +1,109 @@
+"""Benchmark loading a delta file in JSON format against loading it in JSON Lines format.
+
+Generates delta files with many deltas carrying large WKT geometries.
+Needs to be run within the QGIS worker image.
+
+Usage:
+    python tests/benchmark_delta_file_loader.py --deltas 10000 50000 --vertices 1000
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qfc_worker.apply_deltas import load_delta_file  # noqa: E402
+
+
+def create_deltas(deltas_count: int, vertices_count: int) -> tuple[dict, list[dict]]:
+    header = {
+        "files": [],
+        "id": str(uuid.uuid4()),
+        "project": str(uuid.uuid4()),
+        "version": "1.0",
+        "clientPks": {},
+    }
+    client_id = str(uuid.uuid4())
+    wkt = "LINESTRING ({})".format(
+        ", ".join(f"{idx}.123456 {idx}.654321" for idx in range(vertices_count))
+    )
+    deltas = [
+        {
+            "uuid": str(uuid.uuid4()),
+            "clientId": client_id,
+            "localPk": str(idx),
+            "sourcePk": str(idx),
+            "localLayerId": "lines",
+            "sourceLayerId": "lines",
+            "method": "patch",
+            "new": {"geometry": wkt},
+            "old": {"geometry": wkt},
+        }
+        for idx in range(deltas_count)
+    ]
+
+    return header, deltas
+
+
+def measure(filename: Path) -> tuple[float, float]:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+
+    delta_file = load_delta_file({"delta_file": str(filename)})  # type: ignore
+
+    duration_s = time.perf_counter() - started_at
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert delta_file.deltas
+
+    return duration_s, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--vertices", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(
+        f"{'deltas':>8}{'MB':>8}{'json s':>10}{'json MB':>10}{'jsonl s':>10}{'jsonl MB':>10}"
+    )
+
+    for deltas_count in args.deltas:
+        header, deltas = create_deltas(deltas_count, args.vertices)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_filename = Path(tmp_dir, "deltafile.json")
+            jsonl_filename = Path(tmp_dir, "deltafile.jsonl")
+
+            with open(json_filename, "w") as f:
+                json.dump({**header, "deltas": deltas}, f)
+
+            with open(jsonl_filename, "w") as f:
+                f.write(json.dumps(header))
+                f.write("\n")
+
+                for delta in deltas:
+                    f.write(json.dumps(delta))
+                    f.write("\n")
+
+            del deltas
+
+            json_s, json_mb = measure(json_filename)
+            jsonl_s, jsonl_mb = measure(jsonl_filename)
+
+            size_mb = json_filename.stat().st_size / 1024 / 1024
+            print(
+                f"{deltas_count:>8}{size_mb:>8.1f}{json_s:>10.2f}{json_mb:>10.1f}{jsonl_s:>10.2f}{jsonl_mb:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark looking up the features targeted by the deltas one by one against prefetching them with `FeatureCache`.
+
+Generates a Shapefile layer, which has no index on the primary key, and patch deltas targeting random features of it.
+The lookups one by one are timed on a sample of the deltas only, as each of them is a full scan of the layer.
+Needs to be run within the QGIS worker image.
+
+Usage:
+    python tests/benchmark_feature_lookup.py --features 1000000 --deltas 10000 --sample 50
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qfc_worker.apply_deltas import DeltaFile, FeatureCache, get_feature  # noqa: E402
+from qfc_worker.utils import start_app, stop_app  # noqa: E402
+from qgis.core import (  # noqa: E402
+    QgsCoordinateTransformContext,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+)
+
+LAYER_NAME = "points"
+
+
+def write_shapefile(filename: Path, features_count: int) -> None:
+    memory_layer = QgsVectorLayer(
+        "Point?crs=EPSG:4326&field=fid:integer&field=int:integer", LAYER_NAME, "memory"
+    )
+
+    features = []
+    for idx in range(1, features_count + 1):
+        feature = QgsFeature(memory_layer.fields())
+        feature.setAttributes([idx, idx])
+        feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(idx % 360 - 180, 0)))
+        features.append(feature)
+
+    memory_layer.dataProvider().addFeatures(features)
+
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "ESRI Shapefile"
+
+    error, error_msg, _filename, _layer_name = (
+        QgsVectorFileWriter.writeAsVectorFormatV3(
+            memory_layer, str(filename), QgsCoordinateTransformContext(), options
+        )
+    )
+
+    assert error == QgsVectorFileWriter.NoError, error_msg
+
+
+def create_delta_file(layer_id: str, pks: list[int]) -> DeltaFile:
+    deltas = [
+        {
+            "uuid": str(uuid.uuid4()),
+            "clientId": "benchmark",
+            "localPk": str(pk),
+            "sourcePk": str(pk),
+            "localLayerId": layer_id,
+            "sourceLayerId": layer_id,
+            "method": "patch",
+            "new": {"attributes": {"int": -pk}},
+            "old": {"attributes": {"int": pk}},
+        }
+        for pk in pks
+    ]
+
+    return DeltaFile(str(uuid.uuid4()), "benchmark", "1.0", deltas, [], {})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--features", type=int, default=1_000_000)
+    parser.add_argument("--deltas", type=int, default=10_000)
+    parser.add_argument("--sample", type=int, default=50)
+    args = parser.parse_args()
+
+    start_app()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        shp_filename = Path(tmp_dir, f"{LAYER_NAME}.shp")
+        write_shapefile(shp_filename, args.features)
+
+        layer = QgsVectorLayer(str(shp_filename), LAYER_NAME, "ogr")
+        assert layer.isValid()
+
+        pks = random.sample(range(1, args.features + 1), args.deltas)
+        delta_file = create_delta_file(layer.id(), pks)
+
+        started_at = time.perf_counter()
+        for delta in delta_file.deltas[: args.sample]:
+            feature = get_feature(layer, delta, delta_file.client_pks)
+            assert feature["int"] == int(delta["sourcePk"])
+
+        one_by_one_s = (time.perf_counter() - started_at) / args.sample * args.deltas
+
+        feature_cache = FeatureCache(delta_file)
+
+        started_at = time.perf_counter()
+        for delta in delta_file.deltas:
+            feature = get_feature(layer, delta, delta_file.client_pks, feature_cache)
+            assert feature["int"] == int(delta["sourcePk"])
+
+        prefetched_s = time.perf_counter() - started_at
+
+    print(f"{'features':>10}{'deltas':>8}{'one by one s':>14}{'prefetched s':>14}")
+    print(
+        f"{args.features:>10}{args.deltas:>8}{one_by_one_s:>14.2f}{prefetched_s:>14.2f}"
+    )
+    print(f"(one by one extrapolated from {args.sample} lookups)")
+
+    stop_app()
+
+
+if __name__ == "__main__":
+    main()
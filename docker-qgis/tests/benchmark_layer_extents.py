@@ -0,0 +1,110 @@
+"""Benchmark the serial and the concurrent extent calculation of the project layers when packaging.
+
+Creates a PostGIS table and a view per layer, each view waits `--latency-ms` before returning, as a remote database server would.
+Needs to be run within the QGIS worker image, with a PostGIS database reachable with the given connection string.
+
+Usage:
+    python tests/benchmark_layer_extents.py --dsn "host=db dbname=qfieldcloud_db user=qfieldcloud_db_admin password=..." --layers 40 --latency-ms 200
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qfc_worker.utils import get_layers_extent, start_app, stop_app  # noqa: E402
+from qgis.core import (  # noqa: E402
+    QgsCoordinateReferenceSystem,
+    QgsProject,
+    QgsProviderRegistry,
+    QgsVectorLayer,
+)
+
+SCHEMA = "qfc_benchmark_layer_extents"
+
+
+def create_views(dsn: str, layers_count: int, latency_ms: int) -> None:
+    connection = (
+        QgsProviderRegistry.instance()
+        .providerMetadata("postgres")
+        .createConnection(dsn, {})
+    )
+
+    connection.executeSql(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    connection.executeSql(f"CREATE SCHEMA {SCHEMA}")
+    connection.executeSql(
+        f"""
+        CREATE TABLE {SCHEMA}.points AS
+        SELECT
+            id,
+            id % {layers_count} AS layer_idx,
+            ST_SetSRID(ST_MakePoint(random() * 360 - 180, random() * 180 - 90), 4326)::geometry(Point, 4326) AS geom
+        FROM generate_series(1, {layers_count * 1000}) AS id
+        """
+    )
+
+    for idx in range(layers_count):
+        # NOTE the uncorrelated subquery runs once per query, like a network roundtrip
+        connection.executeSql(
+            f"""
+            CREATE VIEW {SCHEMA}.layer_{idx} AS
+            SELECT * FROM {SCHEMA}.points
+            WHERE layer_idx = {idx} AND (SELECT pg_sleep({latency_ms / 1000})) IS NOT NULL
+            """
+        )
+
+
+def create_layers(dsn: str, layers_count: int) -> list[QgsVectorLayer]:
+    layers = []
+    for idx in range(layers_count):
+        layer = QgsVectorLayer(
+            f"{dsn} key='id' srid=4326 type=Point checkPrimaryKeyUnicity='0' table=\"{SCHEMA}\".\"layer_{idx}\" (geom)",
+            f"layer_{idx}",
+            "postgres",
+        )
+
+        assert layer.isValid(), f"layer_{idx}"
+
+        layers.append(layer)
+
+    return layers
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dsn", required=True)
+    parser.add_argument("--layers", type=int, default=40)
+    parser.add_argument("--latency-ms", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 4, 1])
+    args = parser.parse_args()
+
+    start_app()
+    create_views(args.dsn, args.layers, args.latency_ms)
+
+    print(f"{'concurrency':>12}{'extent s':>12}")
+
+    extents = []
+    for concurrency in args.concurrency:
+        project = QgsProject()
+        project.setCrs(QgsCoordinateReferenceSystem("EPSG:3857"))
+
+        # NOTE fresh layers each time, so no extent is cached by the data providers
+        layers = create_layers(args.dsn, args.layers)
+        project.addMapLayers(layers)
+
+        started_at = time.perf_counter()
+        extent = get_layers_extent(project, layers, concurrency)
+        duration_s = time.perf_counter() - started_at
+
+        extents.append(extent.toString())
+        print(f"{concurrency:>12}{duration_s:>12.2f}")
+
+    assert len(set(extents)) == 1, extents
+
+    stop_app()
+
+
+if __name__ == "__main__":
+    main()
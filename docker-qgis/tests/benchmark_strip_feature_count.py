@@ -0,0 +1,156 @@
+"""Benchmark the streaming `strip_feature_count_from_project_xml` against the former `ElementTree` implementation.
+
+Generates synthetic QGIS projects with many layers and large embedded styles.
+
+Usage:
+    python tests/benchmark_strip_feature_count.py --layers 1000 5000 --style-size 20000
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qfc_worker.project_xml import strip_feature_count_from_project_xml  # noqa: E402
+
+
+def strip_feature_count_with_element_tree(the_qgis_file_name: str) -> None:
+    """The former implementation, without the `.qgz` handling."""
+    tree = ET.parse(the_qgis_file_name)
+    root = tree.getroot()
+
+    for node in root.findall(".//legendlayer"):
+        node.set("showFeatureCount", "0")
+
+    for node in root.findall(
+        './/layer-tree-layer/customproperties/Option[@type="Map"]/Option[@name="showFeatureCount"]'
+    ):
+        node.set("value", "0")
+
+    tree.write(the_qgis_file_name, short_empty_elements=False)
+
+
+def write_project(
+    filename: Path, layers_count: int, style_size: int, show_feature_count: bool
+) -> None:
+    feature_count = "1" if show_feature_count else "0"
+    style = "x" * style_size
+
+    with open(filename, "w") as f:
+        f.write("<!DOCTYPE qgis PUBLIC 'http://mrcc.com/qgis.dtd' 'SYSTEM'>\n")
+        f.write('<qgis projectname="benchmark" version="3.34.0">\n')
+        f.write("  <layer-tree-group>\n")
+        for i in range(layers_count):
+            f.write(
+                f'    <layer-tree-layer id="layer_{i}" name="Layer {i}" checked="Qt::Checked">\n'
+                "      <customproperties>\n"
+                '        <Option type="Map">\n'
+                f'          <Option type="QString" name="showFeatureCount" value="{feature_count}"/>\n'
+                "        </Option>\n"
+                "      </customproperties>\n"
+                "    </layer-tree-layer>\n"
+            )
+
+        f.write("  </layer-tree-group>\n")
+        f.write("  <projectlayers>\n")
+        for i in range(layers_count):
+            f.write(
+                f'    <maplayer type="vector"><id>layer_{i}</id><renderer-v2><![CDATA[{style}]]></renderer-v2></maplayer>\n'
+            )
+
+        f.write("  </projectlayers>\n")
+        f.write("  <legend>\n")
+        for i in range(layers_count):
+            f.write(
+                f'    <legendlayer name="Layer {i}" showFeatureCount="{feature_count}" open="true"/>\n'
+            )
+
+        f.write("  </legend>\n")
+        f.write("</qgis>\n")
+
+
+def get_feature_count_values(the_qgis_file_name: str) -> list[str]:
+    root = ET.parse(the_qgis_file_name).getroot()
+
+    return [node.get("showFeatureCount") for node in root.findall(".//legendlayer")] + [
+        node.get("value")
+        for node in root.findall(
+            './/layer-tree-layer/customproperties/Option[@type="Map"]/Option[@name="showFeatureCount"]'
+        )
+    ]
+
+
+def measure(func, filename: Path) -> tuple[float, float]:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+
+    func(str(filename))
+
+    duration_s = time.perf_counter() - started_at
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return duration_s, peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--layers", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--style-size", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'layers':>8}{'counts':>8}{'MB':>8}{'etree s':>10}{'etree MB':>10}{'stream s':>10}{'stream MB':>10}{'qgz s':>10}"
+    )
+
+    for layers_count in args.layers:
+        for show_feature_count in (True, False):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                original = Path(tmp_dir, "original.qgs")
+                write_project(
+                    original, layers_count, args.style_size, show_feature_count
+                )
+
+                etree_file = Path(tmp_dir, "etree.qgs")
+                stream_file = Path(tmp_dir, "stream.qgs")
+                shutil.copy(original, etree_file)
+                shutil.copy(original, stream_file)
+
+                etree_s, etree_mb = measure(
+                    strip_feature_count_with_element_tree, etree_file
+                )
+                stream_s, stream_mb = measure(
+                    strip_feature_count_from_project_xml, stream_file
+                )
+
+                assert set(get_feature_count_values(str(stream_file))) == {"0"}
+
+                qgz_file = Path(tmp_dir, "project.qgz")
+                with zipfile.ZipFile(qgz_file, "w", zipfile.ZIP_DEFLATED) as archive:
+                    archive.write(original, "project.qgs")
+
+                qgz_s, _qgz_mb = measure(strip_feature_count_from_project_xml, qgz_file)
+
+                with zipfile.ZipFile(qgz_file) as archive:
+                    archive.extract("project.qgs", Path(tmp_dir, "extracted"))
+
+                assert (
+                    Path(tmp_dir, "extracted", "project.qgs").read_bytes()
+                    == stream_file.read_bytes()
+                )
+
+                size_mb = original.stat().st_size / 1024 / 1024
+                print(
+                    f"{layers_count:>8}{str(show_feature_count):>8}{size_mb:>8.1f}{etree_s:>10.2f}{etree_mb:>10.1f}{stream_s:>10.2f}{stream_mb:>10.1f}{qgz_s:>10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
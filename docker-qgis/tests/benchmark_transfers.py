@@ -0,0 +1,159 @@
+"""Benchmark the serial SDK file transfers against the parallel `FileTransfers`.
+
+Runs against a local stand-in of the QFieldCloud files API, which adds a fixed latency to each request.
+
+Usage:
+    python tests/benchmark_transfers.py --files 200 --file-size 100000 --large-file-size 268435456 --latency-ms 50
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from qfc_worker.transfers import FileTransfers  # noqa: E402
+from qfieldcloud_sdk import sdk  # noqa: E402
+
+PROJECT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def create_handler(files: dict[str, bytes], latency_s: float):
+    class FilesApiHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status: int, body: bytes, headers: dict = {}) -> None:
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency_s)
+
+            path = self.path.split("?")[0].strip("/")
+            name = path.removeprefix(f"api/v1/files/{PROJECT_ID}").strip("/")
+
+            if not name:
+                body = json.dumps(
+                    [
+                        {
+                            "name": name,
+                            "size": len(content),
+                            "md5sum": "",
+                            "is_attachment": False,
+                        }
+                        for name, content in files.items()
+                    ]
+                ).encode()
+                self.send_body(200, body, {"Content-Type": "application/json"})
+                return
+
+            content = files[name]
+            range_match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+
+            if range_match:
+                start, end = int(range_match[1]), int(range_match[2])
+                self.send_body(
+                    206,
+                    content[start : end + 1],
+                    {"Content-Range": f"bytes {start}-{end}/{len(content)}"},
+                )
+            else:
+                self.send_body(200, content)
+
+        def do_POST(self):
+            time.sleep(latency_s)
+
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_body(201, b"{}", {"Content-Type": "application/json"})
+
+    return FilesApiHandler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size", type=int, default=100_000)
+    parser.add_argument("--large-file-size", type=int, default=256 * 1024 * 1024)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    files = {f"tiles/{i}.png": os.urandom(args.file_size) for i in range(args.files)}
+
+    if args.large_file_size:
+        files["data.gpkg"] = os.urandom(args.large_file_size)
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), create_handler(files, args.latency_ms / 1000)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["QFIELDCLOUD_URL"] = f"http://127.0.0.1:{server.server_port}/api/v1/"
+    os.environ["QFIELDCLOUD_TOKEN"] = "benchmark"
+
+    client = sdk.Client()
+    remote_files = client.list_remote_files(PROJECT_ID)
+
+    print(f"{'':<24}{'serial s':>12}{'parallel s':>12}")
+
+    with tempfile.TemporaryDirectory() as serial_dir:
+        started_at = time.perf_counter()
+        client.download_files(
+            remote_files,
+            PROJECT_ID,
+            sdk.FileTransferType.PROJECT,
+            serial_dir,
+            throw_on_error=True,
+        )
+        serial_s = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        client.upload_files(
+            PROJECT_ID,
+            sdk.FileTransferType.PROJECT,
+            serial_dir,
+            filter_glob="*",
+            throw_on_error=True,
+            force=True,
+        )
+        serial_upload_s = time.perf_counter() - started_at
+
+    with tempfile.TemporaryDirectory() as parallel_dir:
+        transfers = FileTransfers(args.concurrency)
+
+        started_at = time.perf_counter()
+        transfers.download_files(remote_files, PROJECT_ID, Path(parallel_dir))
+        parallel_s = time.perf_counter() - started_at
+
+        for name, content in files.items():
+            assert Path(parallel_dir, name).read_bytes() == content, name
+
+        started_at = time.perf_counter()
+        transfers.upload_files(
+            PROJECT_ID, sdk.FileTransferType.PROJECT, Path(parallel_dir), force=True
+        )
+        parallel_upload_s = time.perf_counter() - started_at
+
+    print(f"{'download':<24}{serial_s:>12.2f}{parallel_s:>12.2f}")
+    print(f"{'upload':<24}{serial_upload_s:>12.2f}{parallel_upload_s:>12.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
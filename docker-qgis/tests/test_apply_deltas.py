@@ -0,0 +1,242 @@
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from qfc_worker import apply_deltas
+from qfc_worker.apply_deltas import (
+    DeltaFile,
+    DeltaStatus,
+    apply_deltas_without_transaction,
+    delta_log,
+    get_delta_batches,
+    load_delta_file,
+)
+from qfc_worker.utils import start_app
+from qgis.core import QgsProject, QgsVectorLayer
+
+TESTDATA_PATH = Path(__file__).parent.joinpath("testdata", "project2apply")
+LAYER_ID = "points_xy_897d5ed7_b810_4624_abe3_9f7c0a93d6a1"
+
+
+def get_delta(
+    pk: int,
+    method: str = "patch",
+    layer_id: str = LAYER_ID,
+    new: dict | None = None,
+    old: dict | None = None,
+) -> dict:
+    return {
+        "uuid": f"00000000-0000-0000-0000-{pk:012}",
+        "localPk": str(pk),
+        "sourcePk": str(pk),
+        "localLayerId": layer_id,
+        "sourceLayerId": layer_id,
+        "method": method,
+        "new": new or {},
+        "old": old or {},
+    }
+
+
+def get_delta_file(deltas: list[dict]) -> DeltaFile:
+    return DeltaFile(
+        "00000000-0000-0000-0000-000000000000",
+        "00000000-0000-0000-0000-000000000000",
+        "1.0",
+        deltas,
+        [],
+        {},
+    )
+
+
+class GetDeltaBatchesTestCase(unittest.TestCase):
+    def test_consecutive_deltas_of_same_layer(self):
+        deltas = [
+            get_delta(1, layer_id="a"),
+            get_delta(2, layer_id="a"),
+            get_delta(3, layer_id="b"),
+            get_delta(4, layer_id="a"),
+        ]
+
+        self.assertEqual(get_delta_batches(deltas, False), [[0, 1], [2], [3]])
+
+    def test_create_followed_by_create_only(self):
+        deltas = [
+            get_delta(1, "patch"),
+            get_delta(2, "create"),
+            get_delta(3, "create"),
+            get_delta(4, "patch"),
+            get_delta(5, "delete"),
+        ]
+
+        # the patch might refer to the primary key assigned on the commit of the creates
+        self.assertEqual(get_delta_batches(deltas, False), [[0, 1, 2], [3, 4]])
+
+    def test_max_size(self):
+        deltas = [get_delta(pk) for pk in range(5)]
+
+        with mock.patch.object(apply_deltas, "DELTA_BATCH_MAX_SIZE", 2):
+            self.assertEqual(get_delta_batches(deltas, False), [[0, 1], [2, 3], [4]])
+
+
+class DeltaFileJsonlLoaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.header = {
+            "id": "00000000-0000-0000-0000-000000000000",
+            "project": "00000000-0000-0000-0000-000000000000",
+            "version": "1.0",
+            "files": [],
+        }
+        self.delta = get_delta(
+            1, new={"attributes": {"int": 666}}, old={"attributes": {"int": 1}}
+        )
+
+    def load(self, *lines: str) -> DeltaFile:
+        filename = Path(self.tempdir.name).joinpath("deltafile.jsonl")
+        filename.write_text("\n".join(lines))
+
+        return load_delta_file({"delta_file": str(filename)})  # type: ignore
+
+    def test_load(self):
+        delta_file = load_delta_file(
+            {  # type: ignore
+                "delta_file": str(
+                    TESTDATA_PATH.joinpath("deltas", "singlelayer_multidelta.jsonl")
+                )
+            }
+        )
+
+        self.assertEqual(delta_file.id, "b7c17bc6-e5af-4fa7-b905-4b395729d782")
+        self.assertEqual(delta_file.client_pks, {})
+        self.assertEqual(len(delta_file.deltas), 3)
+
+    def test_malformed_line(self):
+        with self.assertRaisesRegex(Exception, "^Invalid JSON on line 3 "):
+            self.load(json.dumps(self.header), json.dumps(self.delta), "{")
+
+    def test_invalid_delta(self):
+        del self.delta["method"]
+
+        with self.assertRaisesRegex(Exception, "^Invalid delta on line 2 "):
+            self.load(json.dumps(self.header), json.dumps(self.delta))
+
+    def test_missing_header(self):
+        with self.assertRaisesRegex(Exception, "^Invalid header on line 1 "):
+            self.load(json.dumps(self.delta), json.dumps(self.delta))
+
+    def test_invalid_header(self):
+        del self.header["version"]
+
+        with self.assertRaisesRegex(Exception, "^Invalid header on line 1 "):
+            self.load(json.dumps(self.header), json.dumps(self.delta))
+
+    def test_empty_file(self):
+        with self.assertRaisesRegex(Exception, "^Empty delta file!$"):
+            self.load("", "")
+
+
+class ApplyDeltaBatchTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        start_app()
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.project_path = Path(self.tempdir.name).joinpath("project")
+        shutil.copytree(TESTDATA_PATH, self.project_path)
+
+        del delta_log[:]
+        self.addCleanup(delta_log.clear)
+
+        self.project = QgsProject()
+        self.project.read(str(self.project_path.joinpath("project.qgs")))
+        self.addCleanup(self.project.clear)
+
+        self.geometry_before = self.get_feature(2).geometry().asWkt()
+        self.delta_file = get_delta_file(
+            [
+                get_delta(
+                    1,
+                    new={"geometry": "POINT (666 0)"},
+                    old={"geometry": "POINT (1 0)"},
+                ),
+                # the geometry is changed, then the delta fails on the missing attribute
+                get_delta(
+                    2,
+                    new={"geometry": "POINT (777 0)", "attributes": {"missing": 1}},
+                    old={"geometry": "POINT (2 0)", "attributes": {"missing": None}},
+                ),
+                get_delta(
+                    3,
+                    new={"attributes": {"int": 666}},
+                    old={"attributes": {"int": 3}},
+                ),
+            ]
+        )
+
+    def get_feature(self, pk: int):
+        # NOTE a new layer, so the feature is read from the data source
+        layer = QgsVectorLayer(
+            f"{self.project_path.joinpath('testdata.gpkg')}|layername=points",
+            "points",
+            "ogr",
+        )
+
+        return layer.getFeature(pk)
+
+    def assert_applied(self):
+        self.assertEqual(
+            [(log["delta_index"], log["status"]) for log in delta_log],
+            [
+                (0, DeltaStatus.Applied),
+                (1, DeltaStatus.ApplyFailed),
+                (2, DeltaStatus.Applied),
+            ],
+        )
+        self.assertEqual(self.get_feature(1).geometry().asWkt(), "Point (666 0)")
+        # the changes of the failed delta are reverted, the changes of the other deltas in the batch are not
+        self.assertEqual(self.get_feature(2).geometry().asWkt(), self.geometry_before)
+        self.assertEqual(self.get_feature(3).attribute("int"), 666)
+
+    def test_failed_delta_reverted(self):
+        with mock.patch.object(
+            apply_deltas, "apply_delta", wraps=apply_deltas.apply_delta
+        ) as apply_delta_mock:
+            is_applied = apply_deltas_without_transaction(
+                self.project, self.delta_file, batched=True
+            )
+
+        self.assertFalse(is_applied)
+        # all the deltas are applied in a single batch
+        apply_delta_mock.assert_not_called()
+        self.assert_applied()
+
+    def test_commit_failure_applies_one_by_one(self):
+        commit_changes = QgsVectorLayer.commitChanges
+        committed_layer_ids = []
+
+        def _commit_changes(layer, *args, **kwargs):
+            committed_layer_ids.append(layer.id())
+
+            # the commit of the batch fails, the commits of the single deltas do not
+            if len(committed_layer_ids) == 1:
+                return False
+
+            return commit_changes(layer, *args, **kwargs)
+
+        with mock.patch.object(QgsVectorLayer, "commitChanges", _commit_changes):
+            is_applied = apply_deltas_without_transaction(
+                self.project, self.delta_file, batched=True
+            )
+
+        self.assertFalse(is_applied)
+        # the batch, then each of the deltas applied within the batch
+        self.assertEqual(committed_layer_ids, [LAYER_ID] * 3)
+        self.assert_applied()
@@ -3,10 +3,27 @@
 DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" >/dev/null 2>&1 && pwd )"
 
 echo "BEGIN TESTS"
-$DIR/../apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_singledelta.json
-$DIR/../apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_singledelta.json
-$DIR/../apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.json
-$DIR/../apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.json
-$DIR/../apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/multilayer_multidelta.json
-$DIR/../apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/multilayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_singledelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_singledelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/multilayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/multilayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply --batched $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply --batched --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.json
+# the deltas on a layer without a primary key are reported as failed one by one, instead of failing the whole batch
+$DIR/../qfc_worker/apply_deltas.py delta apply --batched --delta-log /tmp/delta_log_nopk.json $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta_nopk.json
+test "$(grep -c '"status": "status_apply_failed"' /tmp/delta_log_nopk.json)" -eq 3
+# the deltas through two layers on the same table must not see the features prefetched before the other layer modified them
+for args in "" "--batched"; do
+    TMP_DIR=$(mktemp -d)
+    cp -r $DIR/testdata/project2apply/. $TMP_DIR
+    $DIR/../qfc_worker/apply_deltas.py delta apply $args --delta-log $TMP_DIR/delta_log.json $TMP_DIR/project.qgs $TMP_DIR/deltas/multilayer_samesource.json
+    test "$(grep -c '"status": "status_applied"' $TMP_DIR/delta_log.json)" -eq 3
+    rm -rf $TMP_DIR
+done
+$DIR/../qfc_worker/apply_deltas.py delta apply --transaction $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/multilayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply --transaction --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/multilayer_multidelta.json
+$DIR/../qfc_worker/apply_deltas.py delta apply $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.jsonl
+$DIR/../qfc_worker/apply_deltas.py delta apply --inverse $DIR/testdata/project2apply/project.qgs $DIR/testdata/project2apply/deltas/singlelayer_multidelta.jsonl
 echo "END TESTS"
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from qfc_worker.file_cache import FileCache
+from qfieldcloud_sdk.utils import calc_etag
+
+
+class FileCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.root = Path(self.tempdir.name)
+        self.cache = FileCache(self.root.joinpath("cache"), max_size_bytes=250)
+
+    def create_file(self, name: str, content: bytes) -> dict:
+        filename = self.root.joinpath("files", name)
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        filename.write_bytes(content)
+
+        return {
+            "name": name,
+            "size": len(content),
+            "etag": calc_etag(str(filename)),
+            "absolute_filename": filename,
+        }
+
+    def test_store_and_materialize(self):
+        file = self.create_file("a.gpkg", b"a" * 100)
+        destination = self.root.joinpath("project", "a.gpkg")
+
+        self.assertFalse(self.cache.materialize(file, destination))
+
+        self.cache.store(file, file["absolute_filename"])
+
+        self.assertTrue(self.cache.materialize(file, destination))
+        self.assertEqual(destination.read_bytes(), b"a" * 100)
+        self.assertEqual(
+            self.cache.get_stats(),
+            {
+                "hits_count": 1,
+                "hits_bytes": 100,
+                "misses_count": 1,
+                "misses_bytes": 100,
+            },
+        )
+
+    def test_store_skips_mismatching_etag(self):
+        file = self.create_file("a.gpkg", b"a" * 100)
+        file["etag"] = "0" * 32
+
+        self.cache.store(file, file["absolute_filename"])
+
+        self.assertFalse(self.cache.get_object_path(file["etag"]).exists())
+
+    def test_evict_least_recently_used(self):
+        files = [
+            self.create_file(f"{name}.gpkg", name.encode() * 100)
+            for name in ("a", "b", "c")
+        ]
+
+        for idx, file in enumerate(files):
+            self.cache.store(file, file["absolute_filename"])
+
+            # NOTE set the access times explicitly, the filesystem time resolution might be too coarse
+            object_path = self.cache.get_object_path(file["etag"])
+            os.utime(object_path, (1000 + idx, 1000 + idx))
+
+        # using the oldest file makes it the most recently used one
+        self.assertTrue(
+            self.cache.materialize(files[0], self.root.joinpath("project", "a.gpkg"))
+        )
+
+        self.cache.evict()
+
+        self.assertTrue(self.cache.get_object_path(files[0]["etag"]).exists())
+        self.assertFalse(self.cache.get_object_path(files[1]["etag"]).exists())
+        self.assertTrue(self.cache.get_object_path(files[2]["etag"]).exists())
+
+        # the cache is within its size, nothing else is evicted
+        self.cache.evict()
+
+        self.assertTrue(self.cache.get_object_path(files[0]["etag"]).exists())
+        self.assertTrue(self.cache.get_object_path(files[2]["etag"]).exists())
@@ -0,0 +1,116 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from qfc_worker import utils
+from qfc_worker.utils import get_layers_extent, start_app
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsProject,
+    QgsRectangle,
+    QgsVectorLayer,
+)
+
+
+class LayersExtentTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        start_app()
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.project = QgsProject()
+        self.project.setCrs(QgsCoordinateReferenceSystem("EPSG:4326"))
+
+        # NOTE the "remote" layers are file layers too, but their extents are queried as if they were remote
+        self.layers = [
+            self.create_layer("remote_a", (1, 1), (2, 2)),
+            self.create_layer("local", (10, 5), (11, 6)),
+            self.create_layer("remote_b", (20, 20), (21, 21)),
+        ]
+        self.remote_threads = []
+
+        patcher = mock.patch.object(
+            utils,
+            "is_remote_vector_layer",
+            side_effect=lambda layer: layer.name().startswith("remote"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_layer(self, name: str, *points: tuple[float, float]) -> QgsVectorLayer:
+        filename = Path(self.tempdir.name).joinpath(f"{name}.geojson")
+        filename.write_text(
+            json.dumps(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "properties": {},
+                            "geometry": {"type": "Point", "coordinates": point},
+                        }
+                        for point in points
+                    ],
+                }
+            )
+        )
+
+        layer = QgsVectorLayer(str(filename), name, "ogr")
+
+        self.assertTrue(layer.isValid(), name)
+
+        self.project.addMapLayer(layer)
+
+        return layer
+
+    def patch_remote_layer_extent(self, barrier=None, failing_uri: str = ""):
+        get_remote_layer_extent = utils.get_remote_layer_extent
+
+        def _get_remote_layer_extent(provider_key, uri, transform_context):
+            self.remote_threads.append(threading.current_thread())
+
+            # NOTE wait for the other query, so both queries are running at the same time
+            if barrier:
+                barrier.wait(timeout=5)
+
+            if uri == failing_uri:
+                raise Exception("Failed to open the data provider.")
+
+            return get_remote_layer_extent(provider_key, uri, transform_context)
+
+        patcher = mock.patch.object(
+            utils, "get_remote_layer_extent", side_effect=_get_remote_layer_extent
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_extent(self):
+        self.patch_remote_layer_extent(threading.Barrier(2))
+
+        extent = get_layers_extent(self.project, self.layers, concurrency=4)
+
+        self.assertEqual(extent, QgsRectangle(1, 1, 21, 21))
+        # the remote layers are queried in the worker threads, through their own data providers
+        self.assertEqual(len(self.remote_threads), 2)
+        self.assertNotIn(threading.main_thread(), self.remote_threads)
+
+    def test_serial_extent(self):
+        self.patch_remote_layer_extent()
+
+        extent = get_layers_extent(self.project, self.layers, concurrency=1)
+
+        self.assertEqual(extent, QgsRectangle(1, 1, 21, 21))
+        self.assertEqual(self.remote_threads, [])
+
+    def test_failed_remote_layer_skipped(self):
+        self.patch_remote_layer_extent(failing_uri=self.layers[2].source())
+
+        extent = get_layers_extent(self.project, self.layers, concurrency=4)
+
+        self.assertEqual(extent, QgsRectangle(1, 1, 11, 6))
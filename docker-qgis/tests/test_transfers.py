@@ -0,0 +1,187 @@
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from qfc_worker import transfers
+from qfc_worker.transfers import FileTransfers
+from qfieldcloud_sdk.utils import calc_etag
+
+PROJECT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes) -> None:
+        self.status_code = status_code
+        self.content = content
+
+    def iter_content(self, chunk_size: int):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+
+class RangedDownloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.local_dir = Path(self.tempdir.name)
+        self.content = bytes(range(35))
+        self.requested_ranges = []
+
+        # NOTE small sizes, so the file is split in 3 full ranges and a partial one, each written in several chunks
+        for name, value in (
+            ("RANGED_DOWNLOAD_MIN_SIZE", 20),
+            ("RANGED_DOWNLOAD_CHUNK_SIZE", 10),
+            ("DOWNLOAD_BUFFER_SIZE", 4),
+        ):
+            patcher = mock.patch.object(transfers, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # NOTE each thread creates its own client, so all of them should be the same mock
+        self.client = mock.Mock()
+        patcher = mock.patch.object(transfers.sdk, "Client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def request(self, supported_ranges_count: int):
+        def _request(method, url, headers, stream):
+            start, end = map(
+                int, re.fullmatch(r"bytes=(\d+)-(\d+)", headers["Range"]).groups()
+            )
+            self.requested_ranges.append((start, end))
+
+            if len(self.requested_ranges) > supported_ranges_count:
+                return FakeResponse(200, self.content)
+
+            return FakeResponse(206, self.content[start : end + 1])
+
+        return _request
+
+    def download(self) -> list[dict]:
+        return FileTransfers(concurrency=2).download_files(
+            [{"name": "data.gpkg", "size": len(self.content)}],
+            PROJECT_ID,
+            self.local_dir,
+        )
+
+    def test_download_ranges(self):
+        self.client._request.side_effect = self.request(supported_ranges_count=4)
+
+        downloads = self.download()
+
+        self.assertEqual(downloads[0]["ranges_count"], 4)
+        self.assertEqual(
+            sorted(self.requested_ranges), [(0, 9), (10, 19), (20, 29), (30, 34)]
+        )
+        self.assertEqual(
+            self.local_dir.joinpath("data.gpkg").read_bytes(), self.content
+        )
+
+    def test_download_ranges_not_supported(self):
+        self.client._request.side_effect = self.request(supported_ranges_count=0)
+
+        downloads = self.download()
+
+        # the whole file is downloaded with the response of the first range request
+        self.assertEqual(downloads[0]["ranges_count"], 1)
+        self.assertEqual(self.requested_ranges, [(0, 9)])
+        self.assertEqual(
+            self.local_dir.joinpath("data.gpkg").read_bytes(), self.content
+        )
+
+    def test_download_ranges_stopped_being_supported(self):
+        self.client._request.side_effect = self.request(supported_ranges_count=2)
+
+        with self.assertRaises(Exception):
+            self.download()
+
+
+class FilesManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.local_dir = Path(self.tempdir.name).joinpath("project")
+        self.local_dir.mkdir()
+
+    def create_file(self, name: str, content: bytes) -> dict:
+        filename = self.local_dir.joinpath(name)
+        filename.write_bytes(content)
+
+        return {
+            "name": name,
+            "absolute_filename": str(filename),
+            "etag": calc_etag(str(filename)),
+        }
+
+    def test_manifest_round_trip(self):
+        self.assertIsNone(transfers.read_files_manifest(self.local_dir))
+
+        file = self.create_file("data.gpkg", b"data")
+        transfers.write_files_manifest(self.local_dir, [file])
+        manifest = transfers.read_files_manifest(self.local_dir)
+
+        self.assertEqual(list(manifest.keys()), ["data.gpkg"])
+        self.assertEqual(manifest["data.gpkg"]["etag"], file["etag"])
+        self.assertEqual(manifest["data.gpkg"]["size"], 4)
+
+        # the manifest is not in the uploaded directory
+        self.assertEqual(
+            [p.name for p in self.local_dir.iterdir()],
+            ["data.gpkg"],
+        )
+
+    def test_is_file_changed(self):
+        file = self.create_file("data.gpkg", b"data")
+        transfers.write_files_manifest(self.local_dir, [file])
+        manifest = transfers.read_files_manifest(self.local_dir)
+
+        self.assertFalse(transfers.is_file_changed(file, manifest))
+
+        # only the modification time changed, the ETag still matches
+        os.utime(file["absolute_filename"], (1000, 1000))
+
+        with mock.patch.object(
+            transfers, "calc_etag", wraps=transfers.calc_etag
+        ) as calc_etag_mock:
+            self.assertFalse(transfers.is_file_changed(file, manifest))
+            self.assertEqual(calc_etag_mock.call_count, 1)
+
+        # same size, different content
+        Path(file["absolute_filename"]).write_bytes(b"DATA")
+
+        self.assertTrue(transfers.is_file_changed(file, manifest))
+
+        # the files missing in the manifest are always changed
+        new_file = self.create_file("new.gpkg", b"new")
+
+        self.assertTrue(transfers.is_file_changed(new_file, manifest))
+
+    def test_upload_unchanged_files_skipped(self):
+        files = [
+            self.create_file("data.gpkg", b"data"),
+            self.create_file("project.qgs", b"<qgis/>"),
+        ]
+        client = mock.Mock()
+        client.list_local_files.return_value = files
+        # without a manifest, the remote files are compared by ETag
+        client.list_remote_files.return_value = [
+            {"name": "data.gpkg", "etag": files[0]["etag"]},
+            {"name": "project.qgs", "etag": "0" * 32},
+        ]
+
+        with mock.patch.object(transfers.sdk, "Client", return_value=client):
+            file_transfers = FileTransfers()
+            file_transfers.upload_files(
+                PROJECT_ID, transfers.sdk.FileTransferType.PROJECT, self.local_dir
+            )
+
+        self.assertEqual(
+            [c.args[3] for c in client.upload_file.call_args_list],
+            ["project.qgs"],
+        )
+        self.assertEqual(file_transfers.skipped_files_count, 1)
@@ -0,0 +1,307 @@
+import contextlib
+import io
+import logging
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from qfc_worker.utils import (
+    Step,
+    StepOutput,
+    WorkDirPath,
+    Workflow,
+    WorkflowCheckpoint,
+    WorkflowValidationException,
+    run_workflow_steps,
+)
+
+
+def return_value(value):
+    return value
+
+
+def touch(path):
+    path.mkdir(parents=True, exist_ok=True)
+
+
+def write_file(path):
+    path.mkdir(parents=True, exist_ok=True)
+    path.joinpath("file").touch()
+
+    return str(path)
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def log_lines(name, barrier):
+    logging.warning(f"{name} started")
+    # NOTE wait for the other step, so both steps are logging at the same time
+    barrier.wait(timeout=5)
+    logging.warning(f"{name} finished")
+
+
+class WorkflowTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+        self.root_workdir = Path(self.tempdir.name)
+
+    def test_dependencies(self):
+        workflow = Workflow(
+            id="test",
+            version="1.0",
+            name="Test",
+            steps=[
+                Step(
+                    id="a",
+                    name="A",
+                    method=return_value,
+                    arguments={"value": 1},
+                    return_names=["value"],
+                ),
+                Step(
+                    id="b",
+                    name="B",
+                    method=return_value,
+                    arguments={"value": StepOutput("a", "value")},
+                    return_names=["value"],
+                ),
+                Step(
+                    id="c",
+                    name="C",
+                    method=touch,
+                    arguments={"path": WorkDirPath("files")},
+                ),
+                # overlaps with the workdir path of "c"
+                Step(
+                    id="d",
+                    name="D",
+                    method=touch,
+                    arguments={"path": WorkDirPath("files", "sub")},
+                ),
+                Step(
+                    id="e",
+                    name="E",
+                    method=touch,
+                    arguments={"path": WorkDirPath("other")},
+                    depends_on=["b"],
+                ),
+            ],
+        )
+
+        self.assertEqual(
+            workflow.get_dependencies(),
+            [set(), {0}, set(), {2}, {1}],
+        )
+
+    def test_cycles_rejected(self):
+        # the dependencies must be previous steps, so there can be no cycles
+        with self.assertRaises(WorkflowValidationException):
+            Workflow(
+                id="test",
+                version="1.0",
+                name="Test",
+                steps=[
+                    Step(
+                        id="a",
+                        name="A",
+                        method=return_value,
+                        arguments={"value": 1},
+                        depends_on=["b"],
+                    ),
+                    Step(
+                        id="b",
+                        name="B",
+                        method=return_value,
+                        arguments={"value": 1},
+                        depends_on=["a"],
+                    ),
+                ],
+            )
+
+        with self.assertRaises(WorkflowValidationException):
+            Workflow(
+                id="test",
+                version="1.0",
+                name="Test",
+                steps=[
+                    Step(
+                        id="a",
+                        name="A",
+                        method=return_value,
+                        arguments={"value": StepOutput("b", "value")},
+                        return_names=["value"],
+                    ),
+                    Step(
+                        id="b",
+                        name="B",
+                        method=return_value,
+                        arguments={"value": 1},
+                        return_names=["value"],
+                    ),
+                ],
+            )
+
+    def test_run_steps(self):
+        workflow = Workflow(
+            id="test",
+            version="1.0",
+            name="Test",
+            steps=[
+                Step(
+                    id="a",
+                    name="A",
+                    method=return_value,
+                    arguments={"value": 1},
+                    return_names=["value"],
+                    thread_safe=True,
+                ),
+                Step(
+                    id="b",
+                    name="B",
+                    method=return_value,
+                    arguments={"value": StepOutput("a", "value")},
+                    return_names=["value"],
+                ),
+            ],
+        )
+        step_returns = {}
+
+        run_workflow_steps(workflow, step_returns, self.root_workdir)
+
+        self.assertEqual(step_returns, {"a": {"value": 1}, "b": {"value": 1}})
+        self.assertEqual([s.stage for s in workflow.steps], [2, 2])
+
+    def test_failure_propagation(self):
+        workflow = Workflow(
+            id="test",
+            version="1.0",
+            name="Test",
+            steps=[
+                Step(
+                    id="a",
+                    name="A",
+                    method=fail,
+                    arguments={"message": "a"},
+                    return_names=["value"],
+                    thread_safe=True,
+                ),
+                Step(
+                    id="b",
+                    name="B",
+                    method=return_value,
+                    arguments={"value": StepOutput("a", "value")},
+                    return_names=["value"],
+                ),
+                Step(
+                    id="c",
+                    name="C",
+                    method=fail,
+                    arguments={"message": "c"},
+                    thread_safe=True,
+                ),
+            ],
+        )
+
+        # the error of the failed step that comes first in the workflow is raised, no matter which failed first
+        with self.assertRaisesRegex(ValueError, "^a$"):
+            run_workflow_steps(workflow, {}, self.root_workdir)
+
+        # the step depending on the failed step is never started
+        self.assertEqual([s.stage for s in workflow.steps], [1, 0, 1])
+
+    def test_concurrent_step_logs_not_interleaved(self):
+        barrier = threading.Barrier(2)
+        workflow = Workflow(
+            id="test",
+            version="1.0",
+            name="Test",
+            steps=[
+                Step(
+                    id=name,
+                    name=name,
+                    method=log_lines,
+                    arguments={"name": name, "barrier": barrier},
+                    thread_safe=True,
+                )
+                for name in ("a", "b")
+            ],
+        )
+
+        stderr = io.StringIO()
+        handler = logging.StreamHandler(stderr)
+        logging.root.addHandler(handler)
+        self.addCleanup(logging.root.removeHandler, handler)
+
+        with contextlib.redirect_stderr(stderr):
+            run_workflow_steps(workflow, {}, self.root_workdir)
+
+        lines = stderr.getvalue().splitlines()
+
+        # each step logs between its own start and end markers
+        self.assertEqual(len(lines), 8)
+
+        for block in (lines[:4], lines[4:]):
+            name = block[1].split()[0]
+
+            self.assertTrue(block[0].startswith("::<<<::"))
+            self.assertEqual(block[1:3], [f"{name} started", f"{name} finished"])
+            self.assertTrue(block[3].startswith("::>>>::"))
+
+    def test_resume_keeps_nested_paths(self):
+        checkpoint_dir = self.root_workdir.joinpath("checkpoint")
+
+        def get_workflow():
+            return Workflow(
+                id="test",
+                version="1.0",
+                name="Test",
+                steps=[
+                    Step(
+                        id="package",
+                        name="Package",
+                        method=write_file,
+                        arguments={"path": WorkDirPath("packaged")},
+                        return_names=["path"],
+                        checkpoint=True,
+                    ),
+                    # nested in the restored path, but not checkpointed
+                    Step(
+                        id="package_sub",
+                        name="Package sub",
+                        method=write_file,
+                        arguments={"path": WorkDirPath("packaged", "sub")},
+                    ),
+                    Step(
+                        id="other",
+                        name="Other",
+                        method=write_file,
+                        arguments={"path": WorkDirPath("other")},
+                    ),
+                ],
+            )
+
+        # the first run checkpoints the first step only, then fails
+        checkpoint = WorkflowCheckpoint(checkpoint_dir, get_workflow())
+        for parts in (("packaged",), ("packaged", "sub"), ("other",)):
+            write_file(checkpoint.workdir.joinpath(*parts))
+
+        checkpoint.save_step(0, {"path": "packaged"})
+
+        step_returns = {}
+        workflow = get_workflow()
+        checkpoint = WorkflowCheckpoint(checkpoint_dir, workflow)
+
+        self.assertEqual(checkpoint.resume(step_returns), {0})
+        self.assertEqual(step_returns, {"package": {"path": "packaged"}})
+        self.assertTrue(workflow.steps[0].is_restored)
+
+        # the restored path is kept, including the paths nested in it
+        self.assertTrue(checkpoint.workdir.joinpath("packaged", "file").exists())
+        self.assertTrue(checkpoint.workdir.joinpath("packaged", "sub", "file").exists())
+        # the leftovers of the steps that run again are removed
+        self.assertFalse(checkpoint.workdir.joinpath("other").exists())